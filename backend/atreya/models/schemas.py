@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 
 DISCLAIMER = "This is an educational demo and not medical advice. Always consult a qualified professional."
 
@@ -9,28 +9,58 @@ class RecommendRequest(BaseModel):
     symptoms: List[str] = Field(default_factory=list)
     lifestyle: List[str] = Field(default_factory=list)
     conditions_history: List[str] = Field(default_factory=list)
+    narrative: Optional[Literal["inline", "skip", "deferred"]] = Field(
+        None, description="LLM narrative: inline (wait for it), skip (graph-only, fastest) or deferred "
+                          "(fetch later from /recommendations/narrative/{job}); defaults to the server's NARRATIVE_MODE")
+    resolve_symptoms: Optional[bool] = Field(
+        None, description="replace symptoms that are not graph symptoms with the nearest ones (reported in "
+                          "resolved_symptoms); defaults to the server's RESOLVE_SYMPTOMS")
+
+class BatchRecommendRequest(BaseModel):
+    requests: List[RecommendRequest] = Field(default_factory=list)
 
 class HerbSuggestion(BaseModel):
     name: str
     why: str
     how_to_use: Optional[str] = None
     avoid_with: List[str] = Field(default_factory=list)
+    score: Optional[float] = Field(None, description="ranking score: evidence + symptom coverage - interaction penalty")
 
 class RecommendResponse(BaseModel):
     suggestions: List[HerbSuggestion]
     tips: List[str]
     disclaimer: str = DISCLAIMER
     debug: Optional[Dict[str, Any]] = None
+    narrative_job: Optional[str] = None
+    skipped_conflicts: List[str] = Field(default_factory=list,
+                                         description="higher-scored herbs left out for interacting with a suggestion")
+    resolved_symptoms: Dict[str, str] = Field(default_factory=dict,
+                                              description="request term -> graph symptom it was replaced with")
+
+class NarrativeResponse(BaseModel):
+    job: str
+    status: str = Field(..., description="pending/done/error")
+    text: Optional[str] = None
+    error: Optional[str] = None
 
 class DiagnosisRequest(BaseModel):
     symptoms: List[str] = Field(default_factory=list)
     lifestyle: List[str] = Field(default_factory=list)
+    resolve_symptoms: Optional[bool] = Field(None, description="as in RecommendRequest")
+
+class ConditionScore(BaseModel):
+    name: str
+    probability: float = Field(..., ge=0.0, le=1.0)
+    matched_symptoms: List[str] = Field(default_factory=list)
 
 class DiagnosisResponse(BaseModel):
     probable_conditions: List[str]
     confidence: float = Field(..., ge=0.0, le=1.0)
     rationale: str
     disclaimer: str = DISCLAIMER
+    condition_scores: List[ConditionScore] = Field(default_factory=list)
+    resolved_symptoms: Dict[str, str] = Field(default_factory=dict,
+                                              description="request term -> graph symptom it was replaced with")
 
 class HerbItem(BaseModel):
     name: str
@@ -39,6 +69,9 @@ class HerbItem(BaseModel):
 class HerbSearchResponse(BaseModel):
     query: str
     herbs: List[HerbItem]
+    offset: int = 0
+    limit: int = 50
+    has_more: bool = False
 
 class ChatRequest(BaseModel):
     message: str
@@ -0,0 +1,258 @@
+from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from ..utils.config import settings
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except Exception:
+    REDIS_AVAILABLE = False
+
+
+log = logging.getLogger(__name__)
+
+
+def canonical_key(**parts: Any) -> str:
+    """Stable hash of JSON-serializable parts (dict order and whitespace don't matter)."""
+    blob = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def age_bucket(age: int, width: int = 10) -> str:
+    lo = (age // width) * width
+    return f"{lo}-{lo + width - 1}"
+
+
+def recommendation_cache_key(age: int, gender: str, symptoms: List[str], lifestyle: List[str],
+                             facts: List[Dict[str, Any]], avoid_map: Dict[str, List[str]], model: str) -> str:
+    """Key on canonicalized prompt inputs, so reordered/re-cased symptom sets share an entry."""
+    norm = lambda xs: sorted({x.strip().lower() for x in xs if x and x.strip()})
+    return canonical_key(
+        kind="recommendations",
+        symptoms=norm(symptoms),
+        lifestyle=norm(lifestyle),
+        age=age_bucket(age),
+        gender=(gender or "").strip().lower(),
+        facts=canonical_key(facts=sorted(json.dumps(f, sort_keys=True, default=str) for f in facts),
+                            avoid={k: sorted(v) for k, v in avoid_map.items()}),
+        model=model,
+    )
+
+
+class LRUCache:
+    """Bounded in-memory tier: least recently used entries are evicted past `maxsize`, entries expire after `ttl`."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    """Optional on-disk tier shared across restarts (and by workers on the same host)."""
+
+    def __init__(self, path: str, ttl: float = 86400.0, table: str = "llm_cache"):
+        self.path = path
+        self.ttl = ttl
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+        self._conn.execute(f"DELETE FROM {table} WHERE expires < ?", (time.time(),))
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(f"SELECT value, expires FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._conn.execute(f"INSERT OR REPLACE INTO {self.table} (key, value, expires) VALUES (?, ?, ?)",
+                               (key, json.dumps(value), time.time() + self.ttl))
+
+    def clear(self, keep_prefix: str = "") -> None:
+        with self._lock:
+            if keep_prefix:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE substr(key, 1, ?) != ?", (len(keep_prefix), keep_prefix))
+            else:
+                self._conn.execute(f"DELETE FROM {self.table}")
+
+    def describe(self) -> str:
+        return f"sqlite:{self.path}#{self.table}"
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisCache:
+    """Shared tier for workers on several hosts (CACHE_BACKEND=redis, CACHE_URL=redis://...); needs `redis`."""
+
+    def __init__(self, url: str, ttl: float = 86400.0, namespace: str = "atreya:cache:"):
+        self.url = url
+        self.ttl = ttl
+        self.namespace = namespace
+        self._client = redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0)
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(self.namespace + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any) -> None:
+        self._client.set(self.namespace + key, json.dumps(value), px=int(self.ttl * 1000))
+
+    def clear(self, keep_prefix: str = "") -> None:
+        keep = (self.namespace + keep_prefix).encode("utf-8")
+        stale = [k for k in self._client.scan_iter(match=self.namespace + "*", count=1000)
+                 if not (keep_prefix and k.startswith(keep))]
+        for i in range(0, len(stale), 1000):
+            self._client.delete(*stale[i:i + 1000])
+
+    def describe(self) -> str:
+        return f"redis:{self.url.rsplit('@', 1)[-1]}"
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def make_shared_tier(ttl: float, name: str = "llm_cache"):
+    """Second cache tier from CACHE_BACKEND: `memory` (none; each worker has only its LRU), `sqlite` (workers on one
+    host, file at LLM_CACHE_SQLITE) or `redis` (CACHE_URL). `name` keeps independent caches apart (SQLite table,
+    Redis key namespace). Falls back to no shared tier if the backend is unusable."""
+    backend = settings.cache_backend or ("sqlite" if settings.llm_cache_sqlite else "memory")
+    if backend == "sqlite" and settings.llm_cache_sqlite:
+        return SQLiteCache(settings.llm_cache_sqlite, ttl=ttl, table=name)
+    if backend == "redis" and REDIS_AVAILABLE and settings.cache_url:
+        return RedisCache(settings.cache_url, ttl=ttl, namespace=f"atreya:{name}:")
+    if backend != "memory":
+        log.warning("cache backend %r is not usable here (missing path, URL or package); using memory only", backend)
+    return None
+
+
+class ResponseCache:
+    """Memory tier in front of an optional shared tier (SQLite or Redis, see make_shared_tier), with hit/miss counters.
+
+    Entries are namespaced by the graph data version; a version change invalidates everything. The shared tier
+    keeps the entries of the new version, which another worker may already have written.
+    """
+
+    def __init__(self, memory: LRUCache, shared=None, enabled: bool = True):
+        self.memory = memory
+        self.shared = shared
+        self.enabled = enabled
+        self.version: Any = None
+        self.counters = {"memory_hits": 0, "shared_hits": 0, "misses": 0, "sets": 0, "invalidations": 0,
+                         "shared_errors": 0}
+        # called from the event loop and from threadpool workers at once
+        self._lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.counters[name] += 1
+
+    def _key(self, key: str) -> str:
+        return f"{self.version}:{key}"
+
+    def _shared_get(self, k: str) -> Optional[Any]:
+        # the shared tier is an optimization: when it is down, fall back to the memory tier alone
+        try:
+            return self.shared.get(k)
+        except Exception:
+            self._count("shared_errors")
+            return None
+
+    def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        k = self._key(key)
+        value = self.memory.get(k)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        if self.shared is not None:
+            value = self._shared_get(k)
+            if value is not None:
+                self._count("shared_hits")
+                self.memory.set(k, value)
+                return value
+        self._count("misses")
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        if not self.enabled:
+            return
+        k = self._key(key)
+        self.memory.set(k, value)
+        if self.shared is not None:
+            try:
+                self.shared.set(k, value)
+            except Exception:
+                self._count("shared_errors")
+        self._count("sets")
+
+    def invalidate(self) -> None:
+        self.memory.clear()
+        if self.shared is not None:
+            try:
+                self.shared.clear(keep_prefix=self._key(""))
+            except Exception:
+                self._count("shared_errors")
+        self._count("invalidations")
+
+    def on_graph_version(self, version: Any) -> None:
+        """Listener for graph reloads: drop every entry computed against older graph data."""
+        with self._lock:
+            if version == self.version:
+                return
+            previous, self.version = self.version, version
+        if previous is not None:
+            self.invalidate()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        hits = counters["memory_hits"] + counters["shared_hits"]
+        lookups = hits + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "shared": self.shared.describe() if self.shared is not None else None,
+            "graph_version": self.version,
+        }
@@ -0,0 +1,134 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set
+import asyncio
+import logging
+import threading
+import time
+from ..utils.config import settings
+from .graph import GraphService, AsyncGraphService
+
+log = logging.getLogger(__name__)
+
+
+class CatalogState(NamedTuple):
+    """One immutable catalog generation: the symptom list and the index built from it (and the conditions
+    and symptom aliases)."""
+    version: Any
+    symptoms: List[str]
+    index: Any
+    loaded_at: float
+
+
+class SymptomCatalog:
+    """Versioned symptom catalog shared by the chat extractor and its matcher index.
+
+    A background task refreshes it when the loader's graph version marker changes or the TTL expires.
+    New generations are built off the request path and swapped in with a single assignment, so readers
+    always see a complete (symptoms, index) pair and in-flight requests never rebuild anything.
+    """
+
+    def __init__(self, build_index: Callable[[List[str], Dict[str, Set[str]], Any, Dict[str, List[str]]], Any],
+                 graph: Optional[GraphService] = None, agraph: Optional[AsyncGraphService] = None,
+                 ttl: Optional[float] = None, poll: Optional[float] = None):
+        self.build_index = build_index
+        self.graph = graph
+        self.agraph = agraph
+        self.ttl = settings.catalog_ttl if ttl is None else ttl
+        self.poll = settings.catalog_poll if poll is None else poll
+        self._state: Optional[CatalogState] = None
+        self._lock = threading.Lock()
+        self._alock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def current(self) -> Optional[CatalogState]:
+        return self._state
+
+    def _swap(self, version: Any, symptoms: List[str], conditions: Dict[str, Set[str]],
+              aliases: Dict[str, List[str]]) -> CatalogState:
+        index = self.build_index(symptoms, conditions, version, aliases)
+        state = CatalogState(version, symptoms, index, time.monotonic())
+        self._state = state
+        return state
+
+    def _stale(self, state: Optional[CatalogState], version: Any) -> bool:
+        return state is None or state.version != version or time.monotonic() - state.loaded_at > self.ttl
+
+    # --- sync (scripts, GraphService) ---
+
+    def get(self) -> CatalogState:
+        """Current generation; loads synchronously only if nothing has been loaded yet."""
+        state = self._state
+        if state is None:
+            with self._lock:
+                if self._state is None:
+                    snap = self.graph.snapshot()
+                    if snap is not None:
+                        return self._swap(snap.version, snap.all_symptoms(), snap.condition_scorer.condition_symptoms,
+                                          snap.symptom_aliases())
+                    return self._swap(self.graph.graph_version(), self.graph.all_symptoms(),
+                                      self.graph.condition_scorer().condition_symptoms, self.graph.symptom_aliases())
+                state = self._state
+        return state
+
+    # --- async (API) ---
+
+    async def _fetch(self):
+        # with a graph snapshot, take the version it was built from so a lagging snapshot is retried next poll
+        if self.agraph is not None and self.agraph.use_snapshot:
+            snap = await self.agraph.snapshot()
+            return snap.version, snap.all_symptoms(), snap.condition_scorer.condition_symptoms, snap.symptom_aliases()
+        if self.agraph is not None:
+            scorer = await self.agraph.condition_scorer()
+            return (await self.agraph.graph_version(), await self.agraph.all_symptoms(), scorer.condition_symptoms,
+                    await self.agraph.symptom_aliases())
+        return await asyncio.to_thread(lambda: (self.graph.graph_version(), self.graph.all_symptoms(),
+                                                self.graph.condition_scorer().condition_symptoms,
+                                                self.graph.symptom_aliases()))
+
+    async def aget(self) -> CatalogState:
+        state = self._state
+        if state is None:
+            async with self._alock:
+                if self._state is None:
+                    version, symptoms, conditions, aliases = await self._fetch()
+                    return await asyncio.to_thread(self._swap, version, symptoms, conditions, aliases)
+                state = self._state
+        return state
+
+    async def arefresh(self, force: bool = False) -> bool:
+        """Reload if the graph version changed or the TTL expired; returns True when a new generation was swapped in."""
+        if self.agraph is not None:
+            version = await self.agraph.graph_version()
+        else:
+            version = await asyncio.to_thread(self.graph.graph_version)
+        if not force and not self._stale(self._state, version):
+            return False
+        async with self._alock:
+            version, symptoms, conditions, aliases = await self._fetch()
+            # matcher and embedding construction is CPU work; keep it off the event loop
+            await asyncio.to_thread(self._swap, version, symptoms, conditions, aliases)
+        log.info("symptom catalog refreshed: version=%s, %d symptoms", version, len(symptoms))
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.arefresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("symptom catalog refresh failed; keeping the current generation")
+            await asyncio.sleep(self.poll)
+
+    def start(self) -> None:
+        """Start the background refresher on the running event loop."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
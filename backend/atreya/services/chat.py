@@ -1,8 +1,12 @@
-from typing import List, Dict
+from typing import List, Dict, Optional, AsyncIterator, Tuple, Any, NamedTuple, Iterable
 import re
-from .graph import GraphService
+from ..utils.config import settings
+from .graph import GraphService, AsyncGraphService
+from .matcher import PhraseMatcher
+from .catalog import SymptomCatalog, CatalogState
+from .embedding import SemanticSymptoms, candidate_phrases
 from .recommender import RecommenderService
-from ..models.schemas import RecommendRequest
+from ..models.schemas import RecommendRequest, RecommendResponse
 
 LIFESTYLE_KEYWORDS = {
     "smoker": ["smoker", "smoking", "cigarette"],
@@ -13,55 +17,106 @@ LIFESTYLE_KEYWORDS = {
     "balanced diet": ["balanced diet", "healthy diet", "clean eating"]
 }
 
+class ChatIndex(NamedTuple):
+    matcher: PhraseMatcher
+    semantic: Optional[SemanticSymptoms]
+
+
 class ChatService:
-    def __init__(self, graph: GraphService, recommender: RecommenderService):
+    def __init__(self, graph: Optional[GraphService], recommender: RecommenderService,
+                 agraph: Optional[AsyncGraphService] = None):
         self.graph = graph
+        self.agraph = agraph
         self.recommender = recommender
-        self._symptoms = None
+        # symptom list + matcher, refreshed in the background (see SymptomCatalog.start)
+        self.catalog = SymptomCatalog(self.build_index, graph=graph, agraph=agraph)
+
+    @staticmethod
+    def build_matcher(symptoms: List[str]) -> PhraseMatcher:
+        """One matcher for the symptom catalog and the lifestyle keyword buckets."""
+        phrases = [(s, ("symptoms", s)) for s in symptoms]
+        phrases += [(k, ("lifestyle", label)) for label, keys in LIFESTYLE_KEYWORDS.items() for k in keys]
+        return PhraseMatcher(phrases)
+
+    @classmethod
+    def build_index(cls, symptoms: List[str], conditions: Dict[str, Iterable[str]], version: Any = None,
+                    aliases: Optional[Dict[str, List[str]]] = None) -> ChatIndex:
+        semantic = None
+        if settings.semantic_symptoms:
+            semantic = SemanticSymptoms.build(symptoms, conditions, version, path=settings.embedding_index_path,
+                                              aliases=aliases)
+        return ChatIndex(cls.build_matcher(symptoms), semantic)
 
     def _get_symptoms_catalog(self) -> List[str]:
-        if self._symptoms is None:
-            self._symptoms = self.graph.all_symptoms()
-        return self._symptoms
+        return self.catalog.get().symptoms
 
     @staticmethod
     def _normalize(text: str) -> str:
         return re.sub(r"\s+", " ", text.strip().lower())
 
-    def extract(self, message: str) -> Dict[str, List[str]]:
+    def extract(self, message: str, state: Optional[CatalogState] = None) -> Dict[str, List[str]]:
+        index = (state or self.catalog.get()).index
         text = self._normalize(message)
 
-        # Symptoms: match by substring against known symptom names
-        syms = []
-        for s in self._get_symptoms_catalog():
-            s_norm = s.lower()
-            if s_norm in text:
-                syms.append(s)
-
-        # Lifestyle: keyword buckets
-        lifestyle = []
-        for label, keys in LIFESTYLE_KEYWORDS.items():
-            if any(k in text for k in keys):
-                lifestyle.append(label)
+        # Symptoms and lifestyle keyword buckets in a single pass over the message
+        out = {"symptoms": [], "lifestyle": [], "conditions": []}
+        for kind, label in index.matcher.find(text):
+            out[kind].append(label)
+        # then everyday phrasings ("tired all the time") resolved to the nearest graph symptoms/conditions
+        if index.semantic is not None:
+            symptoms, conditions = index.semantic.resolve(candidate_phrases(text))
+            seen = {s.lower() for s in out["symptoms"]}
+            out["symptoms"] += [s for s in symptoms if s.lower() not in seen]
+            out["conditions"] = conditions
+        return out
 
-        return {"symptoms": list(dict.fromkeys(syms)), "lifestyle": list(dict.fromkeys(lifestyle))}
+    async def resolve_symptoms(self, symptoms: List[str]) -> Dict[str, str]:
+        """Nearest graph symptom for each request term that is not one (empty if semantic matching is off)."""
+        semantic = (await self.catalog.aget()).index.semantic
+        return semantic.resolve_terms(symptoms) if semantic is not None and symptoms else {}
 
-    def reply(self, message: str) -> Dict[str, any]:
-        extracted = self.extract(message)
+    @staticmethod
+    def _request(extracted: Dict[str, List[str]], narrative: Optional[str] = None) -> RecommendRequest:
         # Provide defaults if user didn't state age/gender explicitly
-        req = RecommendRequest(
+        return RecommendRequest(
             age=25,
             gender="other",
             symptoms=extracted["symptoms"],
             lifestyle=extracted["lifestyle"],
-            conditions_history=[]
+            conditions_history=[],
+            narrative=narrative
         )
-        rec = self.recommender.recommend(req)
 
+    # the markdown reply is built from the structured suggestions only, so the LLM narrative is skipped
+
+    def reply(self, message: str) -> Dict[str, any]:
+        extracted = self.extract(message)
+        rec = self.recommender.recommend(self._request(extracted, narrative="skip"))
+        return self._format_reply(extracted, rec)
+
+    async def areply(self, message: str) -> Dict[str, any]:
+        extracted = self.extract(message, await self.catalog.aget())
+        rec = await self.recommender.arecommend(self._request(extracted, narrative="skip"))
+        return self._format_reply(extracted, rec)
+
+    async def astream(self, message: str) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield ("extracted", dict), then ("reply", dict) as soon as the graph answers; no LLM narrative follows."""
+        extracted = self.extract(message, await self.catalog.aget())
+        yield "extracted", extracted
+        async for event, data in self.recommender.astream(self._request(extracted, narrative="skip")):
+            if event == "suggestions":
+                yield "reply", self._format_reply(extracted, data)
+            else:
+                yield event, data
+
+    @staticmethod
+    def _format_reply(extracted: Dict[str, List[str]], rec: RecommendResponse) -> Dict[str, any]:
         # Format a friendly markdown reply
         lines = []
         if extracted["symptoms"]:
             lines.append(f"**Detected symptoms:** {', '.join(extracted['symptoms'])}")
+        if extracted.get("conditions"):
+            lines.append(f"**Sounds like:** {', '.join(extracted['conditions'])}")
         if extracted["lifestyle"]:
             lines.append(f"**Lifestyle cues:** {', '.join(extracted['lifestyle'])}")
         if not lines:
@@ -0,0 +1,77 @@
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import numpy as np
+from .matrices import dense, matrix
+
+
+class ScoredCondition(NamedTuple):
+    name: str
+    probability: float
+    matched: List[str]
+
+
+class ConditionScorer:
+    """Naive-Bayes condition scoring over HAS_SYMPTOM with precomputed likelihood tables.
+
+    With Laplace smoothing `alpha` over the symptom vocabulary V and n_c symptoms per condition,
+        log P(s | c) = log((x_cs + alpha) / (n_c + alpha * V)) = base_c + x_cs * boost
+    so the score of every condition for k known user symptoms is one sparse product:
+        k * base_c + boost * (u @ X)_c
+    A softmax over all conditions (uniform prior) turns scores into calibrated probabilities: matching
+    more of a condition's symptoms helps, and specific conditions beat ones with long symptom lists.
+    """
+
+    def __init__(self, has_symptom: Iterable[Tuple[str, Optional[str]]], alpha: float = 0.1, version: Any = None):
+        pairs = list(has_symptom)
+        self.version = version
+        self.alpha = alpha
+        self.conditions = sorted({c for c, _ in pairs})
+        self.symptoms = sorted({s.lower() for _, s in pairs if s})
+        self.symptom_index = {s: i for i, s in enumerate(self.symptoms)}
+        ci = {c: i for i, c in enumerate(self.conditions)}
+        cells = {(self.symptom_index[s.lower()], ci[c]): 1.0 for c, s in pairs if s}
+        self.condition_symptoms: Dict[str, set] = {}
+        for c, s in pairs:
+            self.condition_symptoms.setdefault(c, set())
+            if s:
+                self.condition_symptoms[c].add(s.lower())
+
+        V = max(1, len(self.symptoms))
+        n = np.array([len(self.condition_symptoms[c]) for c in self.conditions], dtype=np.float64)
+        self.X = matrix(cells, (len(self.symptoms), len(self.conditions)))
+        self.base = np.log(alpha / (n + alpha * V))
+        self.boost = float(np.log((1.0 + alpha) / alpha))
+
+    @classmethod
+    def from_snapshot(cls, snap) -> "ConditionScorer":
+        pairs = [(c, sym) for entries in snap.symptom_conditions.values() for sym, conds in entries for c in conds]
+        return cls(pairs, version=snap.version)
+
+    def _posterior(self, symptoms: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """(posterior over all conditions, matched-symptom counts); zeros if none of the symptoms is known."""
+        idx = sorted({self.symptom_index[s.lower()] for s in symptoms if s.lower() in self.symptom_index})
+        if not idx or not self.conditions:
+            zeros = np.zeros(len(self.conditions))
+            return zeros, zeros
+        u = np.zeros(len(self.symptoms))
+        u[idx] = 1.0
+        hits = dense(self.X.T @ u)
+        logp = len(idx) * self.base + self.boost * hits
+        logp -= logp.max()
+        p = np.exp(logp)
+        return p / p.sum(), hits
+
+    def probabilities(self, symptoms: List[str]) -> np.ndarray:
+        return self._posterior(symptoms)[0]
+
+    def score(self, symptoms: List[str], k: int = 10) -> List[ScoredCondition]:
+        """Top-k conditions sharing at least one symptom with the input, by posterior probability (ties by name)."""
+        p, hits = self._posterior(symptoms)
+        idx = np.flatnonzero(hits > 0)
+        if k <= 0 or idx.size == 0:
+            return []
+        if idx.size > k:
+            kth = p[idx][np.argpartition(-p[idx], k - 1)[k - 1]]
+            idx = idx[p[idx] >= kth]
+        wanted = {s.lower() for s in symptoms}
+        return [ScoredCondition(self.conditions[i], float(p[i]), sorted(self.condition_symptoms[self.conditions[i]] & wanted))
+                for i in idx[np.lexsort((idx, -p[idx]))][:k]]
@@ -0,0 +1,224 @@
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+import importlib.util
+import json
+import os
+import re
+import zlib
+import numpy as np
+from ..utils.config import settings
+from .matcher import words
+
+# checked, not imported: sentence-transformers pulls in torch, which is only loaded when EMBEDDING_MODEL is set
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+
+STOPWORDS = frozenset(
+    "a an the i i'm im me my am is are was were be been being have has had having do does did feel feeling "
+    "felt get getting got some any very really quite so too also just lately recently since for of in on at "
+    "to from with and or but it its it's that this these those there when while all time times day days "
+    "week weeks month months bit lot lots kind sort like i've ive think maybe".split()
+)
+_CLAUSE_RE = re.compile(r"[,.;:!?\n]+|\b(?:and|but|with|also|plus|then|or)\b")
+
+
+def content_words(text: str) -> List[str]:
+    return [w for w in words(text) if w not in STOPWORDS]
+
+
+def candidate_phrases(text: str) -> List[str]:
+    """Clauses of a message reduced to their content words: the spans that get embedded and looked up."""
+    out = []
+    for clause in _CLAUSE_RE.split(text.lower()):
+        ws = content_words(clause)
+        if ws:
+            out.append(" ".join(ws))
+    return list(dict.fromkeys(out))
+
+
+class HashedNgramEncoder:
+    """Feature-hashed bag of character n-grams (plus whole words), L2-normalized.
+
+    No model to download and deterministic across processes (crc32, not Python's salted hash), so
+    persisted matrices stay valid. Robust to inflection and typos ("bloated"/"bloating", "nausious");
+    synonyms with no shared spelling come from the graph's symptom aliases instead.
+    """
+
+    def __init__(self, dim: int = 512, n: Tuple[int, ...] = (3, 4)):
+        self.dim = dim
+        self.n = n
+        self.name = f"hashed-ngram-{dim}-{'-'.join(map(str, n))}"
+        self._features: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _word_features(self, word: str) -> Tuple[np.ndarray, np.ndarray]:
+        feats = self._features.get(word)
+        if feats is None:
+            padded = f"#{word}#"
+            grams = [padded[i:i + k] for k in self.n for i in range(len(padded) - k + 1)] + [padded]
+            hashes = np.array([zlib.crc32(g.encode("utf-8")) for g in grams], dtype=np.uint32)
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            feats = ((hashes % self.dim).astype(np.intp), signs)
+            if len(self._features) < 100_000:
+                self._features[word] = feats
+        return feats
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for w in content_words(text) or words(text):
+                idx, signs = self._word_features(w)
+                np.add.at(out[row], idx, signs)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+class SentenceEncoder:
+    """Small CPU sentence-embedding model (EMBEDDING_MODEL, e.g. all-MiniLM-L6-v2) when sentence-transformers is installed."""
+
+    def __init__(self, model: str):
+        from sentence_transformers import SentenceTransformer
+        self.name = f"st-{model}"
+        self.model = SentenceTransformer(model, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(list(texts), normalize_embeddings=True, batch_size=64), dtype=np.float32)
+
+
+_encoder = None
+
+
+def default_encoder():
+    """Process-wide encoder: EMBEDDING_MODEL if set and sentence-transformers is installed, else hashed n-grams."""
+    global _encoder
+    if _encoder is None:
+        if settings.embedding_model and SENTENCE_TRANSFORMERS_AVAILABLE:
+            _encoder = SentenceEncoder(settings.embedding_model)
+        else:
+            _encoder = HashedNgramEncoder(settings.embedding_dim)
+    return _encoder
+
+
+class EmbeddingIndex:
+    """Row-normalized float32 matrix of phrase embeddings with a label per row; cosine top-k by one matmul."""
+
+    def __init__(self, labels: List[Any], matrix: np.ndarray, encoder, version: Any = None):
+        self.labels = labels
+        self.matrix = matrix
+        self.encoder = encoder
+        self.version = version
+
+    @classmethod
+    def build(cls, entries: Iterable[Tuple[str, Hashable]], encoder, version: Any = None) -> "EmbeddingIndex":
+        entries = list(entries)
+        matrix = encoder.encode([text for text, _ in entries]) if entries else np.zeros((0, encoder.dim), np.float32)
+        return cls([label for _, label in entries], np.ascontiguousarray(matrix), encoder, version)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def search(self, texts: Sequence[str], k: int = 1, threshold: float = 0.0) -> List[List[Tuple[Any, float]]]:
+        """Best (label, cosine) per query text, at most k each, above `threshold`; all queries in one product."""
+        if not texts or not self.labels:
+            return [[] for _ in texts]
+        sims = self.encoder.encode(texts) @ self.matrix.T
+        k = min(k, sims.shape[1])
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        out = []
+        for row, cols in zip(sims, top):
+            hits = sorted(((self.labels[c], float(row[c])) for c in cols if row[c] >= threshold), key=lambda x: -x[1])
+            out.append(hits)
+        return out
+
+    # --- persistence: <path>.npy (memory-mapped on load) + <path>.json (labels, encoder, version) ---
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # write-then-rename so concurrent workers never map a half-written file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        np.save(f"{tmp}.npy", self.matrix)
+        with open(f"{tmp}.json", "w", encoding="utf-8") as f:
+            json.dump({"encoder": self.encoder.name, "version": self.version, "labels": self.labels}, f)
+        os.replace(f"{tmp}.npy", f"{path}.npy")
+        os.replace(f"{tmp}.json", f"{path}.json")
+
+    @classmethod
+    def load(cls, path: str, encoder, version: Any = None) -> Optional["EmbeddingIndex"]:
+        """Memory-map a saved index; None if missing, unversioned or built by another encoder or graph version."""
+        if version is None:
+            return None
+        try:
+            with open(f"{path}.json", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["encoder"] != encoder.name or meta["version"] != version:
+                return None
+            matrix = np.load(f"{path}.npy", mmap_mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+        # another worker may have swapped in the matrix of a newer version between the two reads
+        if matrix.shape != (len(meta["labels"]), encoder.dim):
+            return None
+        return cls([tuple(l) if isinstance(l, list) else l for l in meta["labels"]], matrix, encoder, version)
+
+
+def symptom_entries(symptoms: Iterable[str], conditions: Dict[str, Iterable[str]],
+                    aliases: Optional[Dict[str, List[str]]] = None) -> List[Tuple[str, Tuple[str, str]]]:
+    """(text, (kind, name)) rows for every symptom, its aliases (Symptom.aliases) and every condition name."""
+    aliases = aliases or {}
+    entries = []
+    for s in symptoms:
+        entries.append((s, ("symptom", s)))
+        entries += [(alias, ("symptom", s)) for alias in aliases.get(s, [])]
+    entries += [(c, ("condition", c)) for c in conditions]
+    return entries
+
+
+class SemanticSymptoms:
+    """Resolves free text to graph Symptom names through an EmbeddingIndex of symptoms, aliases and conditions.
+
+    A condition hit is reported as a condition, never expanded into its symptoms (the user did not state them);
+    it needs `condition_margin` more similarity than a symptom hit, since condition names ("Stress") also show
+    up as everyday words.
+    """
+
+    def __init__(self, index: EmbeddingIndex, symptoms: Iterable[str], conditions: Dict[str, Iterable[str]],
+                 threshold: float = 0.7, condition_margin: float = 0.15):
+        self.index = index
+        self.by_lower = {s.lower(): s for s in symptoms}
+        self.conditions = {c: [self.by_lower.get(s.lower(), s) for s in sorted(syms)] for c, syms in conditions.items()}
+        self.threshold = threshold
+        self.condition_margin = condition_margin
+
+    @classmethod
+    def build(cls, symptoms: List[str], conditions: Dict[str, Iterable[str]], version: Any = None,
+              path: str = "", encoder=None, aliases: Optional[Dict[str, List[str]]] = None) -> "SemanticSymptoms":
+        """Build the index, or memory-map the one saved at `path` for this graph version (saving it if absent).
+
+        Without a graph version nothing tells two builds apart, so the index is always rebuilt and not saved.
+        """
+        encoder = encoder or default_encoder()
+        persist = bool(path) and version is not None
+        index = EmbeddingIndex.load(path, encoder, version) if persist else None
+        if index is None:
+            index = EmbeddingIndex.build(symptom_entries(symptoms, conditions, aliases), encoder, version)
+            if persist:
+                index.save(path)
+        return cls(index, symptoms, conditions, settings.semantic_threshold, settings.semantic_condition_margin)
+
+    def resolve(self, phrases: Sequence[str]) -> Tuple[List[str], List[str]]:
+        """(symptom names, condition names) matched by the phrases, in phrase order."""
+        symptoms: List[str] = []
+        conditions: List[str] = []
+        for hits in self.index.search(phrases, k=1, threshold=self.threshold):
+            for (kind, name), score in hits:
+                if kind == "symptom":
+                    symptoms.append(name)
+                elif score >= self.threshold + self.condition_margin:
+                    conditions.append(name)
+        return list(dict.fromkeys(symptoms)), list(dict.fromkeys(conditions))
+
+    def resolve_terms(self, terms: List[str]) -> Dict[str, str]:
+        """Nearest graph symptom for each term that is not one, all terms in one search; unmatched terms are left out."""
+        unknown = list(dict.fromkeys(t for t in terms if t.lower() not in self.by_lower))
+        if not unknown:
+            return {}
+        hits = self.index.search([" ".join(content_words(t)) or t for t in unknown], k=1, threshold=self.threshold)
+        return {t: name for t, h in zip(unknown, hits) for (kind, name), _ in h if kind == "symptom"}
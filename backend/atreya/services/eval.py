@@ -1,2 +1,199 @@
-# Tiny starter to compare LLM-only vs LLM+graph in the future.
-# Fill graph/data/eval_prompts.json with your prompts and target answers, then expand this.
+"""Offline eval: LLM-only vs LLM+graph recommendations on graph/data/eval_prompts.json.
+
+    cd backend && python -m atreya.services.eval --workers 4 --checkpoint eval_results.jsonl
+
+Each prompt runs through both paths with the same prompt template; the LLM-only path gets no graph facts.
+Per run it records latency (graph and LLM separately), token counts and grounding:
+- `grounding`: share of herbs named in the answer that are among the graph facts for the symptoms
+- `interaction_coverage`: of the graph interactions of the named herbs, the share whose other herb is
+  named too, i.e. the answer at least brings up the pair
+Finished runs are appended to the checkpoint (JSONL) as they complete, and a rerun skips them.
+The response cache is bypassed. Set LLM_FAKE=1 to exercise the runner without an API key.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .graph import AsyncGraphService
+from .llm import make_llm, recommendation_inputs, recommendation_prompt
+from .matcher import PhraseMatcher
+
+PATHS = ("llm_only", "llm_graph")
+DEFAULT_PROMPTS = os.path.join(os.path.dirname(__file__), "..", "..", "..", "graph", "data", "eval_prompts.json")
+
+
+def load_prompts(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        prompts = json.load(f)
+    for i, p in enumerate(prompts):
+        p.setdefault("id", str(i))
+        p.setdefault("age", 30)
+        p.setdefault("gender", "unspecified")
+        p.setdefault("lifestyle", [])
+    return prompts
+
+
+def read_checkpoint(path: str) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """(prompt id, path) -> result of every run already recorded; a torn last line is ignored."""
+    done: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                r = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if r.get("error") is None:
+                done[(r["id"], r["path"])] = r
+    return done
+
+
+def token_usage(msg: Any, prompt: str) -> Dict[str, Any]:
+    usage = getattr(msg, "usage_metadata", None)
+    if usage:
+        return {"input_tokens": usage.get("input_tokens"), "output_tokens": usage.get("output_tokens"),
+                "tokens_estimated": False}
+    # provider gave no usage: ~4 characters per token
+    return {"input_tokens": len(prompt) // 4, "output_tokens": len(str(getattr(msg, "content", msg))) // 4,
+            "tokens_estimated": True}
+
+
+def grounding(text: str, herb_matcher: PhraseMatcher, facts: List[Dict[str, Any]],
+              avoid_map: Dict[str, List[str]]) -> Dict[str, Any]:
+    named = herb_matcher.find(text)
+    fact_herbs: Set[str] = {f["herb"] for f in facts}
+    grounded = [h for h in named if h in fact_herbs]
+    named_set = set(named)
+    pairs = [(h, a) for h in named for a in avoid_map.get(h, [])]
+    covered = [p for p in pairs if p[1] in named_set]
+    return {
+        "herbs": named,
+        "ungrounded_herbs": [h for h in named if h not in fact_herbs],
+        "grounding": len(grounded) / len(named) if named else None,
+        "interactions": len(pairs),
+        "interaction_coverage": len(covered) / len(pairs) if pairs else None,
+    }
+
+
+class EvalRunner:
+    def __init__(self, graph: AsyncGraphService, workers: int = 4, checkpoint: str = "eval_results.jsonl"):
+        self.graph = graph
+        self.workers = workers
+        self.checkpoint = checkpoint
+        llm = make_llm()
+        if llm is None:
+            raise RuntimeError("no LLM configured: set OPENAI_API_KEY (or LLM_FAKE=1)")
+        self.prompt = recommendation_prompt()
+        # prompt | llm without the output parser, so the message keeps its token usage
+        self.chain = self.prompt | llm
+        self._lock = asyncio.Lock()
+
+    async def run_one(self, p: Dict[str, Any], path: str, herb_matcher: PhraseMatcher) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        facts, avoid_map = await self.graph.recommendation_facts(p["symptoms"])
+        graph_ms = (time.perf_counter() - t0) * 1000.0
+        given_facts, given_avoid = (facts, avoid_map) if path == "llm_graph" else ([], {})
+        inputs = recommendation_inputs(p["age"], p["gender"], p["symptoms"], p["lifestyle"], given_facts, given_avoid)
+        t1 = time.perf_counter()
+        msg = await self.chain.ainvoke(inputs)
+        llm_ms = (time.perf_counter() - t1) * 1000.0
+        text = str(getattr(msg, "content", msg))
+        # both paths are judged against the graph facts, whether or not the model saw them
+        mentioned_avoid = await self.graph.contraindications(herb_matcher.find(text))
+        return {
+            "id": p["id"], "path": path, "error": None,
+            "latency_ms": (graph_ms if path == "llm_graph" else 0.0) + llm_ms,
+            "graph_ms": graph_ms if path == "llm_graph" else 0.0, "llm_ms": llm_ms,
+            **token_usage(msg, self.prompt.format(**inputs)),
+            **grounding(text, herb_matcher, facts, mentioned_avoid),
+            "text": text,
+        }
+
+    async def _record(self, result: Dict[str, Any]) -> None:
+        async with self._lock:
+            with open(self.checkpoint, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    async def run(self, prompts: List[Dict[str, Any]], paths=PATHS) -> List[Dict[str, Any]]:
+        done = read_checkpoint(self.checkpoint)
+        herbs = await self.graph.all_herbs()
+        herb_matcher = PhraseMatcher((h, h) for h in herbs)
+        todo = [(p, path) for p in prompts for path in paths if (p["id"], path) not in done]
+        sem = asyncio.Semaphore(self.workers)
+
+        async def task(p: Dict[str, Any], path: str) -> Dict[str, Any]:
+            async with sem:
+                try:
+                    r = await self.run_one(p, path, herb_matcher)
+                except Exception as e:
+                    r = {"id": p["id"], "path": path, "error": str(e) or type(e).__name__}
+                await self._record(r)
+                return r
+
+        fresh = await asyncio.gather(*(task(p, path) for p, path in todo))
+        wanted = {(p["id"], path) for p in prompts for path in paths}
+        return [r for k, r in done.items() if k in wanted] + list(fresh)
+
+
+def _mean(values: List[Optional[float]]) -> Optional[float]:
+    vals = [v for v in values if v is not None]
+    return statistics.mean(vals) if vals else None
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    out = {}
+    for path in PATHS:
+        rs = [r for r in results if r["path"] == path]
+        ok = [r for r in rs if r.get("error") is None]
+        if not rs:
+            continue
+        lat = sorted(r["latency_ms"] for r in ok)
+        out[path] = {
+            "runs": len(rs), "errors": len(rs) - len(ok),
+            "p50_ms": lat[len(lat) // 2] if lat else None,
+            "p95_ms": lat[min(len(lat) - 1, int(0.95 * len(lat)))] if lat else None,
+            "input_tokens": _mean([r["input_tokens"] for r in ok]),
+            "output_tokens": _mean([r["output_tokens"] for r in ok]),
+            "grounding": _mean([r["grounding"] for r in ok]),
+            "interaction_coverage": _mean([r["interaction_coverage"] for r in ok]),
+        }
+    return out
+
+
+def _fmt(v: Optional[float], spec: str) -> str:
+    return "-" if v is None else format(v, spec)
+
+
+async def amain(args) -> None:
+    graph = AsyncGraphService()
+    try:
+        runner = EvalRunner(graph, workers=args.workers, checkpoint=args.checkpoint)
+        results = await runner.run(load_prompts(args.prompts), paths=args.paths)
+    finally:
+        await graph.close()
+    print(f"{'path':<10}{'runs':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'in tok':>8}{'out tok':>8}"
+          f"{'grounded':>10}{'interact':>10}")
+    for path, s in summarize(results).items():
+        print(f"{path:<10}{s['runs']:>6}{s['errors']:>5}{_fmt(s['p50_ms'], '.0f'):>10}{_fmt(s['p95_ms'], '.0f'):>10}"
+              f"{_fmt(s['input_tokens'], '.0f'):>8}{_fmt(s['output_tokens'], '.0f'):>8}"
+              f"{_fmt(s['grounding'], '.2f'):>10}{_fmt(s['interaction_coverage'], '.2f'):>10}")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--prompts", default=DEFAULT_PROMPTS)
+    p.add_argument("--checkpoint", default="eval_results.jsonl", help="JSONL of finished runs; reruns resume from it")
+    p.add_argument("--workers", type=int, default=4, help="max concurrent LLM calls")
+    p.add_argument("--paths", nargs="+", choices=PATHS, default=list(PATHS))
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(amain(parse_args()))
@@ -0,0 +1,62 @@
+import asyncio
+import hashlib
+import random
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+VOCAB = ("herb", "support", "digestion", "sleep", "tea", "daily", "balance", "warm", "gentle", "evening",
+         "morning", "consult", "dose", "traditional", "avoid", "combine", "hydrate", "rest", "breath", "routine")
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic stand-in for ChatOpenAI (LLM_FAKE=1): same prompt, same text, after `latency` seconds.
+
+    Used by the benchmarks so runs measure the service, not the provider.
+    """
+    latency: float = 0.0
+    words: int = 80
+
+    @property
+    def _llm_type(self) -> str:
+        return "atreya-fake"
+
+    def _text(self, messages: List[BaseMessage]) -> str:
+        digest = hashlib.sha256("\n".join(str(m.content) for m in messages).encode("utf-8")).digest()
+        rnd = random.Random(digest)
+        return f"[fake {digest[:4].hex()}] " + " ".join(rnd.choice(VOCAB) for _ in range(self.words)) + "."
+
+    def _message(self, messages: List[BaseMessage]) -> AIMessage:
+        # word counts stand in for tokens so token accounting can be exercised offline
+        text = self._text(messages)
+        prompt_words = sum(len(str(m.content).split()) for m in messages)
+        return AIMessage(content=text, usage_metadata={"input_tokens": prompt_words, "output_tokens": len(text.split()),
+                                                       "total_tokens": prompt_words + len(text.split())})
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        # the latency is spread over the chunks, like a provider emitting tokens
+        chunks = self._text(messages).split(" ")
+        for w in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=w + " "))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        chunks = self._text(messages).split(" ")
+        for w in chunks:
+            await asyncio.sleep(self.latency / len(chunks))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=w + " "))
@@ -1,67 +1,615 @@
-from neo4j import GraphDatabase
-from typing import List, Dict, Any
+from neo4j import GraphDatabase, AsyncGraphDatabase
+from neo4j.exceptions import DriverError, Neo4jError
+from typing import List, Dict, Any, Optional, Tuple, Callable
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from ..utils.config import settings
+from ..utils.metrics import span
+from .snapshot import GraphSnapshot
+from .snapshot_store import SnapshotStore
+from .search import normalize, lucene_fuzzy_query
+from .diagnosis import ConditionScorer
+
+log = logging.getLogger(__name__)
+
+# errors of an unreachable or failing Neo4j; with a snapshot in hand these are logged and the snapshot served
+NEO4J_UNAVAILABLE = (Neo4jError, DriverError, OSError, TimeoutError, asyncio.TimeoutError, FutureTimeout)
+
+# (facts, avoid_map) as returned by recommendation_facts
+RecommendationFacts = Tuple[List[Dict[str, Any]], Dict[str, List[str]]]
+
+HERB_FULLTEXT_INDEX = "herb_name_ft"
+VERSION_QUERY = "MATCH (m:GraphMeta {id: 'atreya'}) RETURN m.version AS version"
+PING_QUERY = "RETURN 1 AS ok"
+
+# Cypher shared by the sync and async services
+
+# served by the text index on the normalized Herb.name_lc written by the loader
+SEARCH_HERBS = """
+MATCH (h:Herb)
+WHERE $q = '' OR h.name_lc CONTAINS $q
+WITH h, CASE
+    WHEN $q = '' OR h.name_lc = $q THEN 0
+    WHEN h.name_lc STARTS WITH $q THEN 1
+    WHEN h.name_lc CONTAINS (' ' + $q) THEN 2
+    ELSE 3 END AS rank
+RETURN h.name AS name, h.properties AS properties
+ORDER BY rank, name
+SKIP $offset LIMIT $limit
+"""
+
+SEARCH_HERBS_ANY = "MATCH (h:Herb) WHERE h.name_lc CONTAINS $q RETURN h LIMIT 1"
+
+SEARCH_HERBS_FUZZY = """
+CALL db.index.fulltext.queryNodes($index, $lucene) YIELD node, score
+RETURN node.name AS name, node.properties AS properties
+ORDER BY score DESC, name
+SKIP $offset LIMIT $limit
+"""
+
+# Find herbs linked to conditions that match symptoms
+HERBS_FOR_SYMPTOMS = """
+WITH $symptoms AS symptoms
+MATCH (c:Condition)-[:HAS_SYMPTOM]->(s:Symptom)
+WHERE toLower(s.name) IN [x IN symptoms | toLower(x)]
+MATCH (h:Herb)-[r:HELPS_WITH]->(c)
+RETURN h.name AS herb, c.name AS condition, r.evidence AS evidence, h.properties AS properties, s.name AS symptom
+"""
+
+# Herb-Herb interactions to avoid combos; INTERACTS_WITH is matched in both directions
+CONTRAINDICATIONS = """
+MATCH (h1:Herb)-[:INTERACTS_WITH]-(h2:Herb)
+WHERE toLower(h1.name) IN [x IN $herbs | toLower(x)]
+RETURN h1.name AS herb, collect(DISTINCT h2.name) AS avoid
+"""
+
+RECOMMENDATION_FACTS = """
+WITH [x IN $symptoms | toLower(x)] AS symptoms
+OPTIONAL MATCH (c:Condition)-[:HAS_SYMPTOM]->(s:Symptom)
+WHERE toLower(s.name) IN symptoms
+OPTIONAL MATCH (h:Herb)-[r:HELPS_WITH]->(c)
+WITH collect(CASE WHEN h IS NOT NULL THEN
+         {herb: h.name, condition: c.name, evidence: r.evidence, properties: h.properties, symptom: s.name} END) AS facts,
+     collect(DISTINCT h) AS herbs
+UNWIND (CASE WHEN herbs = [] THEN [null] ELSE herbs END) AS h
+OPTIONAL MATCH (h)-[:INTERACTS_WITH]-(h2:Herb)
+WITH facts, h, collect(DISTINCT h2.name) AS avoid
+RETURN facts, collect(CASE WHEN size(avoid) > 0 THEN {herb: h.name, avoid: avoid} END) AS interactions
+"""
+
+# RECOMMENDATION_FACTS for many symptom sets at once; one row per set index
+RECOMMENDATION_FACTS_MANY = """
+UNWIND range(0, size($sets) - 1) AS i
+WITH i, [x IN $sets[i] | toLower(x)] AS symptoms
+OPTIONAL MATCH (c:Condition)-[:HAS_SYMPTOM]->(s:Symptom)
+WHERE toLower(s.name) IN symptoms
+OPTIONAL MATCH (h:Herb)-[r:HELPS_WITH]->(c)
+WITH i, collect(CASE WHEN h IS NOT NULL THEN
+         {herb: h.name, condition: c.name, evidence: r.evidence, properties: h.properties, symptom: s.name} END) AS facts,
+     collect(DISTINCT h) AS herbs
+UNWIND (CASE WHEN herbs = [] THEN [null] ELSE herbs END) AS h
+OPTIONAL MATCH (h)-[:INTERACTS_WITH]-(h2:Herb)
+WITH i, facts, h, collect(DISTINCT h2.name) AS avoid
+RETURN i, facts, collect(CASE WHEN size(avoid) > 0 THEN {herb: h.name, avoid: avoid} END) AS interactions
+"""
+
+CONDITIONS_FROM_SYMPTOMS = """
+WITH $symptoms AS symptoms
+MATCH (c:Condition)-[:HAS_SYMPTOM]->(s:Symptom)
+WHERE toLower(s.name) IN [x IN symptoms | toLower(x)]
+RETURN DISTINCT c.name AS condition
+LIMIT 10
+"""
+
+ALL_SYMPTOMS = "MATCH (s:Symptom) RETURN s.name AS name ORDER BY name"
+ALL_HERBS = "MATCH (h:Herb) RETURN h.name AS name ORDER BY name"
+SYMPTOM_ALIASES = "MATCH (s:Symptom) WHERE s.aliases IS NOT NULL RETURN s.name AS name, s.aliases AS aliases"
+
+# every condition with its symptoms (null for none): input of the diagnosis likelihood tables
+CONDITION_SYMPTOMS = """
+MATCH (c:Condition)
+OPTIONAL MATCH (c)-[:HAS_SYMPTOM]->(s:Symptom)
+RETURN c.name AS condition, s.name AS symptom
+"""
+
+
+def _driver_options() -> Dict[str, Any]:
+    return {
+        "auth": (settings.neo4j_user, settings.neo4j_password),
+        "max_connection_pool_size": settings.neo4j_max_pool_size,
+        "connection_acquisition_timeout": settings.neo4j_acquisition_timeout,
+        "max_connection_lifetime": settings.neo4j_max_connection_lifetime,
+        "connection_timeout": settings.neo4j_connection_timeout,
+    }
+
+
+def _session_options() -> Dict[str, Any]:
+    return {"database": settings.neo4j_database} if settings.neo4j_database else {}
+
+
+def _snapshot_store() -> Optional[SnapshotStore]:
+    return SnapshotStore(settings.snapshot_share_dir, ttl=settings.graph_snapshot_ttl) if settings.snapshot_share_dir else None
+
+
+def _with_timeout(fn: Callable[[], Any], timeout: float) -> Any:
+    # the driver's query timeout does not bound acquiring or opening a connection, so an unreachable host
+    # could hold the caller for the whole connect window; stop waiting instead (the worker thread ends on its own)
+    pool = ThreadPoolExecutor(max_workers=1)
+    try:
+        return pool.submit(fn).result(timeout=timeout)
+    finally:
+        pool.shutdown(wait=False)
+
+
+def _pool_stats(in_use: int) -> Dict[str, Any]:
+    # sessions currently holding (or waiting for) a pooled connection
+    return {"in_use": in_use, "max_size": settings.neo4j_max_pool_size,
+            "saturated": in_use >= settings.neo4j_max_pool_size}
+
+
+def _herb_items(records) -> List[Dict[str, Any]]:
+    return [{"name": r["name"], "properties": r.get("properties", []) or []} for r in records]
+
+
+def _facts_many(records, n: int) -> List[RecommendationFacts]:
+    out: List[RecommendationFacts] = [([], {}) for _ in range(n)]
+    for r in records:
+        out[r["i"]] = (list(r["facts"]), {i["herb"]: i["avoid"] for i in r["interactions"]})
+    return out
+
+
+def _snapshot_facts(snap: GraphSnapshot, symptoms: List[str]) -> RecommendationFacts:
+    facts = snap.herbs_for_symptoms(symptoms)
+    return facts, snap.contraindications(list({f["herb"] for f in facts}))
+
+
+_UNSEEN = object()
+
+
+def _announce(service, version: Any) -> Any:
+    # with snapshots the rebuild notifies listeners once its data is in place; without them nothing is
+    # rebuilt, so a changed marker is passed on as soon as it is read
+    if not service.use_snapshot and version != service._announced_version:
+        service._announced_version = version
+        for listener in service.version_listeners:
+            listener(version)
+    return version
+
 
 class GraphService:
-    def __init__(self):
-        self.driver = GraphDatabase.driver(settings.neo4j_uri, auth=(settings.neo4j_user, settings.neo4j_password))
+    def __init__(self, snapshot: Optional[bool] = None):
+        self.driver = GraphDatabase.driver(settings.neo4j_uri, **_driver_options())
+        self._in_use = 0
+        self._in_use_lock = threading.Lock()
+        self.use_snapshot = settings.graph_snapshot if snapshot is None else snapshot
+        self._snapshot: Optional[GraphSnapshot] = None
+        self._snapshot_lock = threading.Lock()
+        self._version_checked_at = 0.0
+        self._retry_at = 0.0
+        self.store = _snapshot_store() if self.use_snapshot else None
+        # callables notified with the graph version whenever a snapshot is (re)built, or without snapshots
+        # whenever graph_version() reads a new marker (the symptom catalog polls it every CATALOG_POLL seconds)
+        self.version_listeners: List[Callable[[Any], None]] = []
+        self._announced_version: Any = _UNSEEN
+        self._scorer: Optional[ConditionScorer] = None
+        self._scorer_checked_at = 0.0
 
     def close(self):
         self.driver.close()
 
-    def search_herbs(self, q: str) -> List[Dict[str, Any]]:
-        query = """
-        MATCH (h:Herb)
-        WHERE toLower(h.name) CONTAINS toLower($q) OR $q = ''
-        RETURN h.name as name, h.properties as properties
-        ORDER BY name
-        LIMIT 50
+    def _read(self, work: Callable[[Any], Any]) -> Any:
+        """Run `work(tx)` in a managed read transaction (routed to a reader, retried on transient errors)."""
+        with self._in_use_lock:
+            self._in_use += 1
+        try:
+            with span("neo4j"), self.driver.session(**_session_options()) as session:
+                return session.execute_read(work)
+        finally:
+            with self._in_use_lock:
+                self._in_use -= 1
+
+    def _run(self, query: str, **params) -> List[Any]:
+        return self._read(lambda tx: list(tx.run(query, **params)))
+
+    # --- pool / readiness ---
+
+    def verify_connectivity(self) -> None:
+        self.driver.verify_connectivity()
+
+    def warm_up(self, connections: int = 0) -> None:
+        """Open `connections` pooled connections up front so the first requests skip the handshake."""
+        n = connections or settings.neo4j_pool_warmup
+        if n <= 0:
+            return
+        with ThreadPoolExecutor(max_workers=n) as pool:
+            list(pool.map(lambda _: self._run(PING_QUERY), range(n)))
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return _pool_stats(self._in_use)
+
+    def _ping(self) -> None:
+        # auto-commit, no retries: a down database is reported now, not after the retry budget
+        with self.driver.session(**_session_options()) as session:
+            session.run(PING_QUERY).consume()
+
+    def health(self) -> Dict[str, Any]:
+        try:
+            _with_timeout(self._ping, settings.neo4j_health_timeout)
+            db, error = "up", None
+        except Exception as e:
+            db, error = "down", str(e) or type(e).__name__
+        return {"database": db, "error": error, "pool": self.pool_stats(),
+                "snapshot_age": self._snapshot.age() if self.current_snapshot else None}
+
+    @property
+    def current_snapshot(self) -> Optional[GraphSnapshot]:
+        """Last built snapshot without any refresh check (None when snapshots are off)."""
+        return self._snapshot if self.use_snapshot else None
+
+    # --- snapshot ---
+
+    def graph_version(self) -> Any:
+        """Version marker written by graph/load_data.py after every load (None if never loaded)."""
+        return _announce(self, self._read(self._read_version))
+
+    @staticmethod
+    def _read_version(tx) -> Any:
+        r = tx.run(VERSION_QUERY).single()
+        return r["version"] if r else None
+
+    def _fetch_snapshot(self) -> GraphSnapshot:
+        # one read transaction: version and all snapshot queries see the same graph state
+        if self.store is None:
+            return self._read(lambda tx: GraphSnapshot.from_session(tx, version=self._read_version(tx)))
+        # multi-worker: the first worker to get the lock pulls the graph and publishes it, the rest load that
+        version = self.graph_version()
+        snap = self.store.load(version)
+        if snap is None:
+            with self.store.lock():
+                snap = self.store.load(version)
+                if snap is None:
+                    snap = self.store.save(
+                        self._read(lambda tx: GraphSnapshot.from_session(tx, version=self._read_version(tx))))
+        return snap
+
+    def _build_snapshot(self) -> GraphSnapshot:
+        snap = self._fetch_snapshot()
+        self._snapshot = snap
+        self._version_checked_at = time.monotonic()
+        for listener in self.version_listeners:
+            listener(snap.version)
+        return snap
+
+    def refresh_snapshot(self) -> GraphSnapshot:
+        """Rebuild the in-memory snapshot from Neo4j and swap it in."""
+        with self._snapshot_lock:
+            return self._build_snapshot()
+
+    def _refresh_stale(self, stale: Optional[GraphSnapshot]) -> GraphSnapshot:
+        # concurrent callers that all saw the same outdated snapshot trigger a single rebuild
+        with self._snapshot_lock:
+            if self._snapshot is not stale:
+                return self._snapshot
+            return self._build_snapshot()
+
+    def snapshot(self) -> Optional[GraphSnapshot]:
+        """Current snapshot, rebuilt when older than the TTL or when the loader bumped the graph version.
+
+        While Neo4j is unreachable the last snapshot keeps being served; contact is retried once per
+        GRAPH_VERSION_POLL instead of on every request.
         """
-        with self.driver.session() as session:
-            res = session.run(query, q=q)
-            return [{"name": r["name"], "properties": r.get("properties", []) or []} for r in res]
+        if not self.use_snapshot:
+            return None
+        snap = self._snapshot
+        if snap is None:
+            return self._refresh_stale(snap)
+        if time.monotonic() < self._retry_at:
+            return snap
+        expired = snap.age() > settings.graph_snapshot_ttl
+        if not expired and time.monotonic() - self._version_checked_at <= settings.graph_version_poll:
+            return snap
+        try:
+            # a bounded version read first, so a down database costs one short wait rather than the retry window
+            self._version_checked_at = time.monotonic()
+            if _with_timeout(self.graph_version, settings.neo4j_health_timeout) != snap.version or expired:
+                return self._refresh_stale(snap)
+        except NEO4J_UNAVAILABLE as e:
+            self._retry_at = time.monotonic() + settings.graph_version_poll
+            log.warning("Neo4j unavailable, serving the snapshot of version %s: %s", snap.version, e or type(e).__name__)
+        return snap
+
+    # --- queries ---
+
+    def search_herbs(self, q: str, limit: int = 50, offset: int = 0, fuzzy: bool = True) -> List[Dict[str, Any]]:
+        """Ranked herb search: exact, prefix, word prefix, substring; typo-tolerant if nothing matches literally."""
+        snap = self.snapshot()
+        if snap is not None:
+            return snap.search_herbs(q, limit=limit, offset=offset, fuzzy=fuzzy)
+        q = normalize(q)
+        lucene = lucene_fuzzy_query(q) if fuzzy else ""
+
+        def work(tx):
+            res = list(tx.run(SEARCH_HERBS, q=q, offset=offset, limit=limit))
+            if not res and lucene:
+                # an empty page past the end of the literal matches must not fall through to fuzzy results
+                if offset and tx.run(SEARCH_HERBS_ANY, q=q).single():
+                    return []
+                res = tx.run(SEARCH_HERBS_FUZZY, index=HERB_FULLTEXT_INDEX, lucene=lucene, offset=offset, limit=limit)
+            return _herb_items(res)
+        return self._read(work)
 
     def herbs_for_symptoms(self, symptoms: List[str]) -> List[Dict[str, Any]]:
-        # Find herbs linked to conditions that match symptoms
-        query = """
-        WITH $symptoms AS symptoms
-        MATCH (c:Condition)-[:HAS_SYMPTOM]->(s:Symptom)
-        WHERE toLower(s.name) IN [x IN symptoms | toLower(x)]
-        MATCH (h:Herb)-[r:HELPS_WITH]->(c)
-        RETURN h.name AS herb, c.name AS condition, r.evidence AS evidence, h.properties AS properties
-        """
-        with self.driver.session() as session:
-            res = session.run(query, symptoms=symptoms)
-            return [dict(r) for r in res]
+        snap = self.snapshot()
+        if snap is not None:
+            return snap.herbs_for_symptoms(symptoms)
+        return [dict(r) for r in self._run(HERBS_FOR_SYMPTOMS, symptoms=symptoms)]
 
     def contraindications(self, herbs: List[str]) -> Dict[str, List[str]]:
-        # Herb-Herb interactions to avoid combos
-        query = """
-        MATCH (h1:Herb)-[:INTERACTS_WITH]->(h2:Herb)
-        WHERE toLower(h1.name) IN [x IN $herbs | toLower(x)]
-        RETURN h1.name AS herb, collect(DISTINCT h2.name) AS avoid
-        """
-        with self.driver.session() as session:
-            res = session.run(query, herbs=herbs)
-            m = {}
-            for r in res:
-                m[r["herb"]] = r["avoid"]
-            return m
+        snap = self.snapshot()
+        if snap is not None:
+            return snap.contraindications(herbs)
+        return {r["herb"]: r["avoid"] for r in self._run(CONTRAINDICATIONS, herbs=herbs)}
+
+    def recommendation_facts(self, symptoms: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+        """herbs_for_symptoms + contraindications of the matched herbs in a single round trip."""
+        snap = self.snapshot()
+        if snap is not None:
+            return _snapshot_facts(snap, symptoms)
+        r = self._run(RECOMMENDATION_FACTS, symptoms=symptoms)[0]
+        return list(r["facts"]), {i["herb"]: i["avoid"] for i in r["interactions"]}
+
+    def recommendation_facts_many(self, symptom_sets: List[List[str]]) -> List[RecommendationFacts]:
+        """recommendation_facts for every symptom set in one UNWIND query, in input order."""
+        if not symptom_sets:
+            return []
+        snap = self.snapshot()
+        if snap is not None:
+            return [_snapshot_facts(snap, s) for s in symptom_sets]
+        return _facts_many(self._run(RECOMMENDATION_FACTS_MANY, sets=symptom_sets), len(symptom_sets))
 
     def conditions_from_symptoms(self, symptoms: List[str]) -> List[str]:
-        query = """
-        WITH $symptoms AS symptoms
-        MATCH (c:Condition)-[:HAS_SYMPTOM]->(s:Symptom)
-        WHERE toLower(s.name) IN [x IN symptoms | toLower(x)]
-        RETURN DISTINCT c.name AS condition
-        LIMIT 10
-        """
-        with self.driver.session() as session:
-            res = session.run(query, symptoms=symptoms)
-            return [r["condition"] for r in res]
+        snap = self.snapshot()
+        if snap is not None:
+            return snap.conditions_from_symptoms(symptoms)
+        return [r["condition"] for r in self._run(CONDITIONS_FROM_SYMPTOMS, symptoms=symptoms)]
+
+    def condition_scorer(self) -> ConditionScorer:
+        """Diagnosis likelihood tables: from the snapshot, or loaded once and reloaded when the graph version changes."""
+        snap = self.snapshot()
+        if snap is not None:
+            return snap.condition_scorer
+        if self._scorer is None or time.monotonic() - self._scorer_checked_at > settings.graph_version_poll:
+            self._scorer_checked_at = time.monotonic()
+            version = self.graph_version()
+            if self._scorer is None or self._scorer.version != version:
+                pairs = [(r["condition"], r["symptom"]) for r in self._run(CONDITION_SYMPTOMS)]
+                self._scorer = ConditionScorer(pairs, version=version)
+        return self._scorer
 
     def all_symptoms(self) -> List[str]:
-        query = "MATCH (s:Symptom) RETURN s.name AS name ORDER BY name"
-        with self.driver.session() as session:
-            res = session.run(query)
-            return [r["name"] for r in res]
+        snap = self.snapshot()
+        if snap is not None:
+            return snap.all_symptoms()
+        return [r["name"] for r in self._run(ALL_SYMPTOMS)]
+
+    def all_herbs(self) -> List[str]:
+        snap = self.snapshot()
+        if snap is not None:
+            return snap.all_herbs()
+        return [r["name"] for r in self._run(ALL_HERBS)]
+
+    def symptom_aliases(self) -> Dict[str, List[str]]:
+        snap = self.snapshot()
+        if snap is not None:
+            return snap.symptom_aliases()
+        return {r["name"]: list(r["aliases"]) for r in self._run(SYMPTOM_ALIASES) if r["aliases"]}
+
+
+class AsyncGraphService:
+    """Same queries as GraphService on the async Neo4j driver, for `async def` routes."""
+
+    def __init__(self, snapshot: Optional[bool] = None):
+        self.driver = AsyncGraphDatabase.driver(settings.neo4j_uri, **_driver_options())
+        self._in_use = 0
+        self.use_snapshot = settings.graph_snapshot if snapshot is None else snapshot
+        self._snapshot: Optional[GraphSnapshot] = None
+        self._snapshot_lock = asyncio.Lock()
+        self._version_checked_at = 0.0
+        self._retry_at = 0.0
+        self.store = _snapshot_store() if self.use_snapshot else None
+        self.version_listeners: List[Callable[[Any], None]] = []
+        self._announced_version: Any = _UNSEEN
+        self._scorer: Optional[ConditionScorer] = None
+        self._scorer_checked_at = 0.0
+
+    async def close(self):
+        await self.driver.close()
+
+    @property
+    def current_snapshot(self) -> Optional[GraphSnapshot]:
+        return self._snapshot if self.use_snapshot else None
+
+    async def _read(self, work: Callable[[Any], Any]) -> Any:
+        self._in_use += 1
+        try:
+            with span("neo4j"):
+                async with self.driver.session(**_session_options()) as session:
+                    return await session.execute_read(work)
+        finally:
+            self._in_use -= 1
+
+    async def _run(self, query: str, **params) -> List[Any]:
+        async def work(tx):
+            res = await tx.run(query, **params)
+            return [r async for r in res]
+        return await self._read(work)
+
+    # --- pool / readiness ---
+
+    async def verify_connectivity(self) -> None:
+        await self.driver.verify_connectivity()
+
+    async def warm_up(self, connections: int = 0) -> None:
+        await asyncio.gather(*(self._run(PING_QUERY) for _ in range(connections or settings.neo4j_pool_warmup)))
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return _pool_stats(self._in_use)
+
+    async def _ping(self) -> None:
+        async with self.driver.session(**_session_options()) as session:
+            await (await session.run(PING_QUERY)).consume()
+
+    async def health(self) -> Dict[str, Any]:
+        try:
+            await asyncio.wait_for(self._ping(), settings.neo4j_health_timeout)
+            db, error = "up", None
+        except Exception as e:
+            db, error = "down", str(e) or type(e).__name__
+        return {"database": db, "error": error, "pool": self.pool_stats(),
+                "snapshot_age": self._snapshot.age() if self.current_snapshot else None}
+
+    # --- snapshot ---
+
+    async def graph_version(self) -> Any:
+        rows = await self._run(VERSION_QUERY)
+        return _announce(self, rows[0]["version"] if rows else None)
+
+    async def _fetch_snapshot(self) -> GraphSnapshot:
+        async def work(tx):
+            r = await (await tx.run(VERSION_QUERY)).single()
+            return r["version"] if r else None, await GraphSnapshot.afetch_rows(tx)
+        if self.store is None:
+            version, rows = await self._read(work)
+            return GraphSnapshot.from_rows(rows, version=version)
+        version = await self.graph_version()
+        snap = await asyncio.to_thread(self.store.load, version)
+        if snap is not None:
+            return snap
+        fd = await asyncio.to_thread(self.store.acquire)
+        try:
+            snap = await asyncio.to_thread(self.store.load, version)
+            if snap is None:
+                version, rows = await self._read(work)
+                snap = await asyncio.to_thread(self.store.save, GraphSnapshot.from_rows(rows, version=version))
+        finally:
+            self.store.release(fd)
+        return snap
+
+    async def _build_snapshot(self) -> GraphSnapshot:
+        snap = await self._fetch_snapshot()
+        self._snapshot = snap
+        self._version_checked_at = time.monotonic()
+        for listener in self.version_listeners:
+            listener(snap.version)
+        return snap
+
+    async def refresh_snapshot(self) -> GraphSnapshot:
+        async with self._snapshot_lock:
+            return await self._build_snapshot()
+
+    async def _refresh_stale(self, stale: Optional[GraphSnapshot]) -> GraphSnapshot:
+        async with self._snapshot_lock:
+            if self._snapshot is not stale:
+                return self._snapshot
+            return await self._build_snapshot()
+
+    async def snapshot(self) -> Optional[GraphSnapshot]:
+        if not self.use_snapshot:
+            return None
+        snap = self._snapshot
+        if snap is None:
+            return await self._refresh_stale(snap)
+        if time.monotonic() < self._retry_at:
+            return snap
+        expired = snap.age() > settings.graph_snapshot_ttl
+        if not expired and time.monotonic() - self._version_checked_at <= settings.graph_version_poll:
+            return snap
+        try:
+            self._version_checked_at = time.monotonic()
+            if await asyncio.wait_for(self.graph_version(), settings.neo4j_health_timeout) != snap.version or expired:
+                return await self._refresh_stale(snap)
+        except NEO4J_UNAVAILABLE as e:
+            self._retry_at = time.monotonic() + settings.graph_version_poll
+            log.warning("Neo4j unavailable, serving the snapshot of version %s: %s", snap.version, e or type(e).__name__)
+        return snap
+
+    # --- queries ---
+
+    async def search_herbs(self, q: str, limit: int = 50, offset: int = 0, fuzzy: bool = True) -> List[Dict[str, Any]]:
+        snap = await self.snapshot()
+        if snap is not None:
+            return snap.search_herbs(q, limit=limit, offset=offset, fuzzy=fuzzy)
+        q = normalize(q)
+        res = await self._run(SEARCH_HERBS, q=q, offset=offset, limit=limit)
+        lucene = lucene_fuzzy_query(q) if fuzzy else ""
+        if not res and lucene:
+            if offset and await self._run(SEARCH_HERBS_ANY, q=q):
+                return []
+            res = await self._run(SEARCH_HERBS_FUZZY, index=HERB_FULLTEXT_INDEX, lucene=lucene, offset=offset, limit=limit)
+        return _herb_items(res)
+
+    async def herbs_for_symptoms(self, symptoms: List[str]) -> List[Dict[str, Any]]:
+        snap = await self.snapshot()
+        if snap is not None:
+            return snap.herbs_for_symptoms(symptoms)
+        return [dict(r) for r in await self._run(HERBS_FOR_SYMPTOMS, symptoms=symptoms)]
+
+    async def contraindications(self, herbs: List[str]) -> Dict[str, List[str]]:
+        snap = await self.snapshot()
+        if snap is not None:
+            return snap.contraindications(herbs)
+        return {r["herb"]: r["avoid"] for r in await self._run(CONTRAINDICATIONS, herbs=herbs)}
+
+    async def recommendation_facts(self, symptoms: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+        snap = await self.snapshot()
+        if snap is not None:
+            return _snapshot_facts(snap, symptoms)
+        r = (await self._run(RECOMMENDATION_FACTS, symptoms=symptoms))[0]
+        return list(r["facts"]), {i["herb"]: i["avoid"] for i in r["interactions"]}
+
+    async def recommendation_facts_many(self, symptom_sets: List[List[str]]) -> List[RecommendationFacts]:
+        if not symptom_sets:
+            return []
+        snap = await self.snapshot()
+        if snap is not None:
+            return [_snapshot_facts(snap, s) for s in symptom_sets]
+        return _facts_many(await self._run(RECOMMENDATION_FACTS_MANY, sets=symptom_sets), len(symptom_sets))
+
+    async def conditions_from_symptoms(self, symptoms: List[str]) -> List[str]:
+        snap = await self.snapshot()
+        if snap is not None:
+            return snap.conditions_from_symptoms(symptoms)
+        return [r["condition"] for r in await self._run(CONDITIONS_FROM_SYMPTOMS, symptoms=symptoms)]
+
+    async def condition_scorer(self) -> ConditionScorer:
+        snap = await self.snapshot()
+        if snap is not None:
+            return snap.condition_scorer
+        if self._scorer is None or time.monotonic() - self._scorer_checked_at > settings.graph_version_poll:
+            self._scorer_checked_at = time.monotonic()
+            version = await self.graph_version()
+            if self._scorer is None or self._scorer.version != version:
+                pairs = [(r["condition"], r["symptom"]) for r in await self._run(CONDITION_SYMPTOMS)]
+                self._scorer = ConditionScorer(pairs, version=version)
+        return self._scorer
+
+    async def all_symptoms(self) -> List[str]:
+        snap = await self.snapshot()
+        if snap is not None:
+            return snap.all_symptoms()
+        return [r["name"] for r in await self._run(ALL_SYMPTOMS)]
+
+    async def all_herbs(self) -> List[str]:
+        snap = await self.snapshot()
+        if snap is not None:
+            return snap.all_herbs()
+        return [r["name"] for r in await self._run(ALL_HERBS)]
+
+    async def symptom_aliases(self) -> Dict[str, List[str]]:
+        snap = await self.snapshot()
+        if snap is not None:
+            return snap.symptom_aliases()
+        return {r["name"]: list(r["aliases"]) for r in await self._run(SYMPTOM_ALIASES) if r["aliases"]}
@@ -0,0 +1,466 @@
+"""Offline graph artifact: the whole knowledge graph as integer-coded arrays in one uncompressed `.npz`.
+
+Written by `graph/load_data.py --export` (from Neo4j, or straight from the CSVs with `--from-csv`) and
+served by ArtifactGraphService without any Neo4j server (GRAPH_ARTIFACT=path.npz). Every array is
+memory-mapped in place, so opening takes milliseconds and all workers share one copy through the page cache.
+
+Layout (all names are ids into one string table; herbs come first, so herb i is string i):
+  str_offsets, str_data           UTF-8 string table: string i is str_data[str_offsets[i]:str_offsets[i + 1]]
+  herb_props_ptr, herb_props      properties per herb (CSR); herb_props_null marks herbs stored with none
+  symptoms                        every Symptom node, sorted
+  alias_ptr, aliases              Symptom.aliases per entry of `symptoms` (CSR)
+  hs_symptoms, hs_ptr, hs_cond    HAS_SYMPTOM grouped by symptom (CSR symptom -> conditions)
+  hs_hash                         open-addressing table crc32(lower(symptom)) -> hs_symptoms position
+  herb_hash                       same for lower(herb) -> herb id
+  ch_conds, ch_ptr, ch_herbs, ch_evidence   HELPS_WITH by condition (sorted ids, CSR; evidence -1 = null)
+  inter_ptr, inter                INTERACTS_WITH in both directions per herb (CSR)
+  ranker_herbs, interaction_bits  the ranker's herb order and packed interaction bitset
+  ranker_symptoms, ranker_conditions, rank_{A,E,SH}_{ptr,idx,val}   the ranker's other axes and CSR matrices
+                                  (optional: artifacts without them rebuild the matrices on first use)
+  meta                            JSON: format, graph version, time the snapshot was built
+Adjacency lists keep GraphSnapshot's order, so every query returns exactly what the snapshot returns.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import json
+import os
+import struct
+import time
+import zipfile
+import zlib
+import numpy as np
+from ..utils.config import settings
+from .diagnosis import ConditionScorer
+from .interactions import InteractionIndex
+from .ranking import HerbRanker
+from .search import HerbSearchIndex
+from .snapshot import GraphSnapshot
+
+FORMAT = 2
+EMPTY = -1
+
+
+def _hash(text: str) -> int:
+    return zlib.crc32(text.lower().encode("utf-8"))
+
+
+def _hash_table(keys: List[str]) -> np.ndarray:
+    size = 8
+    while size < 2 * len(keys):
+        size *= 2
+    table = np.full(size, EMPTY, dtype=np.int32)
+    for i, key in enumerate(keys):
+        slot = _hash(key) & (size - 1)
+        while table[slot] != EMPTY:
+            slot = (slot + 1) & (size - 1)
+        table[slot] = i
+    return table
+
+
+def _csr(lists: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    ptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(x) for x in lists])
+    flat = np.fromiter((v for x in lists for v in x), dtype=np.int32, count=int(ptr[-1]))
+    return ptr, flat
+
+
+def write_artifact(path: str, snap: GraphSnapshot) -> Dict[str, int]:
+    """Serialize a snapshot's graph to `path` (write-then-rename); returns array sizes for the log."""
+    strings: Dict[str, int] = {}
+
+    def sid(s: str) -> int:
+        return strings.setdefault(s, len(strings))
+
+    for h in snap.herb_names:
+        sid(h)
+    herb_props = [[sid(p) for p in snap.herb_properties[h] or []] for h in snap.herb_names]
+    symptoms = [sid(s) for s in snap.symptom_names]
+    aliases = [[sid(a) for a in snap.aliases.get(s, [])] for s in snap.symptom_names]
+    groups = [entry for entries in snap.symptom_conditions.values() for entry in entries]
+    hs_cond = [[sid(c) for c in conds] for _, conds in groups]
+    conds = sorted(snap.condition_herbs, key=sid)
+    ch_herbs = [[sid(h) for h, _ in snap.condition_herbs[c]] for c in conds]
+    ch_evidence = [[EMPTY if e is None else sid(str(e)) for _, e in snap.condition_herbs[c]] for c in conds]
+    herb_id = {h: i for i, h in enumerate(snap.herb_names)}
+    inter = [[herb_id[o] for o in snap.interactions.get(h, []) if o in herb_id] for h in snap.herb_names]
+    ranker = snap.ranker
+
+    blobs = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in blobs])
+    arrays = {
+        "meta": np.frombuffer(json.dumps({"format": FORMAT, "version": snap.version, "created": snap.created},
+                                         default=str).encode("utf-8"), dtype=np.uint8),
+        "str_offsets": offsets,
+        "str_data": np.frombuffer(b"".join(blobs), dtype=np.uint8),
+        "herb_props_null": np.array([snap.herb_properties[h] is None for h in snap.herb_names], dtype=bool),
+        "symptoms": np.array(symptoms, dtype=np.int32),
+        "hs_symptoms": np.array([sid(s) for s, _ in groups], dtype=np.int32),
+        "hs_hash": _hash_table([s for s, _ in groups]),
+        "herb_hash": _hash_table(snap.herb_names),
+        "ch_conds": np.array([sid(c) for c in conds], dtype=np.int32),
+        "ranker_herbs": np.array([sid(h) for h in ranker.herbs], dtype=np.int32),
+        "ranker_symptoms": np.array([sid(s) for s in ranker.symptoms], dtype=np.int32),
+        "ranker_conditions": np.array([sid(c) for c in ranker.conditions], dtype=np.int32),
+        "interaction_bits": np.ascontiguousarray(ranker.I.bits),
+    }
+    arrays.update({f"rank_{name}": values for name, values in ranker.arrays().items()})
+    arrays["herb_props_ptr"], arrays["herb_props"] = _csr(herb_props)
+    arrays["alias_ptr"], arrays["aliases"] = _csr(aliases)
+    arrays["hs_ptr"], arrays["hs_cond"] = _csr(hs_cond)
+    arrays["ch_ptr"], arrays["ch_herbs"] = _csr(ch_herbs)
+    arrays["ch_evidence"] = _csr(ch_evidence)[1]
+    arrays["inter_ptr"], arrays["inter"] = _csr(inter)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        # np.savez stores members uncompressed, which is what lets the reader map them in place
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+    return {"strings": len(strings), "herbs": len(snap.herb_names), "symptoms": len(symptoms),
+            "conditions": len(conds), "interactions": len(arrays["inter"]) // 2, "bytes": os.path.getsize(path)}
+
+
+def _mmap_npz(path: str) -> Dict[str, np.ndarray]:
+    """Memory-map every member of an uncompressed .npz (np.load only maps plain .npy files)."""
+    out = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"{path}: member {info.filename} is compressed and cannot be memory-mapped")
+            f.seek(info.header_offset)
+            name_len, extra_len = struct.unpack("<HH", f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            major, _ = np.lib.format.read_magic(f)
+            read_header = np.lib.format.read_array_header_1_0 if major == 1 else np.lib.format.read_array_header_2_0
+            shape, fortran, dtype = read_header(f)
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if int(np.prod(shape)) == 0:
+                out[name] = np.empty(shape, dtype=dtype)
+            else:
+                out[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                                      order="F" if fortran else "C")
+    return out
+
+
+class ArtifactGraph:
+    """Read-only graph over a memory-mapped artifact, with GraphSnapshot's query methods and results.
+
+    Nothing is decoded up front. Lookups hash the lowercased name and walk CSR slices of the mapped
+    arrays. The ranker wraps the mapped matrices and bitset; only its name lists and symptom lookup are
+    per process. The herb search index and diagnosis tables are built on first use, like the snapshot's.
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], path: str = ""):
+        self.path = path
+        self.a = arrays
+        meta = json.loads(bytes(arrays["meta"]).decode("utf-8"))
+        if meta.get("format") != FORMAT:
+            raise ValueError(f"{path}: unsupported artifact format {meta.get('format')}")
+        self.version = meta["version"]
+        # wall-clock build time of the graph it was written from, so age() survives reopening the file
+        self.created = meta["created"]
+        self.n_herbs = len(arrays["herb_props_null"])
+        self._herb_index: Optional[HerbSearchIndex] = None
+        self._herb_ids: Dict[str, int] = {}
+        self._ranker: Optional[HerbRanker] = None
+        self._condition_scorer: Optional[ConditionScorer] = None
+
+    @classmethod
+    def open(cls, path: str) -> "ArtifactGraph":
+        return cls(_mmap_npz(path), path)
+
+    def age(self) -> float:
+        return max(0.0, time.time() - self.created)
+
+    # --- decoding ---
+
+    def _str(self, i: int) -> str:
+        o = self.a["str_offsets"]
+        return bytes(self.a["str_data"][o[i]:o[i + 1]]).decode("utf-8")
+
+    def _strs(self, ids) -> List[str]:
+        return [self._str(int(i)) for i in ids]
+
+    def _lookup(self, table: str, key: str, name_ids: Optional[np.ndarray] = None) -> List[int]:
+        # every entry whose lowercased name equals `key`, in entry order; entry i is string name_ids[i] (or i)
+        t = self.a[table]
+        mask = len(t) - 1
+        slot = _hash(key) & mask
+        hits = []
+        while t[slot] != EMPTY:
+            i = int(t[slot])
+            if self._str(i if name_ids is None else int(name_ids[i])).lower() == key:
+                hits.append(i)
+            slot = (slot + 1) & mask
+        return sorted(hits)
+
+    def _slice(self, ptr: str, values: str, i: int) -> np.ndarray:
+        p = self.a[ptr]
+        return self.a[values][p[i]:p[i + 1]]
+
+    def _properties(self, herb: int) -> Optional[List[str]]:
+        if self.a["herb_props_null"][herb]:
+            return None
+        return self._strs(self._slice("herb_props_ptr", "herb_props", herb))
+
+    def _matching_symptoms(self, symptoms: List[str]):
+        for key in dict.fromkeys(s.lower() for s in symptoms):
+            for g in self._lookup("hs_hash", key, self.a["hs_symptoms"]):
+                yield self._str(int(self.a["hs_symptoms"][g])), self._slice("hs_ptr", "hs_cond", g)
+
+    def _condition_herbs(self, cond: int) -> List[Tuple[int, Any]]:
+        conds = self.a["ch_conds"]
+        j = int(np.searchsorted(conds, cond))
+        if j == len(conds) or conds[j] != cond:
+            return []
+        p = self.a["ch_ptr"]
+        return list(zip(self.a["ch_herbs"][p[j]:p[j + 1]].tolist(), self.a["ch_evidence"][p[j]:p[j + 1]].tolist()))
+
+    # --- GraphSnapshot queries ---
+
+    def search_herbs(self, q: str, limit: int = 50, offset: int = 0, fuzzy: bool = True) -> List[Dict[str, Any]]:
+        if self._herb_index is None:
+            names = self.all_herbs()
+            self._herb_ids = {h: i for i, h in enumerate(names)}
+            self._herb_index = HerbSearchIndex(names)
+        return [{"name": n, "properties": self._properties(self._herb_ids[n]) or []}
+                for n, _ in self._herb_index.search(q, limit=limit, offset=offset, fuzzy=fuzzy)]
+
+    def herbs_for_symptoms(self, symptoms: List[str]) -> List[Dict[str, Any]]:
+        out = []
+        for sym, conds in self._matching_symptoms(symptoms):
+            for c in conds.tolist():
+                cond = self._str(c)
+                for herb, evidence in self._condition_herbs(c):
+                    out.append({"herb": self._str(herb), "condition": cond,
+                                "evidence": None if evidence == EMPTY else self._str(evidence),
+                                "properties": self._properties(herb), "symptom": sym})
+        return out
+
+    def contraindications(self, herbs: List[str]) -> Dict[str, List[str]]:
+        m = {}
+        for key in dict.fromkeys(h.lower() for h in herbs):
+            for i in self._lookup("herb_hash", key):
+                avoid = self._slice("inter_ptr", "inter", i)
+                if len(avoid):
+                    m[self._str(i)] = self._strs(avoid)
+        return m
+
+    def recommendation_facts(self, symptoms: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+        facts = self.herbs_for_symptoms(symptoms)
+        return facts, self.contraindications(list({f["herb"] for f in facts}))
+
+    def conditions_from_symptoms(self, symptoms: List[str]) -> List[str]:
+        seen = {}
+        for _, conds in self._matching_symptoms(symptoms):
+            for c in conds.tolist():
+                seen.setdefault(self._str(c), None)
+        return list(seen)[:10]
+
+    def all_symptoms(self) -> List[str]:
+        return self._strs(self.a["symptoms"])
+
+    def all_herbs(self) -> List[str]:
+        return self._strs(range(self.n_herbs))
+
+    def symptom_aliases(self) -> Dict[str, List[str]]:
+        out = {}
+        for i, s in enumerate(self.a["symptoms"].tolist()):
+            aliases = self._slice("alias_ptr", "aliases", i)
+            if len(aliases):
+                out[self._str(s)] = self._strs(aliases)
+        return out
+
+    def _has_symptom(self) -> List[Tuple[str, str]]:
+        pairs = []
+        for g, s in enumerate(self.a["hs_symptoms"].tolist()):
+            sym = self._str(s)
+            pairs += [(c, sym) for c in self._strs(self._slice("hs_ptr", "hs_cond", g))]
+        return pairs
+
+    @property
+    def ranker(self) -> HerbRanker:
+        if self._ranker is None and "rank_A_ptr" in self.a:
+            index = InteractionIndex.from_bits(self._strs(self.a["ranker_herbs"]), self.a["interaction_bits"])
+            arrays = {k[len("rank_"):]: v for k, v in self.a.items() if k.startswith("rank_")}
+            self._ranker = HerbRanker.from_arrays(self._strs(self.a["ranker_symptoms"]),
+                                                  self._strs(self.a["ranker_conditions"]),
+                                                  index.herbs, arrays, index)
+        if self._ranker is None:
+            helps = [(self._str(h), self._str(c), None if e == EMPTY else self._str(e))
+                     for c in self.a["ch_conds"].tolist()
+                     for h, e in self._condition_herbs(c)]
+            inter = [(self._str(i), self._str(o)) for i in range(self.n_herbs)
+                     for o in self._slice("inter_ptr", "inter", i).tolist()]
+            # the mapped bitset is shared; only the symptom/condition matrices are built per process
+            index = InteractionIndex.from_bits(self._strs(self.a["ranker_herbs"]), self.a["interaction_bits"])
+            self._ranker = HerbRanker(self._has_symptom(), helps, inter, interactions=index)
+        return self._ranker
+
+    @property
+    def condition_scorer(self) -> ConditionScorer:
+        if self._condition_scorer is None:
+            self._condition_scorer = ConditionScorer(self._has_symptom(), version=self.version)
+        return self._condition_scorer
+
+
+def _file_id(path: str) -> Tuple[int, int, int]:
+    st = os.stat(path)
+    return st.st_ino, st.st_size, st.st_mtime_ns
+
+
+class ArtifactGraphService:
+    """GraphService API answered from a graph artifact (GRAPH_ARTIFACT) instead of Neo4j.
+
+    The exporter replaces the file atomically; a new file is picked up within GRAPH_VERSION_POLL seconds.
+    Version listeners hear of each version on the first read that serves it, so ones attached after
+    construction still learn the initial version.
+    """
+
+    use_snapshot = True
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.graph_artifact
+        self.version_listeners: List[Callable[[Any], None]] = []
+        self._file = _file_id(self.path)
+        self._snapshot = ArtifactGraph.open(self.path)
+        self._checked_at = time.monotonic()
+        self._announced: Any = None
+
+    def _current(self) -> ArtifactGraph:
+        if time.monotonic() - self._checked_at > settings.graph_version_poll:
+            self._checked_at = time.monotonic()
+            try:
+                file = _file_id(self.path)
+                if file != self._file:
+                    self._snapshot, self._file = ArtifactGraph.open(self.path), file
+            except (OSError, ValueError, KeyError):
+                pass  # keep serving the mapped artifact until a complete new one is readable
+        snap = self._snapshot
+        if snap.version != self._announced:
+            self._announced = snap.version
+            for listener in self.version_listeners:
+                listener(snap.version)
+        return snap
+
+    @property
+    def current_snapshot(self) -> ArtifactGraph:
+        return self._snapshot
+
+    def snapshot(self) -> ArtifactGraph:
+        return self._current()
+
+    def refresh_snapshot(self) -> ArtifactGraph:
+        self._checked_at = 0.0
+        return self._current()
+
+    def graph_version(self) -> Any:
+        return self._current().version
+
+    def close(self) -> None:
+        pass
+
+    def verify_connectivity(self) -> None:
+        _file_id(self.path)
+
+    def warm_up(self, connections: int = 0) -> None:
+        pass
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return {"in_use": 0, "max_size": 0, "saturated": False}
+
+    def health(self) -> Dict[str, Any]:
+        try:
+            _file_id(self.path)
+            db, error = "up", None
+        except OSError as e:
+            db, error = "down", str(e)
+        return {"database": db, "error": error, "pool": self.pool_stats(), "snapshot_age": self._snapshot.age(),
+                "artifact": self.path}
+
+    def search_herbs(self, q: str, limit: int = 50, offset: int = 0, fuzzy: bool = True) -> List[Dict[str, Any]]:
+        return self._current().search_herbs(q, limit=limit, offset=offset, fuzzy=fuzzy)
+
+    def herbs_for_symptoms(self, symptoms: List[str]) -> List[Dict[str, Any]]:
+        return self._current().herbs_for_symptoms(symptoms)
+
+    def contraindications(self, herbs: List[str]) -> Dict[str, List[str]]:
+        return self._current().contraindications(herbs)
+
+    def recommendation_facts(self, symptoms: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+        return self._current().recommendation_facts(symptoms)
+
+    def recommendation_facts_many(self, symptom_sets: List[List[str]]):
+        snap = self._current()
+        return [snap.recommendation_facts(s) for s in symptom_sets]
+
+    def conditions_from_symptoms(self, symptoms: List[str]) -> List[str]:
+        return self._current().conditions_from_symptoms(symptoms)
+
+    def condition_scorer(self) -> ConditionScorer:
+        return self._current().condition_scorer
+
+    def all_symptoms(self) -> List[str]:
+        return self._current().all_symptoms()
+
+    def all_herbs(self) -> List[str]:
+        return self._current().all_herbs()
+
+    def symptom_aliases(self) -> Dict[str, List[str]]:
+        return self._current().symptom_aliases()
+
+
+class AsyncArtifactGraphService(ArtifactGraphService):
+    """AsyncGraphService API over the artifact; every query is in-memory, so nothing is offloaded to threads."""
+
+    async def snapshot(self) -> ArtifactGraph:
+        return self._current()
+
+    async def refresh_snapshot(self) -> ArtifactGraph:
+        return super().refresh_snapshot()
+
+    async def graph_version(self) -> Any:
+        return self._current().version
+
+    async def close(self) -> None:
+        pass
+
+    async def verify_connectivity(self) -> None:
+        super().verify_connectivity()
+
+    async def warm_up(self, connections: int = 0) -> None:
+        pass
+
+    async def health(self) -> Dict[str, Any]:
+        return super().health()
+
+    async def search_herbs(self, q: str, limit: int = 50, offset: int = 0, fuzzy: bool = True) -> List[Dict[str, Any]]:
+        return super().search_herbs(q, limit=limit, offset=offset, fuzzy=fuzzy)
+
+    async def herbs_for_symptoms(self, symptoms: List[str]) -> List[Dict[str, Any]]:
+        return super().herbs_for_symptoms(symptoms)
+
+    async def contraindications(self, herbs: List[str]) -> Dict[str, List[str]]:
+        return super().contraindications(herbs)
+
+    async def recommendation_facts(self, symptoms: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+        return super().recommendation_facts(symptoms)
+
+    async def recommendation_facts_many(self, symptom_sets: List[List[str]]):
+        return super().recommendation_facts_many(symptom_sets)
+
+    async def conditions_from_symptoms(self, symptoms: List[str]) -> List[str]:
+        return super().conditions_from_symptoms(symptoms)
+
+    async def condition_scorer(self) -> ConditionScorer:
+        return super().condition_scorer()
+
+    async def all_symptoms(self) -> List[str]:
+        return super().all_symptoms()
+
+    async def all_herbs(self) -> List[str]:
+        return super().all_herbs()
+
+    async def symptom_aliases(self) -> Dict[str, List[str]]:
+        return super().symptom_aliases()
@@ -0,0 +1,98 @@
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+# set bits per byte value, for popcounts over packed rows
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+class InteractionIndex:
+    """Symmetric herb-interaction adjacency as a packed bitset: row i holds one bit per herb, ceil(H/8) bytes.
+
+    INTERACTS_WITH is stored with a direction (Licorice->Ginger) but a conflict is a conflict either way, so
+    both directions are set. Conflict counts for a candidate set are a popcount of each row ANDed with the
+    set's packed mask, so they cost len(set) x H/8 bytes rather than a dense set x set matrix.
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[str, str]], herbs: Optional[Sequence[str]] = None):
+        pairs = [(a, b) for a, b in pairs if a != b]
+        self.herbs = list(herbs) if herbs is not None else sorted({x for p in pairs for x in p})
+        self.index = {h: i for i, h in enumerate(self.herbs)}
+        n = len(self.herbs)
+        ab = np.array([(self.index[a], self.index[b]) for a, b in pairs if a in self.index and b in self.index],
+                      dtype=np.int64).reshape(-1, 2)
+        rows = np.concatenate([ab[:, 0], ab[:, 1]])
+        cols = np.concatenate([ab[:, 1], ab[:, 0]])
+        self.bits = np.zeros((n, (n + 7) // 8), dtype=np.uint8)
+        # np.packbits bit order: column j is bit 7 - j % 8 of byte j // 8
+        np.bitwise_or.at(self.bits, (rows, cols >> 3), (0x80 >> (cols & 7)).astype(np.uint8))
+        self.edges = int(_POPCOUNT[self.bits].sum(dtype=np.int64)) // 2
+
+    @classmethod
+    def from_bits(cls, herbs: Sequence[str], bits: np.ndarray) -> "InteractionIndex":
+        """Wrap an existing bitset, e.g. one memory-mapped with np.load(mmap_mode="r")."""
+        if bits.shape != (len(herbs), (len(herbs) + 7) // 8):
+            raise ValueError(f"bitset shape {bits.shape} does not match {len(herbs)} herbs")
+        self = cls.__new__(cls)
+        self.herbs = list(herbs)
+        self.index = {h: i for i, h in enumerate(self.herbs)}
+        self.bits = bits
+        self.edges = int(_POPCOUNT[bits].sum(dtype=np.int64)) // 2
+        return self
+
+    def __len__(self) -> int:
+        return len(self.herbs)
+
+    def row(self, i: int) -> np.ndarray:
+        return np.unpackbits(self.bits[i], count=len(self.herbs)).astype(bool)
+
+    def submatrix(self, idx: np.ndarray) -> np.ndarray:
+        """len(idx) x len(idx) boolean conflict matrix of the given herb indexes."""
+        idx = np.asarray(idx, dtype=np.int64)
+        return ((self.bits[np.ix_(idx, idx >> 3)] >> (7 - (idx & 7)).astype(np.uint8)) & 1).astype(bool)
+
+    def mask(self, idx: np.ndarray) -> np.ndarray:
+        """Packed bitset (one row's layout) with the bits of the given herb indexes set."""
+        m = np.zeros(len(self.herbs), dtype=bool)
+        m[idx] = True
+        return np.packbits(m)
+
+    def conflict_counts(self, idx: np.ndarray) -> np.ndarray:
+        """For each of the given herbs, how many of the others it interacts with."""
+        idx = np.asarray(idx, dtype=np.int64)
+        return _POPCOUNT[self.bits[idx] & self.mask(idx)].sum(axis=1, dtype=np.int64)
+
+    def avoid(self, herb: str) -> List[str]:
+        i = self.index.get(herb)
+        return [] if i is None else [self.herbs[j] for j in np.flatnonzero(self.row(i))]
+
+    def avoid_map(self, herbs: Iterable[str]) -> Dict[str, List[str]]:
+        return {h: a for h in dict.fromkeys(herbs) for a in [self.avoid(h)] if a}
+
+    def conflicts(self, herbs: Sequence[str]) -> List[Tuple[str, str]]:
+        """Every interacting pair within the set, each pair once, in input order."""
+        known = [h for h in dict.fromkeys(herbs) if h in self.index]
+        m = self.submatrix(np.array([self.index[h] for h in known], dtype=np.int64))
+        i, j = np.nonzero(np.triu(m, 1))
+        return [(known[a], known[b]) for a, b in zip(i, j)]
+
+    def conflict_free(self, order: Iterable[int], k: int) -> Tuple[List[int], List[int]]:
+        """Greedy pick from herb indexes in preference order: take each herb that conflicts with none taken so far.
+
+        Stops at the k-th pick, so `order` may be a lazy iterator. Returns (taken, skipped) index lists;
+        `skipped` are the better-ranked herbs passed over for a conflict.
+        """
+        blocked = np.zeros(self.bits.shape[1], dtype=np.uint8)
+        taken: List[int] = []
+        skipped: List[int] = []
+        if k <= 0:
+            return taken, skipped
+        for i in order:
+            i = int(i)
+            if blocked[i >> 3] & (0x80 >> (i & 7)):
+                skipped.append(i)
+                continue
+            taken.append(i)
+            if len(taken) >= k:
+                break
+            blocked |= self.bits[i]
+        return taken, skipped
@@ -1,14 +1,20 @@
-from typing import List, Dict, Any
-from langchain.prompts import PromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from typing import List, Dict, Any, AsyncIterator, Optional
+import importlib.util
+import logging
+import threading
 
-try:
-    from langchain_openai import ChatOpenAI
-    OPENAI_AVAILABLE = True
-except Exception:
-    OPENAI_AVAILABLE = False
+# LangChain, the OpenAI SDK and httpx take most of the API's import time; they are imported on first use,
+# and only when an LLM is configured (OPENAI_API_KEY or LLM_FAKE), so graph-only deployments never load them.
+OPENAI_AVAILABLE = importlib.util.find_spec("langchain_openai") is not None
 
 from ..utils.config import settings
+from ..utils import metrics
+from ..utils.metrics import span
+from .cache import ResponseCache, LRUCache, make_shared_tier, recommendation_cache_key
+from .ranking import HerbRanker
+from .prompt_facts import encode_facts, count_tokens
+
+log = logging.getLogger(__name__)
 
 PROMPT_TEMPLATE = """
 You are an Ayurvedic wellness assistant. You must be cautious and include a disclaimer that you are not a doctor.
@@ -28,11 +34,109 @@ Return concise bullet points. Do NOT invent interactions that are not in facts/a
 """.strip()
 
 
+# Cache of LLM generations keyed on canonicalized prompt inputs (see recommendation_cache_key)
+response_cache = ResponseCache(
+    LRUCache(maxsize=settings.llm_cache_size, ttl=settings.llm_cache_ttl),
+    make_shared_tier(settings.llm_cache_ttl) if settings.llm_cache else None,
+    enabled=settings.llm_cache,
+)
+
+# Process-wide LLM client and chain, built lazily on first use (or by warm_up at startup).
+_llm = None
+_chain = None
+_http_clients: List[Any] = []
+_lock = threading.Lock()
+
+
+def _http_limits():
+    import httpx
+    return httpx.Limits(max_connections=settings.llm_max_connections,
+                        max_keepalive_connections=settings.llm_max_connections,
+                        keepalive_expiry=settings.llm_keepalive_expiry)
+
+
 def make_llm():
-    """Return a LangChain ChatOpenAI instance if API key is present; else return None."""
-    if OPENAI_AVAILABLE and settings.openai_api_key:
-        return ChatOpenAI(model=settings.openai_model, temperature=0.2)
-    return None
+    """Return the shared LangChain ChatOpenAI instance if API key is present; else return None.
+
+    The client owns pooled keep-alive HTTP connections (sync and async), so repeated requests
+    reuse TLS sessions instead of opening a new connection pool per call.
+    """
+    global _llm
+    if settings.llm_fake:
+        if _llm is None:
+            from .fake_llm import FakeChatModel
+            _llm = FakeChatModel(latency=settings.llm_fake_latency)
+        return _llm
+    if not (OPENAI_AVAILABLE and settings.openai_api_key):
+        return None
+    if _llm is None:
+        with _lock:
+            if _llm is None:
+                import httpx
+                from langchain_openai import ChatOpenAI
+                timeout = httpx.Timeout(settings.llm_timeout)
+                http_client = httpx.Client(limits=_http_limits(), timeout=timeout)
+                http_async_client = httpx.AsyncClient(limits=_http_limits(), timeout=timeout)
+                _http_clients[:] = [http_client, http_async_client]
+                _llm = ChatOpenAI(model=settings.openai_model, temperature=0.2,
+                                  http_client=http_client, http_async_client=http_async_client)
+    return _llm
+
+
+def recommendation_prompt():
+    """PromptTemplate over PROMPT_TEMPLATE; imports LangChain on first call."""
+    from langchain_core.prompts import PromptTemplate
+    return PromptTemplate.from_template(PROMPT_TEMPLATE)
+
+
+def recommendation_chain():
+    """Shared prompt | llm | parser chain, compiled once; None without an LLM."""
+    global _chain
+    llm = make_llm()
+    if llm is None:
+        return None
+    if _chain is None:
+        with _lock:
+            if _chain is None:
+                from langchain_core.output_parsers import StrOutputParser
+                _chain = recommendation_prompt() | llm | StrOutputParser()
+    return _chain
+
+
+def warm_up(ping: bool = False) -> bool:
+    """Build the client and chain ahead of the first request; with `ping`, also open a pooled connection.
+
+    Returns False when no LLM is configured.
+    """
+    chain = recommendation_chain()
+    if chain is None:
+        return False
+    if ping:
+        make_llm().invoke("ping", max_tokens=1)
+    return True
+
+
+async def awarm_up(ping: bool = False) -> bool:
+    """Async warm-up: same as warm_up but the optional ping goes through the async connection pool."""
+    chain = recommendation_chain()
+    if chain is None:
+        return False
+    if ping:
+        await make_llm().ainvoke("ping", max_tokens=1)
+    return True
+
+
+async def aclose_llm() -> None:
+    """Close the pooled HTTP connections (call on shutdown)."""
+    global _llm, _chain
+    with _lock:
+        clients, _http_clients[:] = list(_http_clients), []
+        _llm = _chain = None
+    for c in clients:
+        if hasattr(c, "aclose"):
+            await c.aclose()
+        else:
+            c.close()
 
 
 def _simple_from_facts(age: int, gender: str,
@@ -41,22 +145,20 @@ def _simple_from_facts(age: int, gender: str,
                        facts: List[Dict[str, Any]],
                        avoid_map: Dict[str, List[str]]) -> str:
     """Deterministic fallback text builder when no LLM is available."""
-    # Collect top herbs by occurrence across conditions
-    tally = {}
+    # Collect evidence per herb, then take the top 5 non-interacting herbs by weighted ranking
+    why_by_herb = {}
     for f in facts:
         h = f.get("herb", "Unknown")
         why = f.get("evidence") or f.get("condition") or "Traditional support"
-        tally.setdefault(h, {"why": set(), "how": "tea/decoction 1–2x daily"})
-        tally[h]["why"].add(why)
+        why_by_herb.setdefault(h, set()).add(why)
 
-    # Pick up to 5
     herbs_out = []
-    for i, (h, v) in enumerate(tally.items()):
-        if i >= 5:
-            break
-        why_list = "; ".join(sorted(v["why"]))
+    top, _ = HerbRanker.from_facts(facts, avoid_map).rank_conflict_free(symptoms, k=5)
+    for ranked in top:
+        h = ranked.name
+        why_list = "; ".join(sorted(why_by_herb.get(h, ())))
         avoid = ", ".join(avoid_map.get(h, [])) if avoid_map.get(h) else "—"
-        herbs_out.append(f"- **{h}** — Why: {why_list}. How: {v['how']}. Avoid with: {avoid}")
+        herbs_out.append(f"- **{h}** — Why: {why_list}. How: tea/decoction 1–2x daily. Avoid with: {avoid}")
 
     if not herbs_out:
         herbs_out = ["- No direct herb matches found in the graph. Consider general digestive and sleep support."]
@@ -84,47 +186,152 @@ def _simple_from_facts(age: int, gender: str,
     return "\n".join(parts)
 
 
+def recommendation_inputs(age: int, gender: str,
+                          symptoms: List[str], lifestyle: List[str],
+                          facts: List[Dict[str, Any]],
+                          avoid_map: Dict[str, List[str]],
+                          ranker: Optional[HerbRanker] = None) -> Dict[str, Any]:
+    """Template variables for PROMPT_TEMPLATE, with the graph facts compacted when PROMPT_COMPACT_FACTS is on."""
+    inputs = {
+        "age": age,
+        "gender": gender,
+        "symptoms": ", ".join(symptoms) or "none",
+        "lifestyle": ", ".join(lifestyle) or "none",
+        "facts": facts,
+        "avoid_map": avoid_map
+    }
+    if settings.prompt_compact_facts:
+        enc = encode_facts(symptoms, facts, avoid_map, settings.prompt_facts_budget, ranker)
+        inputs["facts"], inputs["avoid_map"] = enc.facts, enc.avoid_map
+        # only prompts actually sent to the LLM get here, so tokenizing the raw repr is small next to the call
+        raw = count_tokens(str(facts)) + count_tokens(str(avoid_map))
+        metrics.PROMPT_FACT_TOKENS.observe(raw, encoding="raw")
+        metrics.PROMPT_FACT_TOKENS.observe(enc.tokens, encoding="compact")
+        metrics.PROMPT_TOKENS_SAVED.inc(max(0, raw - enc.tokens))
+        log.debug("prompt facts: %d -> %d tokens (%d herbs kept, %d omitted)", raw, enc.tokens, enc.herbs, enc.omitted)
+    return inputs
+
+
 def generate_recommendations(age: int, gender: str,
                              symptoms: List[str], lifestyle: List[str],
                              facts: List[Dict[str, Any]],
-                             avoid_map: Dict[str, List[str]]) -> str:
-    llm = make_llm()
-    if llm is None:
+                             avoid_map: Dict[str, List[str]],
+                             ranker: Optional[HerbRanker] = None) -> str:
+    chain = recommendation_chain()
+    if chain is None:
         # Fallback text (no LangChain pipeline)
         return _simple_from_facts(age, gender, symptoms, lifestyle, facts, avoid_map)
 
     # LLM path
-    tmpl = PromptTemplate.from_template(PROMPT_TEMPLATE)
-    chain = tmpl | llm | StrOutputParser()
-    return chain.invoke({
-        "age": age,
-        "gender": gender,
-        "symptoms": ", ".join(symptoms) or "none",
-        "lifestyle": ", ".join(lifestyle) or "none",
-        "facts": facts,
-        "avoid_map": avoid_map
-    })
+    key = recommendation_cache_key(age, gender, symptoms, lifestyle, facts, avoid_map, settings.openai_model)
+    text = response_cache.get(key)
+    if text is None:
+        with span("llm"):
+            text = chain.invoke(recommendation_inputs(age, gender, symptoms, lifestyle, facts, avoid_map, ranker))
+        response_cache.set(key, text)
+    return text
 
 
-def generate_diagnosis(symptoms: List[str], lifestyle: List[str], conditions: List[str]) -> Dict[str, Any]:
-    llm = make_llm()
-    if llm is None:
-        text = (
-            "Likely conditions (from graph): "
-            + (", ".join(conditions) if conditions else "none found")
-            + ". This is a simple heuristic summary without an LLM.\n"
-            "Caution: this is not medical advice."
-        )
-        
-        conf = min(1.0, max(0.3, len(conditions) / 5.0))
-        return {"text": text, "confidence": conf}
-
-    prompt = (
+async def agenerate_recommendations(age: int, gender: str,
+                                    symptoms: List[str], lifestyle: List[str],
+                                    facts: List[Dict[str, Any]],
+                                    avoid_map: Dict[str, List[str]],
+                                    ranker: Optional[HerbRanker] = None) -> str:
+    """Async variant of generate_recommendations (non-blocking `ainvoke`)."""
+    chain = recommendation_chain()
+    if chain is None:
+        return _simple_from_facts(age, gender, symptoms, lifestyle, facts, avoid_map)
+    key = recommendation_cache_key(age, gender, symptoms, lifestyle, facts, avoid_map, settings.openai_model)
+    text = response_cache.get(key)
+    if text is None:
+        with span("llm"):
+            inputs = recommendation_inputs(age, gender, symptoms, lifestyle, facts, avoid_map, ranker)
+            text = await chain.ainvoke(inputs)
+        response_cache.set(key, text)
+    return text
+
+
+async def astream_recommendations(age: int, gender: str,
+                                  symptoms: List[str], lifestyle: List[str],
+                                  facts: List[Dict[str, Any]],
+                                  avoid_map: Dict[str, List[str]],
+                                  ranker: Optional[HerbRanker] = None) -> AsyncIterator[str]:
+    """Yield the recommendation text as it is generated (`astream`); cached or fallback text comes in one chunk."""
+    chain = recommendation_chain()
+    if chain is None:
+        yield _simple_from_facts(age, gender, symptoms, lifestyle, facts, avoid_map)
+        return
+    key = recommendation_cache_key(age, gender, symptoms, lifestyle, facts, avoid_map, settings.openai_model)
+    text = response_cache.get(key)
+    if text is not None:
+        yield text
+        return
+    parts = []
+    with span("llm_stream"):
+        inputs = recommendation_inputs(age, gender, symptoms, lifestyle, facts, avoid_map, ranker)
+        async for chunk in chain.astream(inputs):
+            parts.append(chunk)
+            yield chunk
+    # only complete generations are cached
+    response_cache.set(key, "".join(parts))
+
+
+def _confidence(conditions: List[str], probabilities: Optional[List[float]]) -> float:
+    # posterior of the top condition when scored; the old count heuristic otherwise
+    if probabilities is not None:
+        return float(probabilities[0]) if probabilities else 0.0
+    return min(1.0, max(0.3, len(conditions) / 5.0))
+
+
+def _ranked_conditions(conditions: List[str], probabilities: Optional[List[float]]) -> List[str]:
+    if probabilities is None:
+        return list(conditions)
+    return [f"{c} ({p:.0%})" for c, p in zip(conditions, probabilities)]
+
+
+def _diagnosis_fallback(conditions: List[str], probabilities: Optional[List[float]] = None) -> Dict[str, Any]:
+    ranked = _ranked_conditions(conditions, probabilities)
+    text = (
+        "Likely conditions (from graph): "
+        + (", ".join(ranked) if ranked else "none found")
+        + ". This is a simple heuristic summary without an LLM.\n"
+        "Caution: this is not medical advice."
+    )
+    return {"text": text, "confidence": _confidence(conditions, probabilities)}
+
+
+def _diagnosis_prompt(symptoms: List[str], lifestyle: List[str], conditions: List[str],
+                      probabilities: Optional[List[float]] = None) -> str:
+    return (
         f"You are an Ayurvedic triage helper. Symptoms: {symptoms}. Lifestyle: {lifestyle}. "
-        f"Likely conditions (from graph): {conditions}. Pick 1–3 most probable and explain briefly. "
+        f"Likely conditions (from graph, ranked): {_ranked_conditions(conditions, probabilities)}. "
+        f"Pick 1–3 most probable and explain briefly. "
         f"Add a caution: this is not medical advice."
     )
-    out = llm.invoke(prompt)
+
+
+def _diagnosis_result(out, conditions: List[str], probabilities: Optional[List[float]] = None) -> Dict[str, Any]:
     text = getattr(out, "content", str(out))
-    conf = min(1.0, max(0.3, len(conditions) / 5.0))
-    return {"text": text, "confidence": conf}
+    return {"text": text, "confidence": _confidence(conditions, probabilities)}
+
+
+def generate_diagnosis(symptoms: List[str], lifestyle: List[str], conditions: List[str],
+                       probabilities: Optional[List[float]] = None) -> Dict[str, Any]:
+    """`conditions` ranked best first; with `probabilities` the confidence is the top posterior."""
+    llm = make_llm()
+    if llm is None:
+        return _diagnosis_fallback(conditions, probabilities)
+    with span("llm"):
+        out = llm.invoke(_diagnosis_prompt(symptoms, lifestyle, conditions, probabilities))
+    return _diagnosis_result(out, conditions, probabilities)
+
+
+async def agenerate_diagnosis(symptoms: List[str], lifestyle: List[str], conditions: List[str],
+                              probabilities: Optional[List[float]] = None) -> Dict[str, Any]:
+    """Async variant of generate_diagnosis (non-blocking `ainvoke`)."""
+    llm = make_llm()
+    if llm is None:
+        return _diagnosis_fallback(conditions, probabilities)
+    with span("llm"):
+        out = await llm.ainvoke(_diagnosis_prompt(symptoms, lifestyle, conditions, probabilities))
+    return _diagnosis_result(out, conditions, probabilities)
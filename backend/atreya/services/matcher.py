@@ -0,0 +1,53 @@
+from typing import Dict, Hashable, Iterable, List, Tuple
+import re
+
+# words keep inner apostrophes so "can't sleep" is one token sequence
+_WORD_RE = re.compile(r"[^\W_]+(?:'[^\W_]+)*")
+_END = object()
+
+
+def words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+class PhraseMatcher:
+    """Multi-pattern matcher over a word-level trie, built once from (phrase, label) pairs.
+
+    `find` scans the message in one pass: from every word position it walks the trie as far as the
+    following words allow, so the cost depends on message length and phrase length, not catalog size.
+    Phrases match on whole words ("gas" does not match "gastric"); overlapping phrases all match.
+    """
+
+    def __init__(self, phrases: Iterable[Tuple[str, Hashable]]):
+        self._root: Dict = {}
+        self._order: Dict[Hashable, int] = {}
+        for phrase, label in phrases:
+            toks = words(phrase)
+            if not toks:
+                continue
+            node = self._root
+            for t in toks:
+                node = node.setdefault(t, {})
+            node.setdefault(_END, []).append(label)
+            self._order.setdefault(label, len(self._order))
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def find(self, text: str) -> List[Hashable]:
+        """Labels whose phrases occur in text, deduplicated, in the order they were added."""
+        toks = words(text)
+        root = self._root
+        found = set()
+        for i, t in enumerate(toks):
+            node = root.get(t)
+            j = i + 1
+            while node is not None:
+                labels = node.get(_END)
+                if labels:
+                    found.update(labels)
+                if j == len(toks):
+                    break
+                node = node.get(toks[j])
+                j += 1
+        return sorted(found, key=self._order.__getitem__)
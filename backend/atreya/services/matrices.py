@@ -0,0 +1,46 @@
+"""Matrix helpers shared by the ranker and the diagnosis scorer (SciPy CSR when installed, else dense)."""
+from typing import Dict, Tuple
+import numpy as np
+
+try:
+    from scipy import sparse
+    SCIPY_AVAILABLE = True
+except Exception:
+    SCIPY_AVAILABLE = False
+
+
+def matrix(cells: Dict[Tuple[int, int], float], shape: Tuple[int, int]):
+    """CSR matrix when SciPy is installed, dense ndarray otherwise; both support `.T @ vector`."""
+    rows = np.fromiter((r for r, _ in cells), dtype=np.int64, count=len(cells))
+    cols = np.fromiter((c for _, c in cells), dtype=np.int64, count=len(cells))
+    vals = np.fromiter(cells.values(), dtype=np.float64, count=len(cells))
+    if SCIPY_AVAILABLE:
+        return sparse.csr_matrix((vals, (rows, cols)), shape=shape)
+    m = np.zeros(shape)
+    m[rows, cols] = vals
+    return m
+
+
+def dense(v) -> np.ndarray:
+    return np.asarray(v).ravel()
+
+
+def csr_arrays(m) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(indptr, indices, data) of a matrix() result."""
+    if SCIPY_AVAILABLE and sparse.issparse(m):
+        m = m.tocsr()
+        m.sort_indices()
+        return m.indptr, m.indices, m.data
+    rows, cols = np.nonzero(m)
+    ptr = np.zeros(m.shape[0] + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum(np.bincount(rows, minlength=m.shape[0]))
+    return ptr, cols.astype(np.int32), np.asarray(m, dtype=np.float64)[rows, cols]
+
+
+def from_csr(ptr: np.ndarray, idx: np.ndarray, val: np.ndarray, shape: Tuple[int, int]):
+    """Inverse of csr_arrays; SciPy wraps the given (e.g. memory-mapped) arrays without copying them."""
+    if SCIPY_AVAILABLE:
+        return sparse.csr_matrix((val, idx, ptr), shape=shape, copy=False)
+    m = np.zeros(shape)
+    m[np.repeat(np.arange(shape[0]), np.diff(ptr)), idx] = val
+    return m
@@ -0,0 +1,85 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+from .ranking import HerbRanker
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except Exception:
+    TIKTOKEN_AVAILABLE = False
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens of `text` for OpenAI chat models (cl100k/o200k); ~4 characters per token without tiktoken."""
+    global _encoding
+    if not TIKTOKEN_AVAILABLE:
+        return (len(text) + 3) // 4
+    if _encoding is None:
+        try:
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+    return len(_encoding.encode(text))
+
+
+class EncodedFacts(NamedTuple):
+    facts: str
+    avoid_map: str
+    herbs: int
+    omitted: int
+    tokens: int
+
+
+def _herb_lines(facts: List[Dict[str, Any]]) -> Dict[str, str]:
+    # one line per herb: properties once, each condition once with the matched symptoms and distinct evidence
+    props: Dict[str, List[str]] = {}
+    conds: Dict[str, Dict[str, Dict[str, list]]] = {}
+    for f in facts:
+        h = f["herb"]
+        props.setdefault(h, list(f.get("properties") or []))
+        c = conds.setdefault(h, {}).setdefault(f.get("condition") or "?", {"symptoms": [], "evidence": []})
+        for key, value in (("symptoms", f.get("symptom")), ("evidence", f.get("evidence"))):
+            if value and value not in c[key]:
+                c[key].append(value)
+    lines = {}
+    for h, by_cond in conds.items():
+        parts = []
+        for cond, c in by_cond.items():
+            why = f"{cond} ({', '.join(c['symptoms'])})" if c["symptoms"] else cond
+            parts.append(f"{why}: {'; '.join(c['evidence'])}" if c["evidence"] else why)
+        head = f"- {h} [{', '.join(props[h])}]" if props[h] else f"- {h}"
+        lines[h] = f"{head}: " + " | ".join(parts)
+    return lines
+
+
+def encode_facts(symptoms: List[str], facts: List[Dict[str, Any]], avoid_map: Dict[str, List[str]],
+                 budget: int, ranker: Optional[HerbRanker] = None) -> EncodedFacts:
+    """Compact prompt text for the graph facts, best-ranked herbs first, within `budget` tokens (0: no limit).
+
+    Every herb that makes it in keeps its full interaction list; herbs that do not fit are dropped whole.
+    """
+    lines = _herb_lines(facts)
+    if not lines:
+        return EncodedFacts("none", "none", 0, 0, 0)
+    ranker = ranker or HerbRanker.from_facts(facts, avoid_map)
+    order = [r.name for r in ranker.rank(symptoms, k=len(lines)) if r.name in lines]
+    ranked = set(order)
+    order += sorted(h for h in lines if h not in ranked)
+    fact_lines: List[str] = []
+    avoid_lines: List[str] = []
+    used = 0
+    for h in order:
+        avoid = f"- {h}: {', '.join(avoid_map[h])}" if avoid_map.get(h) else ""
+        cost = count_tokens(lines[h]) + (count_tokens(avoid) if avoid else 0)
+        if budget and fact_lines and used + cost > budget:
+            break
+        used += cost
+        fact_lines.append(lines[h])
+        if avoid:
+            avoid_lines.append(avoid)
+    omitted = len(order) - len(fact_lines)
+    if omitted:
+        fact_lines.append(f"({omitted} lower-ranked herbs omitted)")
+    return EncodedFacts("\n".join(fact_lines) or "none", "\n".join(avoid_lines) or "none",
+                        len(fact_lines) - (1 if omitted else 0), omitted, used)
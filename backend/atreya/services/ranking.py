@@ -0,0 +1,159 @@
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+import numpy as np
+from .interactions import InteractionIndex
+from .matrices import csr_arrays, dense, from_csr, matrix
+
+# score = EVIDENCE_WEIGHT * evidence + COVERAGE_WEIGHT * coverage - INTERACTION_PENALTY * conflicts
+EVIDENCE_WEIGHT = 1.0
+COVERAGE_WEIGHT = 1.0
+INTERACTION_PENALTY = 0.25
+
+# Evidence strength from the HELPS_WITH evidence text; plain traditional use counts 1.0.
+EVIDENCE_KEYWORDS = (("rct", 1.5), ("clinical", 1.5), ("trial", 1.5), ("stud", 1.25))
+
+
+def evidence_strength(evidence: Any) -> float:
+    text = str(evidence or "").lower()
+    return max([w for k, w in EVIDENCE_KEYWORDS if k in text], default=1.0)
+
+
+class RankedHerb(NamedTuple):
+    name: str
+    score: float
+    evidence: float   # sum over matched conditions of evidence strength x share of the user's symptoms matched
+    coverage: float   # share of the user's symptoms this herb addresses through any condition
+    conflicts: int    # other candidate herbs it interacts with (either edge direction)
+
+
+class HerbRanker:
+    """Vectorized herb scoring over symptom x condition and condition x herb matrices.
+
+    Herbs are indexed in name order, so equal scores are broken alphabetically and rankings are deterministic.
+    """
+
+    def __init__(self,
+                 has_symptom: Iterable[Tuple[str, str]],
+                 helps_with: Iterable[Tuple[str, str, Any]],
+                 interacts_with: Iterable[Tuple[str, str]],
+                 interactions: Optional[InteractionIndex] = None):
+        has_symptom = {(c, s.lower()) for c, s in has_symptom}
+        helps = {(h, c): evidence_strength(e) for h, c, e in helps_with}
+        inter = {(a, b) for a, b in interacts_with if a != b}
+
+        self.symptoms = sorted({s for _, s in has_symptom})
+        self.conditions = sorted({c for c, _ in has_symptom} | {c for _, c in helps})
+        self.herbs = sorted({h for h, _ in helps} | {x for pair in inter for x in pair})
+        self.symptom_index = {s: i for i, s in enumerate(self.symptoms)}
+        ci = {c: i for i, c in enumerate(self.conditions)}
+        hi = {h: i for i, h in enumerate(self.herbs)}
+        S, C, H = len(self.symptoms), len(self.conditions), len(self.herbs)
+
+        # S x C incidence, C x H evidence strength, S x H "herb addresses symptom"; symmetric H x H interactions
+        self.A = matrix({(self.symptom_index[s], ci[c]): 1.0 for c, s in has_symptom}, (S, C))
+        self.E = matrix({(ci[c], hi[h]): w for (h, c), w in helps.items()}, (C, H))
+        B = matrix({(ci[c], hi[h]): 1.0 for (h, c) in helps}, (C, H))
+        SH = self.A @ B
+        self.SH = (SH > 0).astype(np.float64)
+        # a prebuilt index (e.g. memory-mapped from a shared snapshot) is used when it covers the same herbs
+        self.I = interactions if interactions is not None and interactions.herbs == self.herbs \
+            else InteractionIndex(inter, self.herbs)
+
+    @classmethod
+    def from_arrays(cls, symptoms: List[str], conditions: List[str], herbs: List[str],
+                    arrays: Dict[str, np.ndarray], interactions: InteractionIndex) -> "HerbRanker":
+        """Ranker over prebuilt matrices, as returned by `arrays()` (e.g. memory-mapped from a graph artifact)."""
+        self = cls.__new__(cls)
+        self.symptoms, self.conditions, self.herbs = list(symptoms), list(conditions), list(herbs)
+        self.symptom_index = {s: i for i, s in enumerate(self.symptoms)}
+        S, C, H = len(self.symptoms), len(self.conditions), len(self.herbs)
+        for name, shape in (("A", (S, C)), ("E", (C, H)), ("SH", (S, H))):
+            setattr(self, name, from_csr(arrays[f"{name}_ptr"], arrays[f"{name}_idx"], arrays[f"{name}_val"], shape))
+        self.I = interactions
+        return self
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """CSR parts of the A, E and SH matrices, keyed `<matrix>_ptr`, `_idx` and `_val`."""
+        out = {}
+        for name in ("A", "E", "SH"):
+            out[f"{name}_ptr"], out[f"{name}_idx"], out[f"{name}_val"] = csr_arrays(getattr(self, name))
+        return out
+
+    @classmethod
+    def from_snapshot(cls, snap, interactions: Optional[InteractionIndex] = None) -> "HerbRanker":
+        return cls(
+            has_symptom=[(c, sym) for entries in snap.symptom_conditions.values() for sym, conds in entries for c in conds],
+            helps_with=[(h, c, e) for c, herbs in snap.condition_herbs.items() for h, e in herbs],
+            interacts_with=[(h, o) for h, others in snap.interactions.items() for o in others],
+            interactions=interactions,
+        )
+
+    @classmethod
+    def from_facts(cls, facts: List[Dict[str, Any]], avoid_map: Dict[str, List[str]]) -> "HerbRanker":
+        """Ranker over just the subgraph returned for one request (same scores as the full-graph ranker)."""
+        return cls(
+            has_symptom=[(f["condition"], f.get("symptom") or f["condition"]) for f in facts],
+            helps_with=[(f["herb"], f["condition"], f.get("evidence")) for f in facts],
+            interacts_with=[(h, o) for h, others in avoid_map.items() for o in others],
+        )
+
+    def scores(self, symptoms: List[str]) -> Dict[str, np.ndarray]:
+        wanted = list(dict.fromkeys(s.lower() for s in symptoms))
+        n = max(1, len(wanted))
+        u = np.zeros(len(self.symptoms))
+        for s in wanted:
+            i = self.symptom_index.get(s)
+            if i is not None:
+                u[i] = 1.0
+        matched = dense(self.A.T @ u)               # per condition: how many of the user's symptoms it has
+        evidence = dense(self.E.T @ matched) / n
+        coverage = dense(self.SH.T @ u) / n
+        base = EVIDENCE_WEIGHT * evidence + COVERAGE_WEIGHT * coverage
+        candidates = base > 0
+        conflicts = np.zeros(len(self.herbs))
+        idx = np.flatnonzero(candidates)
+        conflicts[idx] = self.I.conflict_counts(idx)
+        score = base - INTERACTION_PENALTY * conflicts
+        return {"score": score, "evidence": evidence, "coverage": coverage,
+                "conflicts": conflicts, "candidates": candidates}
+
+    def _ordered(self, parts: Dict[str, np.ndarray], k: int) -> np.ndarray:
+        # candidate indexes, best first (ties by name); only the best k are sorted, unless k is None
+        score = parts["score"]
+        idx = np.flatnonzero(parts["candidates"])
+        if k is not None and idx.size > k > 0:
+            # argpartition finds the k-th best score in O(H); keep every herb tied with it so ties resolve by name
+            kth = score[idx][np.argpartition(-score[idx], k - 1)[k - 1]]
+            idx = idx[score[idx] >= kth]
+        return idx[np.lexsort((idx, -score[idx]))]
+
+    def _preferred(self, parts: Dict[str, np.ndarray], k: int) -> Iterator[int]:
+        # candidates best first, partially sorted in growing blocks: a longer top-m keeps the shorter one's order
+        total = int(np.count_nonzero(parts["candidates"]))
+        done, m = 0, max(k, 1)
+        while done < total:
+            order = self._ordered(parts, m)
+            yield from order[done:].tolist()
+            done, m = len(order), 2 * len(order)
+
+    def _ranked(self, parts: Dict[str, np.ndarray], order: Iterable[int]) -> List[RankedHerb]:
+        return [RankedHerb(self.herbs[i], float(parts["score"][i]), float(parts["evidence"][i]),
+                           float(parts["coverage"][i]), int(parts["conflicts"][i])) for i in order]
+
+    def rank(self, symptoms: List[str], k: int = 5) -> List[RankedHerb]:
+        """Top-k candidate herbs by score (ties by name)."""
+        if k <= 0:
+            return []
+        parts = self.scores(symptoms)
+        return self._ranked(parts, self._ordered(parts, k)[:k])
+
+    def rank_conflict_free(self, symptoms: List[str], k: int = 5) -> Tuple[List[RankedHerb], List[str]]:
+        """Top-k herbs no two of which interact, plus the better-ranked herbs skipped for interacting with one kept.
+
+        Greedy in score order over all candidates, so k suggestions come back whenever k compatible herbs exist;
+        only as much of the order as the pick consumes is ever sorted.
+        """
+        if k <= 0:
+            return [], []
+        parts = self.scores(symptoms)
+        taken, skipped = self.I.conflict_free(self._preferred(parts, 2 * k), k)
+        return self._ranked(parts, taken), [self.herbs[i] for i in skipped]
@@ -1,16 +1,107 @@
-from typing import List, Dict, Any
-from ..models.schemas import RecommendRequest, RecommendResponse, HerbSuggestion, DiagnosisRequest, DiagnosisResponse
-from .graph import GraphService
-from .llm import generate_recommendations, generate_diagnosis
+from typing import List, Dict, Any, Tuple, Optional, AsyncIterator, Union, Callable, Awaitable
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import uuid
+from ..models.schemas import (RecommendRequest, RecommendResponse, HerbSuggestion, DiagnosisRequest, DiagnosisResponse,
+                              ConditionScore)
+from ..utils.config import settings
+from ..utils.metrics import span
+from .cache import recommendation_cache_key, LRUCache, make_shared_tier
+from .graph import GraphService, AsyncGraphService, RecommendationFacts
+from .ranking import HerbRanker
+from .diagnosis import ScoredCondition
+from .llm import (generate_recommendations, generate_diagnosis, agenerate_recommendations, agenerate_diagnosis,
+                  astream_recommendations)
+
+class NarrativeJobs:
+    """Deferred LLM narratives: background tasks addressable by id, kept in a bounded TTL store.
+
+    With a shared cache tier, job states are published there too, so any worker can answer the poll.
+    """
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 900.0, shared=None):
+        self._jobs = LRUCache(maxsize=maxsize, ttl=ttl)
+        # the event loop only keeps weak references to tasks: pending ones stay here until done, so one
+        # evicted from the store still finishes (and still reaches the shared tier)
+        self._pending: set = set()
+        self.shared = shared
+
+    def _publish(self, job: str, state: Dict[str, Any]) -> None:
+        if self.shared is not None:
+            try:
+                self.shared.set(job, state)
+            except Exception:
+                pass
+
+    def submit(self, coro) -> str:
+        job = uuid.uuid4().hex
+        task = asyncio.ensure_future(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+        self._jobs.set(job, task)
+        if self.shared is not None:
+            self._publish(job, {"job": job, "status": "pending"})
+            task.add_done_callback(lambda t: self._publish(job, self._state(job, t)))
+        return job
+
+    @staticmethod
+    def _state(job: str, task) -> Dict[str, Any]:
+        if not task.done():
+            return {"job": job, "status": "pending"}
+        if task.cancelled() or task.exception() is not None:
+            return {"job": job, "status": "error", "error": str(task.exception() if not task.cancelled() else "cancelled")}
+        return {"job": job, "status": "done", "text": task.result()}
+
+    def get(self, job: str) -> Optional[Dict[str, Any]]:
+        task = self._jobs.get(job)
+        if task is not None:
+            return self._state(job, task)
+        if self.shared is not None:
+            try:
+                return self.shared.get(job)
+            except Exception:
+                return None
+        return None
+
 
 class RecommenderService:
-    def __init__(self, graph: GraphService):
+    def __init__(self, graph: Optional[GraphService] = None, single_query: bool = True,
+                 agraph: Optional[AsyncGraphService] = None):
         self.graph = graph
+        self.agraph = agraph
+        self.single_query = single_query
+        self.narratives = NarrativeJobs(settings.narrative_jobs_max, settings.narrative_jobs_ttl,
+                                        make_shared_tier(settings.narrative_jobs_ttl, name="narratives"))
+        # async hook: term -> nearest graph symptom for terms that are not graph symptoms (ChatService.resolve_symptoms)
+        self.symptom_resolver: Optional[Callable[[List[str]], Awaitable[Dict[str, str]]]] = None
+
+    @staticmethod
+    def narrative_mode(req: RecommendRequest) -> str:
+        return req.narrative or settings.narrative_mode
+
+    def graph_facts(self, symptoms: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+        """Herb facts for the symptoms plus the avoid map of those herbs."""
+        with span("graph"):
+            if self.single_query:
+                return self.graph.recommendation_facts(symptoms)
+            facts = self.graph.herbs_for_symptoms(symptoms)
+            herbs = list({f["herb"] for f in facts})
+            return facts, self.graph.contraindications(herbs)
+
+    async def agraph_facts(self, symptoms: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+        if self.agraph is None:
+            return await asyncio.to_thread(self.graph_facts, symptoms)
+        with span("graph"):
+            if self.single_query:
+                return await self.agraph.recommendation_facts(symptoms)
+            facts = await self.agraph.herbs_for_symptoms(symptoms)
+            return facts, await self.agraph.contraindications(list({f["herb"] for f in facts}))
 
     def recommend(self, req: RecommendRequest) -> RecommendResponse:
-        facts = self.graph.herbs_for_symptoms(req.symptoms)
-        herbs = list({f["herb"] for f in facts})
-        avoid_map = self.graph.contraindications(herbs)
+        """Sync path: `deferred` needs the event loop, so here it is treated like `inline`."""
+        facts, avoid_map = self.graph_facts(req.symptoms)
+        if self.narrative_mode(req) == "skip":
+            return self._build_response(req.symptoms, facts, avoid_map, None)
 
         llm_text = generate_recommendations(
             age=req.age,
@@ -18,24 +109,173 @@ class RecommenderService:
             symptoms=req.symptoms,
             lifestyle=req.lifestyle,
             facts=facts,
-            avoid_map=avoid_map
+            avoid_map=avoid_map,
+            ranker=self._snapshot_ranker()
+        )
+        return self._build_response(req.symptoms, facts, avoid_map, llm_text)
+
+    async def _resolved(self, req: Union[RecommendRequest, DiagnosisRequest]) -> Tuple[Any, Dict[str, str]]:
+        """The request with non-graph symptom terms replaced, when asked for, and the term -> symptom mapping."""
+        wanted = settings.resolve_symptoms if req.resolve_symptoms is None else req.resolve_symptoms
+        if not wanted or self.symptom_resolver is None or not req.symptoms:
+            return req, {}
+        resolved = await self.symptom_resolver(req.symptoms)
+        if not resolved:
+            return req, {}
+        symptoms = list(dict.fromkeys(resolved.get(t, t) for t in req.symptoms))
+        return req.model_copy(update={"symptoms": symptoms}), resolved
+
+    async def arecommend(self, req: RecommendRequest) -> RecommendResponse:
+        req, resolved = await self._resolved(req)
+        facts, avoid_map = await self.agraph_facts(req.symptoms)
+        mode = self.narrative_mode(req)
+        # structured suggestions come from graph facts alone; the LLM narrative is only computed when asked for
+        if mode == "skip":
+            return self._build_response(req.symptoms, facts, avoid_map, None, resolved)
+
+        narrative = agenerate_recommendations(
+            age=req.age,
+            gender=req.gender,
+            symptoms=req.symptoms,
+            lifestyle=req.lifestyle,
+            facts=facts,
+            avoid_map=avoid_map,
+            ranker=self._snapshot_ranker()
         )
+        if mode == "deferred":
+            resp = self._build_response(req.symptoms, facts, avoid_map, None, resolved)
+            resp.narrative_job = self.narratives.submit(narrative)
+            return resp
+        return self._build_response(req.symptoms, facts, avoid_map, await narrative, resolved)
 
-        top = {}
+    # --- batch scoring ---
+
+    @staticmethod
+    def _symptom_key(symptoms: List[str]) -> Tuple[str, ...]:
+        # graph matching is case-insensitive set membership, so order/case/duplicates don't change the facts
+        return tuple(sorted({s.lower() for s in symptoms}))
+
+    @staticmethod
+    def _llm_key(req: RecommendRequest, facts: RecommendationFacts) -> str:
+        return recommendation_cache_key(req.age, req.gender, req.symptoms, req.lifestyle, facts[0], facts[1],
+                                        settings.openai_model)
+
+    def recommend_many(self, reqs: List[RecommendRequest],
+                       max_concurrency: Optional[int] = None) -> List[RecommendResponse]:
+        """Score many profiles: one UNWIND graph query for the distinct symptom sets, then deduplicated
+        LLM calls on a bounded thread pool. Results are in input order."""
+        keys = [self._symptom_key(r.symptoms) for r in reqs]
+        uniq = list(dict.fromkeys(keys))
+        facts = dict(zip(uniq, self.graph.recommendation_facts_many([list(k) for k in uniq])))
+        ranker = self._snapshot_ranker()
+        with ThreadPoolExecutor(max_concurrency or settings.batch_llm_concurrency) as pool:
+            jobs, planned = {}, []
+            for r, k in zip(reqs, keys):
+                f = facts[k]
+                if self.narrative_mode(r) == "skip":
+                    planned.append((r, f, None))
+                    continue
+                ck = self._llm_key(r, f)
+                if ck not in jobs:
+                    jobs[ck] = pool.submit(generate_recommendations, age=r.age, gender=r.gender, symptoms=r.symptoms,
+                                           lifestyle=r.lifestyle, facts=f[0], avoid_map=f[1], ranker=ranker)
+                planned.append((r, f, jobs[ck]))
+            return [self._build_response(r.symptoms, f[0], f[1], job.result() if job else None)
+                    for r, f, job in planned]
+
+    async def arecommend_many(self, reqs: List[RecommendRequest], max_concurrency: Optional[int] = None
+                              ) -> AsyncIterator[Tuple[int, Union[RecommendResponse, Exception]]]:
+        """Async recommend_many: yields (index, response or exception) in input order as results complete.
+
+        Profiles asking for `skip` get no LLM call; `deferred` is generated inline (the batch is the background job).
+        """
+        reqs, resolved = zip(*[await self._resolved(r) for r in reqs]) if reqs else ((), ())
+        keys = [self._symptom_key(r.symptoms) for r in reqs]
+        uniq = list(dict.fromkeys(keys))
+        sets = [list(k) for k in uniq]
+        if self.agraph is not None:
+            rows = await self.agraph.recommendation_facts_many(sets)
+        else:
+            rows = await asyncio.to_thread(self.graph.recommendation_facts_many, sets)
+        facts = dict(zip(uniq, rows))
+
+        sem = asyncio.Semaphore(max_concurrency or settings.batch_llm_concurrency)
+        ranker = self._snapshot_ranker()
+
+        async def generate(r: RecommendRequest, f: RecommendationFacts) -> str:
+            async with sem:
+                return await agenerate_recommendations(age=r.age, gender=r.gender, symptoms=r.symptoms,
+                                                       lifestyle=r.lifestyle, facts=f[0], avoid_map=f[1],
+                                                       ranker=ranker)
+
+        jobs, planned = {}, []
+        for r, k, m in zip(reqs, keys, resolved):
+            f = facts[k]
+            if self.narrative_mode(r) == "skip":
+                planned.append((r, f, None, m))
+                continue
+            ck = self._llm_key(r, f)
+            if ck not in jobs:
+                jobs[ck] = asyncio.ensure_future(generate(r, f))
+            planned.append((r, f, jobs[ck], m))
+        try:
+            for i, (r, f, job, m) in enumerate(planned):
+                try:
+                    yield i, self._build_response(r.symptoms, f[0], f[1], await job if job else None, m)
+                except Exception as e:
+                    yield i, e
+        finally:
+            # client went away or the consumer stopped early: don't keep generating
+            for job in jobs.values():
+                job.cancel()
+
+    async def astream(self, req: RecommendRequest) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield ("suggestions", RecommendResponse) as soon as the graph answers, then ("token", str) LLM chunks."""
+        req, resolved = await self._resolved(req)
+        facts, avoid_map = await self.agraph_facts(req.symptoms)
+        yield "suggestions", self._build_response(req.symptoms, facts, avoid_map, None, resolved)
+        if self.narrative_mode(req) == "skip":
+            return
+        async for chunk in astream_recommendations(
+            age=req.age,
+            gender=req.gender,
+            symptoms=req.symptoms,
+            lifestyle=req.lifestyle,
+            facts=facts,
+            avoid_map=avoid_map,
+            ranker=self._snapshot_ranker()
+        ):
+            yield "token", chunk
+
+    def _snapshot_ranker(self) -> Optional[HerbRanker]:
+        # the snapshot keeps precomputed matrices for the whole graph (None without snapshots)
+        g = self.agraph if self.agraph is not None else self.graph
+        snap = g.current_snapshot if g is not None else None
+        return snap.ranker if snap is not None else None
+
+    def _ranker(self, facts: List[Dict[str, Any]], avoid_map: Dict[str, List[str]]) -> HerbRanker:
+        # without a snapshot, score the request's subgraph
+        return self._snapshot_ranker() or HerbRanker.from_facts(facts, avoid_map)
+
+    def _build_response(self, symptoms: List[str], facts: List[Dict[str, Any]], avoid_map: Dict[str, List[str]],
+                        llm_text: Optional[str], resolved: Optional[Dict[str, str]] = None) -> RecommendResponse:
+        why_by_herb = {}
         for f in facts:
-            h = f["herb"]
-            top.setdefault(h, {"why": [], "how": "tea/decoction 1-2x daily"})
             why = f.get("evidence") or f.get("condition")
-            if why and why not in top[h]["why"]:
-                top[h]["why"].append(why)
+            whys = why_by_herb.setdefault(f["herb"], [])
+            if why and why not in whys:
+                whys.append(why)
+        with span("rank"):
+            top, skipped = self._ranker(facts, avoid_map).rank_conflict_free(symptoms, k=5)
         suggestions = []
-        for i, (h, v) in enumerate(top.items()):
-            if i >= 5: break
+        for ranked in top:
+            h = ranked.name
             suggestions.append(HerbSuggestion(
                 name=h,
-                why="; ".join(v["why"]) or "Traditional support",
-                how_to_use=v["how"],
-                avoid_with=avoid_map.get(h, [])
+                why="; ".join(why_by_herb.get(h, [])) or "Traditional support",
+                how_to_use="tea/decoction 1-2x daily",
+                avoid_with=avoid_map.get(h, []),
+                score=round(ranked.score, 4)
             ))
 
         tips = [
@@ -48,15 +288,36 @@ class RecommenderService:
             suggestions=suggestions,
             tips=tips,
             disclaimer="This is an educational demo and not medical advice. Consult a qualified professional.",
-            debug={"llm": llm_text[:1200]}
+            debug={"llm": llm_text[:1200]} if llm_text is not None else None,
+            skipped_conflicts=skipped,
+            resolved_symptoms=resolved or {}
         )
 
     def diagnose(self, req: DiagnosisRequest) -> DiagnosisResponse:
-        conditions = self.graph.conditions_from_symptoms(req.symptoms)
-        out = generate_diagnosis(req.symptoms, req.lifestyle, conditions)
+        scored = self.graph.condition_scorer().score(req.symptoms, k=10)
+        out = generate_diagnosis(req.symptoms, req.lifestyle, [c.name for c in scored], [c.probability for c in scored])
+        return self._diagnosis_response(scored, out)
+
+    async def adiagnose(self, req: DiagnosisRequest) -> DiagnosisResponse:
+        req, resolved = await self._resolved(req)
+        if self.agraph is None:
+            scorer = await asyncio.to_thread(self.graph.condition_scorer)
+        else:
+            scorer = await self.agraph.condition_scorer()
+        scored = scorer.score(req.symptoms, k=10)
+        out = await agenerate_diagnosis(req.symptoms, req.lifestyle, [c.name for c in scored],
+                                        [c.probability for c in scored])
+        return self._diagnosis_response(scored, out, resolved)
+
+    @staticmethod
+    def _diagnosis_response(scored: List[ScoredCondition], out: Dict[str, Any],
+                            resolved: Optional[Dict[str, str]] = None) -> DiagnosisResponse:
         return DiagnosisResponse(
-            probable_conditions=conditions[:3],
+            probable_conditions=[c.name for c in scored[:3]],
             confidence=out["confidence"],
             rationale=out["text"],
-            disclaimer="This is an educational demo and not medical advice. Consult a qualified professional."
+            disclaimer="This is an educational demo and not medical advice. Consult a qualified professional.",
+            condition_scores=[ConditionScore(name=c.name, probability=round(c.probability, 4),
+                                             matched_symptoms=c.matched) for c in scored],
+            resolved_symptoms=resolved or {}
         )
@@ -0,0 +1,131 @@
+from typing import List, Dict, Any, Optional, Tuple
+import bisect
+import re
+
+# Match ranks, best first. The Cypher path in GraphService.search_herbs uses the same ranks.
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = range(5)
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def normalize(text: str) -> str:
+    """Trim and lowercase; the loader stores the same value as Herb.name_lc (toLower(trim(name)))."""
+    return (text or "").strip().lower()
+
+
+def tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def lucene_fuzzy_query(q: str) -> str:
+    """Full-text query equivalent of the fuzzy tier: every token must match within max_edits typos."""
+    return " AND ".join(f"{t}~{max_edits(t)}" if max_edits(t) else t for t in tokens(q))
+
+
+def max_edits(token: str) -> int:
+    """Allowed typos per query token: none for very short tokens, 2 for long ones."""
+    if len(token) < 3:
+        return 0
+    return 1 if len(token) < 6 else 2
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal-string-alignment distance (adjacent transpositions count as one edit), capped at limit + 1."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def _trigrams(s: str) -> set:
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+class HerbSearchIndex:
+    """In-process prefix/trigram index over herb names.
+
+    Ranking: exact > prefix > word prefix > substring, then (only if nothing matched literally)
+    typo-tolerant token matches ordered by total edit distance; ties are broken by name.
+    """
+
+    def __init__(self, names: List[str]):
+        self.names = sorted(set(names))
+        self.norm = {n: normalize(n) for n in self.names}
+        # sorted (normalized name, name) for bisect prefix scans
+        self._sorted = sorted((v, n) for n, v in self.norm.items())
+        self._trigrams: Dict[str, set] = {}
+        self._tokens: Dict[str, set] = {}
+        for n, v in self.norm.items():
+            for g in _trigrams(v):
+                self._trigrams.setdefault(g, set()).add(n)
+            for t in tokens(v):
+                self._tokens.setdefault(t, set()).add(n)
+
+    def _prefix(self, q: str) -> List[str]:
+        i = bisect.bisect_left(self._sorted, (q, ""))
+        out = []
+        while i < len(self._sorted) and self._sorted[i][0].startswith(q):
+            out.append(self._sorted[i][1])
+            i += 1
+        return out
+
+    def _substring_candidates(self, q: str):
+        grams = _trigrams(q)
+        if not grams:
+            return self.names
+        sets = sorted((self._trigrams.get(g, set()) for g in grams), key=len)
+        cands = set(sets[0])
+        for s in sets[1:]:
+            cands &= s
+        return cands
+
+    def _rank_literal(self, q: str) -> List[Tuple[int, str]]:
+        ranked = {n: (EXACT if self.norm[n] == q else PREFIX) for n in self._prefix(q)}
+        for n in self._substring_candidates(q):
+            if n in ranked:
+                continue
+            v = self.norm[n]
+            if q in v:
+                ranked[n] = WORD_PREFIX if (" " + q) in v else SUBSTRING
+        return sorted((r, n) for n, r in ranked.items())
+
+    def _rank_fuzzy(self, q: str) -> List[Tuple[int, str]]:
+        q_tokens = tokens(q)
+        if not q_tokens:
+            return []
+        total: Optional[Dict[str, int]] = None
+        for qt in q_tokens:
+            k = max_edits(qt)
+            best: Dict[str, int] = {}
+            for t, herbs in self._tokens.items():
+                d = edit_distance(qt, t, k)
+                if d <= k:
+                    for n in herbs:
+                        best[n] = min(best.get(n, d), d)
+            # every query token has to match some token of the name
+            total = best if total is None else {n: total[n] + d for n, d in best.items() if n in total}
+            if not total:
+                return []
+        return sorted((d, n) for n, d in total.items())
+
+    def search(self, q: str, limit: int = 50, offset: int = 0, fuzzy: bool = True) -> List[Tuple[str, int]]:
+        """Return [(name, rank)] for one page of results."""
+        q = normalize(q)
+        if not q:
+            return [(n, EXACT) for n in self.names[offset:offset + limit]]
+        ranked = self._rank_literal(q)
+        if ranked:
+            return [(n, r) for r, n in ranked[offset:offset + limit]]
+        if not fuzzy:
+            return []
+        return [(n, FUZZY) for _, n in self._rank_fuzzy(q)[offset:offset + limit]]
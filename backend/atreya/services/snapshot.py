@@ -0,0 +1,161 @@
+from typing import List, Dict, Any, Iterable, Tuple, Optional
+import time
+from .search import HerbSearchIndex
+from .ranking import HerbRanker
+from .diagnosis import ConditionScorer
+
+# Cypher used to pull the whole (small, read-mostly) graph into memory.
+SNAPSHOT_QUERIES = {
+    "herbs": "MATCH (h:Herb) RETURN h.name AS name, h.properties AS properties",
+    "symptoms": "MATCH (s:Symptom) RETURN s.name AS name, s.aliases AS aliases",
+    "has_symptom": "MATCH (c:Condition)-[:HAS_SYMPTOM]->(s:Symptom) RETURN c.name AS condition, s.name AS symptom",
+    "helps_with": "MATCH (h:Herb)-[r:HELPS_WITH]->(c:Condition) RETURN h.name AS herb, c.name AS condition, r.evidence AS evidence",
+    "interacts_with": "MATCH (a:Herb)-[:INTERACTS_WITH]->(b:Herb) RETURN a.name AS herb, b.name AS other",
+}
+
+
+class GraphSnapshot:
+    """Immutable in-memory copy of the knowledge graph with adjacency indexes.
+
+    Answers the same read queries as GraphService with the same results as the Cypher path
+    (matching is case-insensitive on symptom/herb names, duplicates and limits are preserved).
+    """
+
+    def __init__(self,
+                 herbs: Iterable[Tuple[str, Optional[List[str]]]],
+                 symptoms: Iterable[str],
+                 has_symptom: Iterable[Tuple[str, str]],
+                 helps_with: Iterable[Tuple[str, str, Any]],
+                 interacts_with: Iterable[Tuple[str, str]],
+                 version: Any = None,
+                 symptom_aliases: Optional[Dict[str, List[str]]] = None):
+        self.version = version
+        self.built_at = time.monotonic()
+        # wall clock, persisted with shared builds and artifacts so their age counts from this build
+        self.created = time.time()
+        self._ranker = None
+        self._condition_scorer = None
+
+        self.herb_properties: Dict[str, Optional[List[str]]] = {}
+        for name, props in herbs:
+            self.herb_properties[name] = props
+        self.herb_names = sorted(self.herb_properties)
+        self.herb_index = HerbSearchIndex(self.herb_names)
+        self.symptom_names = sorted(set(symptoms))
+        # symptom -> everyday phrasings (Symptom.aliases), embedded for free-text matching
+        self.aliases: Dict[str, List[str]] = {s: list(a) for s, a in (symptom_aliases or {}).items() if a}
+
+        # lower(symptom) -> [(symptom, [conditions])], one entry per Symptom node (names may differ by case)
+        by_symptom: Dict[str, List[str]] = {}
+        for cond, sym in has_symptom:
+            by_symptom.setdefault(sym, []).append(cond)
+        self.symptom_conditions: Dict[str, List[Tuple[str, List[str]]]] = {}
+        for sym, conds in by_symptom.items():
+            self.symptom_conditions.setdefault(sym.lower(), []).append((sym, conds))
+
+        # condition -> [(herb, evidence)]
+        self.condition_herbs: Dict[str, List[Tuple[str, Any]]] = {}
+        for herb, cond, evidence in helps_with:
+            self.condition_herbs.setdefault(cond, []).append((herb, evidence))
+
+        # lower(herb) -> [herb], herb -> distinct interacting herbs (either edge direction, like the Cypher)
+        self.herbs_by_lower: Dict[str, List[str]] = {}
+        for name in self.herb_names:
+            self.herbs_by_lower.setdefault(name.lower(), []).append(name)
+        self.interactions: Dict[str, List[str]] = {}
+        for herb, other in interacts_with:
+            for a, b in ((herb, other), (other, herb)):
+                avoid = self.interactions.setdefault(a, [])
+                if b not in avoid and b != a:
+                    avoid.append(b)
+
+    @classmethod
+    def from_rows(cls, rows: Dict[str, List[Any]], version: Any = None) -> "GraphSnapshot":
+        """Build from the records of each SNAPSHOT_QUERIES entry (sync or async driver, or dicts)."""
+        return cls(
+            herbs=[(r["name"], r["properties"]) for r in rows["herbs"]],
+            symptoms=[r["name"] for r in rows["symptoms"]],
+            symptom_aliases={r["name"]: r.get("aliases") for r in rows["symptoms"]},
+            has_symptom=[(r["condition"], r["symptom"]) for r in rows["has_symptom"]],
+            helps_with=[(r["herb"], r["condition"], r["evidence"]) for r in rows["helps_with"]],
+            interacts_with=[(r["herb"], r["other"]) for r in rows["interacts_with"]],
+            version=version,
+        )
+
+    @staticmethod
+    def fetch_rows(session) -> Dict[str, List[Dict[str, Any]]]:
+        return {k: [r.data() for r in session.run(q)] for k, q in SNAPSHOT_QUERIES.items()}
+
+    @staticmethod
+    async def afetch_rows(session) -> Dict[str, List[Dict[str, Any]]]:
+        rows = {}
+        for k, q in SNAPSHOT_QUERIES.items():
+            res = await session.run(q)
+            rows[k] = [r.data() async for r in res]
+        return rows
+
+    @classmethod
+    def from_session(cls, session, version: Any = None) -> "GraphSnapshot":
+        return cls.from_rows(cls.fetch_rows(session), version=version)
+
+    @classmethod
+    async def from_async_session(cls, session, version: Any = None) -> "GraphSnapshot":
+        return cls.from_rows(await cls.afetch_rows(session), version=version)
+
+    @property
+    def ranker(self) -> HerbRanker:
+        """Herb scoring matrices for the whole graph, built on first use."""
+        if self._ranker is None:
+            self._ranker = HerbRanker.from_snapshot(self)
+        return self._ranker
+
+    @property
+    def condition_scorer(self) -> ConditionScorer:
+        """Naive-Bayes likelihood tables for /diagnosis, built on first use."""
+        if self._condition_scorer is None:
+            self._condition_scorer = ConditionScorer.from_snapshot(self)
+        return self._condition_scorer
+
+    def age(self) -> float:
+        return time.monotonic() - self.built_at
+
+    def _matching_symptoms(self, symptoms: List[str]):
+        for key in dict.fromkeys(s.lower() for s in symptoms):
+            yield from self.symptom_conditions.get(key, [])
+
+    def search_herbs(self, q: str, limit: int = 50, offset: int = 0, fuzzy: bool = True) -> List[Dict[str, Any]]:
+        return [{"name": n, "properties": self.herb_properties[n] or []}
+                for n, _ in self.herb_index.search(q, limit=limit, offset=offset, fuzzy=fuzzy)]
+
+    def herbs_for_symptoms(self, symptoms: List[str]) -> List[Dict[str, Any]]:
+        out = []
+        for sym, conds in self._matching_symptoms(symptoms):
+            for c in conds:
+                for herb, evidence in self.condition_herbs.get(c, []):
+                    out.append({"herb": herb, "condition": c, "evidence": evidence,
+                                "properties": self.herb_properties.get(herb), "symptom": sym})
+        return out
+
+    def contraindications(self, herbs: List[str]) -> Dict[str, List[str]]:
+        m = {}
+        for key in dict.fromkeys(h.lower() for h in herbs):
+            for name in self.herbs_by_lower.get(key, []):
+                if self.interactions.get(name):
+                    m[name] = list(self.interactions[name])
+        return m
+
+    def conditions_from_symptoms(self, symptoms: List[str]) -> List[str]:
+        seen = {}
+        for _, conds in self._matching_symptoms(symptoms):
+            for c in conds:
+                seen.setdefault(c, None)
+        return list(seen)[:10]
+
+    def all_symptoms(self) -> List[str]:
+        return list(self.symptom_names)
+
+    def all_herbs(self) -> List[str]:
+        return list(self.herb_names)
+
+    def symptom_aliases(self) -> Dict[str, List[str]]:
+        return {s: list(a) for s, a in self.aliases.items()}
@@ -0,0 +1,86 @@
+from typing import Any, Optional
+import contextlib
+import json
+import logging
+import os
+import time
+import zipfile
+from .graph_artifact import ArtifactGraph, write_artifact
+from .snapshot import GraphSnapshot
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except Exception:
+    FCNTL_AVAILABLE = False
+
+log = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    """Graph snapshot published to a directory shared by the workers of one host (SNAPSHOT_SHARE_DIR).
+
+    The first worker to need a snapshot for a graph version takes an exclusive file lock, pulls the graph
+    from Neo4j and writes:
+      snapshot-<pid>-<ns>.npz    the snapshot as a graph artifact (see graph_artifact.py)
+      snapshot.json              graph version, original build time and the artifact's file name
+    Every worker, the builder included, then serves an ArtifactGraph over the memory-mapped artifact: the
+    string table, adjacency, ranker matrices and interaction bitset are the same page-cache pages in all
+    of them. Per worker are only what is built on first use from names (herb search index, diagnosis
+    tables, the ranker's name lookups). On tmpfs (/dev/shm) nothing touches the disk.
+    """
+
+    def __init__(self, directory: str, ttl: float = 300.0):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def load(self, version: Any) -> Optional[ArtifactGraph]:
+        """Published snapshot for `version` if it is younger than the TTL, else None."""
+        try:
+            with open(self._path("snapshot.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["version"] != version or time.time() - meta["built"] > self.ttl:
+                return None
+            return ArtifactGraph.open(self._path(meta["artifact"]))
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return None
+
+    def save(self, snap: GraphSnapshot) -> ArtifactGraph:
+        """Publish `snap` and return the mapped copy, so the builder does not keep its own dicts either."""
+        # a fresh name per build: workers still mapping the previous artifact keep a valid file
+        artifact = f"snapshot-{os.getpid()}-{time.time_ns()}.npz"
+        write_artifact(self._path(artifact), snap)
+        tmp = self._path(f"snapshot.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": snap.version, "built": snap.created, "artifact": artifact}, f, default=str)
+        os.replace(tmp, self._path("snapshot.json"))
+        for name in os.listdir(self.directory):
+            if name.startswith("snapshot-") and name != artifact:
+                with contextlib.suppress(OSError):
+                    os.remove(self._path(name))
+        return ArtifactGraph.open(self._path(artifact))
+
+    def acquire(self) -> Optional[int]:
+        """Block until this process holds the build lock; returns the fd for release() (None without fcntl)."""
+        if not FCNTL_AVAILABLE:
+            return None
+        fd = os.open(self._path("build.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    def release(self, fd: Optional[int]) -> None:
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    @contextlib.contextmanager
+    def lock(self):
+        fd = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(fd)
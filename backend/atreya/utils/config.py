@@ -1,12 +1,82 @@
 import os
 from dataclasses import dataclass
 
+NARRATIVE_MODES = ("inline", "skip", "deferred")
+
+def _flag(name: str, default: str = "0") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
 @dataclass
 class Settings:
     neo4j_uri: str = os.getenv("NEO4J_URI", "bolt://localhost:7687")
     neo4j_user: str = os.getenv("NEO4J_USER", "neo4j")
     neo4j_password: str = os.getenv("NEO4J_PASSWORD", "password")
+    # empty: the server's default database (costs the driver a home-database lookup per session)
+    neo4j_database: str = os.getenv("NEO4J_DATABASE", "")
+    # Neo4j driver connection pool
+    neo4j_max_pool_size: int = int(os.getenv("NEO4J_MAX_POOL_SIZE", "100"))
+    neo4j_acquisition_timeout: float = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", "60"))
+    neo4j_max_connection_lifetime: float = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", "3600"))
+    neo4j_connection_timeout: float = float(os.getenv("NEO4J_CONNECTION_TIMEOUT", "30"))
+    neo4j_pool_warmup: int = int(os.getenv("NEO4J_POOL_WARMUP", "4"))
+    neo4j_health_timeout: float = float(os.getenv("NEO4J_HEALTH_TIMEOUT", "2"))
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     openai_model: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    # LLM client: one pooled keep-alive client per process
+    llm_max_connections: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    llm_keepalive_expiry: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+    llm_timeout: float = float(os.getenv("LLM_TIMEOUT", "60"))
+    llm_warmup_ping: bool = _flag("LLM_WARMUP_PING")
+    # Benchmarks: deterministic fake chat model with a fixed latency instead of OpenAI
+    llm_fake: bool = _flag("LLM_FAKE")
+    llm_fake_latency: float = float(os.getenv("LLM_FAKE_LATENCY", "0"))
+    # Graph facts in the LLM prompt: compact per-herb lines, best-ranked first, cut at this many tokens (0: no cut)
+    prompt_compact_facts: bool = _flag("PROMPT_COMPACT_FACTS", "1")
+    prompt_facts_budget: int = int(os.getenv("PROMPT_FACTS_BUDGET", "1200"))
+    # LLM response cache: memory LRU/TTL tier + optional SQLite tier (empty path disables it)
+    llm_cache: bool = _flag("LLM_CACHE", "1")
+    llm_cache_size: int = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+    llm_cache_ttl: float = float(os.getenv("LLM_CACHE_TTL", "3600"))
+    llm_cache_sqlite: str = os.getenv("LLM_CACHE_SQLITE", "")
+    # Shared cache tier for multi-worker serving: memory (per worker), sqlite (LLM_CACHE_SQLITE) or redis (CACHE_URL);
+    # empty: sqlite when LLM_CACHE_SQLITE is set, else memory
+    cache_backend: str = os.getenv("CACHE_BACKEND", "").strip().lower()
+    cache_url: str = os.getenv("CACHE_URL", "")
+    # Default LLM narrative mode for /recommendations: inline, skip (graph-only) or deferred
+    narrative_mode: str = os.getenv("NARRATIVE_MODE", "inline").strip().lower()
+    narrative_jobs_max: int = int(os.getenv("NARRATIVE_JOBS_MAX", "1000"))
+    narrative_jobs_ttl: float = float(os.getenv("NARRATIVE_JOBS_TTL", "900"))
+    # /recommendations/batch: max concurrent LLM calls per batch
+    batch_llm_concurrency: int = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+    # Chat symptom catalog: background refresh on graph version change (polled) or TTL
+    catalog_ttl: float = float(os.getenv("CATALOG_TTL", "600"))
+    catalog_poll: float = float(os.getenv("CATALOG_POLL", "10"))
+    # Semantic symptom matching: free text -> nearest Symptom/Condition names (hashed n-grams or EMBEDDING_MODEL)
+    semantic_symptoms: bool = _flag("SEMANTIC_SYMPTOMS", "1")
+    semantic_threshold: float = float(os.getenv("SEMANTIC_THRESHOLD", "0.7"))
+    # extra similarity a condition-name hit needs over a symptom hit ("stress" the word vs Stress the condition)
+    semantic_condition_margin: float = float(os.getenv("SEMANTIC_CONDITION_MARGIN", "0.15"))
+    # /recommendations and /diagnosis: rewrite request symptoms that are not graph symptoms to the nearest ones
+    # (per request with `resolve_symptoms`); off keeps the terms exactly as sent
+    resolve_symptoms: bool = _flag("RESOLVE_SYMPTOMS")
+    embedding_model: str = os.getenv("EMBEDDING_MODEL", "")
+    embedding_dim: int = int(os.getenv("EMBEDDING_DIM", "512"))
+    # persisted, memory-mapped index (<path>.npy + <path>.json), reused across restarts and workers; empty: memory only
+    embedding_index_path: str = os.getenv("EMBEDDING_INDEX_PATH", "")
+    # In-memory graph snapshot: serve read queries without Neo4j round trips
+    graph_snapshot: bool = _flag("GRAPH_SNAPSHOT")
+    graph_snapshot_ttl: float = float(os.getenv("GRAPH_SNAPSHOT_TTL", "300"))
+    graph_version_poll: float = float(os.getenv("GRAPH_VERSION_POLL", "5"))
+    # serve every graph read from this artifact (graph/load_data.py --export) instead of Neo4j; empty: Neo4j
+    graph_artifact: str = os.getenv("GRAPH_ARTIFACT", "")
+    # directory (ideally on tmpfs, e.g. /dev/shm/atreya) where one worker publishes each snapshot build for the others
+    snapshot_share_dir: str = os.getenv("SNAPSHOT_SHARE_DIR", "")
+    # Instrumentation: stage timings + /metrics (Prometheus), optional Server-Timing response header
+    metrics: bool = _flag("METRICS")
+    server_timing: bool = _flag("SERVER_TIMING")
+
+    def __post_init__(self):
+        if self.narrative_mode not in NARRATIVE_MODES:
+            raise ValueError(f"NARRATIVE_MODE must be one of {', '.join(NARRATIVE_MODES)}, got {self.narrative_mode!r}")
 
 settings = Settings()
@@ -0,0 +1,127 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from .config import settings
+
+# seconds; covers sub-ms snapshot lookups up to slow LLM generations
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _fmt_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels] + ([extra] if extra else [])
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name, self.help = name, help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            lines += [f"{self.name}{_fmt_labels(k)} {v}" for k, v in sorted(self._values.items())]
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Tuple[float, ...] = BUCKETS):
+        self.name, self.help, self.buckets = name, help, buckets
+        # labels -> (per-bucket counts incl. +Inf, sum)
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[i] += 1
+            total[0] += value
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cum = 0
+                for bound, n in zip(self.buckets + (float("inf"),), counts):
+                    cum += n
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_fmt_labels(key, le)} {cum}")
+                lines.append(f"{self.name}_sum{_fmt_labels(key)} {total[0]}")
+                lines.append(f"{self.name}_count{_fmt_labels(key)} {cum}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram("atreya_request_duration_seconds", "HTTP request latency (until response headers).")
+REQUESTS = Counter("atreya_requests_total", "HTTP requests by route and status.")
+STAGE_SECONDS = Histogram("atreya_stage_duration_seconds", "Time spent per stage (neo4j, graph, rank, llm, ...).")
+STAGE_ERRORS = Counter("atreya_stage_errors_total", "Stages that raised.")
+PROMPT_FACT_TOKENS = Histogram("atreya_prompt_fact_tokens", "Tokens of graph facts per LLM prompt, raw repr vs compact.",
+                               buckets=(50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000))
+PROMPT_TOKENS_SAVED = Counter("atreya_prompt_tokens_saved_total", "Prompt tokens saved by the compact fact encoding.")
+METRICS = (REQUEST_SECONDS, REQUESTS, STAGE_SECONDS, STAGE_ERRORS, PROMPT_FACT_TOKENS, PROMPT_TOKENS_SAVED)
+
+# per-request list of (stage, seconds) for the Server-Timing header; None outside an instrumented request
+_request_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("atreya_request_spans", default=None)
+_NOOP = nullcontext()
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        STAGE_SECONDS.observe(elapsed, stage=self.stage)
+        if exc_type is not None:
+            STAGE_ERRORS.inc(stage=self.stage)
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((self.stage, elapsed))
+        return False
+
+
+def span(stage: str):
+    """`with span("neo4j"): ...` records the block's duration; a shared no-op when METRICS is off."""
+    return _Span(stage) if settings.metrics else _NOOP
+
+
+def start_request() -> List[Tuple[str, float]]:
+    spans: List[Tuple[str, float]] = []
+    _request_spans.set(spans)
+    return spans
+
+
+def server_timing(spans: List[Tuple[str, float]], total: float) -> str:
+    """Server-Timing header value: summed duration per stage (ms) plus the request total."""
+    per_stage: Dict[str, float] = {}
+    for stage, seconds in spans:
+        per_stage[stage] = per_stage.get(stage, 0.0) + seconds
+    items = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in per_stage.items()]
+    return ", ".join(items + [f"total;dur={total * 1000:.2f}"])
+
+
+def exposition() -> str:
+    """All metrics in the Prometheus text format."""
+    lines: List[str] = []
+    for m in METRICS:
+        lines += m.expose()
+    return "\n".join(lines) + "\n"
@@ -1,17 +1,76 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Union
 from fastapi.middleware.cors import CORSMiddleware
-from atreya.models.schemas import RecommendRequest, RecommendResponse, DiagnosisRequest, DiagnosisResponse, HerbSearchResponse
-from atreya.services.graph import GraphService
+from atreya.models.schemas import (RecommendRequest, RecommendResponse, DiagnosisRequest, DiagnosisResponse,
+                                  HerbSearchResponse, ChatRequest, ChatResponse, BatchRecommendRequest,
+                                  NarrativeResponse)
+from atreya.services.graph import AsyncGraphService
+from atreya.services.graph_artifact import AsyncArtifactGraphService
 from atreya.services.recommender import RecommenderService
 from atreya.utils.config import settings
-from atreya.models.schemas import RecommendRequest, RecommendResponse, DiagnosisRequest, DiagnosisResponse, HerbSearchResponse, ChatRequest, ChatResponse
 from atreya.services.chat import ChatService
+from atreya.services.llm import awarm_up, aclose_llm, response_cache
+from atreya.utils import metrics
+
+
+# Services are built in the lifespan handler rather than at import: importing this module stays cheap
+# (tests, tooling, worker boot) and the Neo4j driver is created on the event loop that will use it.
+graph: Optional[Union[AsyncGraphService, AsyncArtifactGraphService]] = None
+recommender: Optional[RecommenderService] = None
+chat_service: Optional[ChatService] = None
+log = logging.getLogger("atreya")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global graph, recommender, chat_service
+    # Async driver + async routes: concurrent requests overlap their Neo4j and LLM waits
+    # instead of each holding a threadpool worker.
+    # GRAPH_ARTIFACT: the exported graph, memory-mapped, answers everything and no Neo4j server is needed
+    graph = AsyncArtifactGraphService(settings.graph_artifact) if settings.graph_artifact else AsyncGraphService()
+    recommender = RecommenderService(agraph=graph)
+    chat_service = ChatService(graph=None, recommender=recommender, agraph=graph)
+    # /recommendations and /diagnosis can map free-text symptoms onto graph symptoms through the chat catalog's index
+    # (opt-in: RESOLVE_SYMPTOMS or the request's resolve_symptoms)
+    recommender.symptom_resolver = chat_service.resolve_symptoms
+    # cached LLM generations are dropped whenever a graph reload is picked up (snapshot rebuild or version poll)
+    graph.version_listeners.append(response_cache.on_graph_version)
+
+    # build the shared LLM client/chain now so the first request doesn't pay for it
+    await awarm_up(ping=settings.llm_warmup_ping)
+    # fail fast on bad credentials/URI in the logs, and pre-open pooled connections;
+    # the app still starts so /health can report the database as down
+    try:
+        await graph.verify_connectivity()
+        await graph.warm_up()
+    except Exception as e:
+        log.warning("Neo4j not reachable at startup: %s", e)
+    # keep the chat symptom catalog in sync with graph reloads without per-message queries
+    chat_service.catalog.start()
+    try:
+        yield
+    finally:
+        # stop background work first, then close pools; each step runs even if an earlier one fails
+        try:
+            await chat_service.catalog.stop()
+        finally:
+            try:
+                await aclose_llm()
+            finally:
+                await graph.close()
 
 
 app = FastAPI(
     title="Atreya API",
     version="1.0.0",
-    description="Educational demo: personalized wellness suggestions using LangChain + Neo4j. Not medical advice."
+    description="Educational demo: personalized wellness suggestions using LangChain + Neo4j. Not medical advice.",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -22,43 +81,131 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-graph = GraphService()
-recommender = RecommenderService(graph=graph)
-chat_service = ChatService(graph=graph, recommender=recommender)
+async def instrument(request: Request, call_next):
+    spans = metrics.start_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    total = time.perf_counter() - start
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    metrics.REQUEST_SECONDS.observe(total, method=request.method, route=path)
+    metrics.REQUESTS.inc(method=request.method, route=path, status=str(response.status_code))
+    if settings.server_timing:
+        response.headers["Server-Timing"] = metrics.server_timing(spans, total)
+    return response
+
+# registered only when enabled: with METRICS off requests skip the middleware entirely
+if settings.metrics:
+    app.middleware("http")(instrument)
 
 
 @app.get("/health")
-def health():
-    return {"status": "ok"}
+async def health():
+    """Readiness: 503 when Neo4j is unreachable (and no snapshot can serve reads) or the pool is saturated."""
+    h = await graph.health()
+    if h["pool"]["saturated"]:
+        status = "saturated"
+    elif h["database"] == "up":
+        status = "ok"
+    else:
+        status = "degraded" if h["snapshot_age"] is not None else "unavailable"
+    ready = status in ("ok", "degraded")
+    return JSONResponse({"status": status, "ready": ready, **h}, status_code=200 if ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text format: request latency/count per route, per-stage durations (neo4j, graph, rank, llm)."""
+    if not settings.metrics:
+        raise HTTPException(status_code=404, detail="metrics are disabled (set METRICS=1)")
+    return PlainTextResponse(metrics.exposition(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    # counters are per worker process; the shared tier (CACHE_BACKEND) is common to all of them
+    return {**response_cache.stats(), "worker": os.getpid()}
 
 @app.post("/recommendations", response_model=RecommendResponse)
-def recommendations(req: RecommendRequest):
+async def recommendations(req: RecommendRequest):
     try:
-        result = recommender.recommend(req)
+        result = await recommender.arecommend(req)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(event: str, data) -> str:
+    if hasattr(data, "model_dump"):
+        data = data.model_dump()
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _event_stream(events):
+    # graph results go out first, then LLM text chunks; errors become an `error` event mid-stream
+    try:
+        async for event, data in events:
+            yield _sse(event, {"text": data} if event == "token" else data)
+        yield _sse("done", {})
+    except Exception as e:
+        yield _sse("error", {"detail": str(e)})
+
+def _sse_response(events) -> StreamingResponse:
+    return StreamingResponse(_event_stream(events), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/recommendations/narrative/{job}", response_model=NarrativeResponse)
+async def recommendation_narrative(job: str):
+    """Poll a narrative requested with `"narrative": "deferred"`."""
+    out = recommender.narratives.get(job)
+    if out is None:
+        raise HTTPException(status_code=404, detail="unknown or expired narrative job")
+    return out
+
+@app.post("/recommendations/stream")
+async def recommendations_stream(req: RecommendRequest):
+    """Server-Sent Events: `suggestions` (graph-based RecommendResponse), then `token` events, then `done`."""
+    return _sse_response(recommender.astream(req))
+
+@app.post("/recommendations/batch")
+async def recommendations_batch(req: BatchRecommendRequest):
+    """NDJSON, one line per input profile in input order: {"index", "result"} or {"index", "error"}."""
+    async def lines():
+        try:
+            async for i, res in recommender.arecommend_many(req.requests):
+                if isinstance(res, Exception):
+                    yield json.dumps({"index": i, "error": str(res)}) + "\n"
+                else:
+                    yield json.dumps({"index": i, "result": res.model_dump()}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @app.post("/diagnosis", response_model=DiagnosisResponse)
-def diagnosis(req: DiagnosisRequest):
+async def diagnosis(req: DiagnosisRequest):
     try:
-        result = recommender.diagnose(req)
+        result = await recommender.adiagnose(req)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/herbs/search", response_model=HerbSearchResponse)
-def herbs_search(q: str = ""):
+async def herbs_search(q: str = "",
+                       limit: int = Query(50, ge=1, le=500),
+                       offset: int = Query(0, ge=0),
+                       fuzzy: bool = True):
     try:
-        herbs = graph.search_herbs(q)
-        return {"query": q, "herbs": herbs}
+        # fetch one extra row to tell whether another page exists
+        herbs = await graph.search_herbs(q, limit=limit + 1, offset=offset, fuzzy=fuzzy)
+        return {"query": q, "herbs": herbs[:limit], "offset": offset, "limit": limit, "has_more": len(herbs) > limit}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
+async def chat(req: ChatRequest):
     try:
-        out = chat_service.reply(req.message)
+        out = await chat_service.areply(req.message)
         return out
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """Server-Sent Events: `extracted`, `reply` (markdown ChatResponse), then `done`; like /chat, no LLM narrative."""
+    return _sse_response(chat_service.astream(req.message))
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+sys.path.insert(0, os.path.join(ROOT, "graph"))
+
+DATA_DIR = os.path.join(ROOT, "graph", "data")
+
+
+@pytest.fixture(scope="session")
+def snap():
+    """GraphSnapshot of the bundled CSVs, built with the loader's MERGE semantics (no Neo4j)."""
+    import load_data
+    from atreya.services.snapshot import GraphSnapshot
+    return GraphSnapshot.from_rows(load_data.csv_rows(DATA_DIR), version="test")
@@ -0,0 +1,91 @@
+import os
+import time
+
+import pytest
+
+from atreya.services.cache import LRUCache, ResponseCache, SQLiteCache
+from atreya.services.graph import GraphService
+from atreya.services.graph_artifact import ArtifactGraphService, write_artifact
+from atreya.services.snapshot import GraphSnapshot
+from atreya.utils.config import settings
+
+import load_data
+from conftest import DATA_DIR
+
+
+@pytest.fixture
+def shared(tmp_path):
+    tier = SQLiteCache(str(tmp_path / "cache.db"))
+    yield tier
+    tier.close()
+
+
+def test_first_version_namespaces_without_invalidating(shared):
+    cache = ResponseCache(LRUCache(), shared)
+    cache.on_graph_version(1)
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    assert shared.get("1:k") == "v"
+    assert cache.counters["invalidations"] == 0
+
+
+def test_new_version_drops_older_entries(shared):
+    cache = ResponseCache(LRUCache(), shared)
+    cache.on_graph_version(1)
+    cache.set("k", "old")
+    cache.on_graph_version(1)
+    assert cache.counters["invalidations"] == 0
+    cache.on_graph_version(2)
+    assert cache.get("k") is None
+    assert shared.get("1:k") is None
+    assert cache.counters["invalidations"] == 1
+
+
+def test_invalidation_keeps_entries_another_worker_wrote_for_the_new_version(shared):
+    ahead, behind = ResponseCache(LRUCache(), shared), ResponseCache(LRUCache(), shared)
+    ahead.on_graph_version(1)
+    behind.on_graph_version(1)
+    ahead.on_graph_version(2)
+    ahead.set("k", "fresh")
+    behind.on_graph_version(2)
+    assert behind.get("k") == "fresh"
+    assert behind.counters["shared_hits"] == 1
+
+
+def test_unversioned_graph_announces_each_new_marker(monkeypatch):
+    g = GraphService(snapshot=False)
+    heard = []
+    g.version_listeners.append(heard.append)
+    markers = iter([1, 1, 2])
+    monkeypatch.setattr(g, "_read", lambda work: next(markers))
+    for _ in range(3):
+        g.graph_version()
+    assert heard == [1, 2]
+    g.close()
+
+
+def test_snapshot_rebuild_announces_its_version(snap, monkeypatch):
+    g = GraphService(snapshot=True)
+    g.store = None
+    heard = []
+    g.version_listeners.append(heard.append)
+    monkeypatch.setattr(g, "_fetch_snapshot", lambda: snap)
+    g.refresh_snapshot()
+    assert heard == [snap.version]
+    g.close()
+
+
+def test_artifact_service_announces_initial_and_replaced_versions(snap, tmp_path, monkeypatch):
+    path = str(tmp_path / "graph.npz")
+    write_artifact(path, snap)
+    g = ArtifactGraphService(path)
+    heard = []
+    g.version_listeners.append(heard.append)
+    g.all_herbs()
+    assert heard == [snap.version]
+
+    write_artifact(path, GraphSnapshot.from_rows(load_data.csv_rows(DATA_DIR), version="next"))
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    monkeypatch.setattr(settings, "graph_version_poll", 0.0)
+    g.all_herbs()
+    assert heard == [snap.version, "next"]
@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+import pytest
+from neo4j.exceptions import ServiceUnavailable
+
+from atreya.services.graph import AsyncGraphService, GraphService
+from atreya.utils.config import settings
+
+
+def _down(*args, **kwargs):
+    raise ServiceUnavailable("connection refused")
+
+
+@pytest.fixture
+def service(snap, monkeypatch):
+    monkeypatch.setattr(settings, "neo4j_uri", "bolt://127.0.0.1:9")
+    g = GraphService(snapshot=True)
+    g.store = None
+    g._snapshot = snap
+    yield g
+    g.close()
+
+
+def test_snapshot_served_while_version_poll_fails(service, snap, monkeypatch):
+    monkeypatch.setattr(service, "graph_version", _down)
+    assert service.snapshot() is snap
+    assert service._retry_at > time.monotonic()
+
+
+def test_expired_snapshot_served_while_neo4j_down(service, snap, monkeypatch):
+    monkeypatch.setattr(service, "graph_version", _down)
+    monkeypatch.setattr(service, "_build_snapshot", _down)
+    monkeypatch.setattr(settings, "graph_snapshot_ttl", 0.0)
+    assert service.snapshot() is snap
+
+
+def test_failed_poll_backs_off(service, snap, monkeypatch):
+    calls = []
+    monkeypatch.setattr(service, "graph_version", lambda: calls.append(1) or _down())
+    service.snapshot()
+    service.snapshot()
+    assert len(calls) == 1
+
+
+def test_first_build_error_propagates(service, monkeypatch):
+    service._snapshot = None
+    monkeypatch.setattr(service, "_build_snapshot", _down)
+    with pytest.raises(ServiceUnavailable):
+        service.snapshot()
+
+
+def test_health_ping_is_bounded(service, monkeypatch):
+    monkeypatch.setattr(settings, "neo4j_health_timeout", 0.2)
+    monkeypatch.setattr(service, "_ping", lambda: time.sleep(5))
+    start = time.monotonic()
+    assert service.health()["database"] == "down"
+    assert time.monotonic() - start < 1.0
+
+
+def test_async_snapshot_served_while_version_poll_fails(snap, monkeypatch):
+    async def down():
+        raise ServiceUnavailable("connection refused")
+
+    async def run():
+        g = AsyncGraphService(snapshot=True)
+        g.store = None
+        g._snapshot = snap
+        monkeypatch.setattr(g, "graph_version", down)
+        try:
+            return await g.snapshot(), g._retry_at
+        finally:
+            await g.close()
+
+    monkeypatch.setattr(settings, "neo4j_uri", "bolt://127.0.0.1:9")
+    served, retry_at = asyncio.run(run())
+    assert served is snap
+    assert retry_at > time.monotonic()
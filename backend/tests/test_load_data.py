@@ -0,0 +1,116 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+import load_data
+from conftest import DATA_DIR
+
+
+class FakeResult(list):
+    def consume(self):
+        return None
+
+
+class FakeSession:
+    """Just enough of a Neo4j session for incremental_load: the manifest round-trips, data writes are logged."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        if "LoadManifest" in query and "MERGE" in query:
+            self.db.manifest[params["stage"]] = (params["keys"], params["hashes"])
+            return FakeResult()
+        if "LoadManifest" in query:
+            return FakeResult({"stage": st, "keys": k, "hashes": h} for st, (k, h) in self.db.manifest.items())
+        self.db.writes.append((query, params.get("rows")))
+        return FakeResult()
+
+    def execute_write(self, work, *args):
+        return work(self, *args)
+
+
+class FakeDriver:
+    def __init__(self):
+        self.manifest, self.writes = {}, []
+
+    def session(self):
+        return FakeSession(self)
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    db = FakeDriver()
+    monkeypatch.setattr(load_data, "driver", db)
+    return db
+
+
+@pytest.fixture
+def data(tmp_path):
+    shutil.copytree(DATA_DIR, tmp_path, dirs_exist_ok=True)
+    return str(tmp_path)
+
+
+def _edit(data, filename, change):
+    path = f"{data}/{filename}"
+    df = pd.read_csv(path, keep_default_na=False)
+    change(df).to_csv(path, index=False)
+
+
+def test_diff_rows_reports_inserts_updates_and_deletes():
+    key = lambda r: [r["name"]]
+    previous, _, _ = load_data.diff_rows([{"name": "a", "p": 1}, {"name": "b", "p": 1}], key, {})
+    fps, changed, deleted = load_data.diff_rows([{"name": "a", "p": 2}, {"name": "c", "p": 1}], key, previous)
+    assert [r["name"] for r in changed] == ["a", "c"]
+    assert deleted == [["b"]]
+    assert set(fps) == {load_data.row_key(["a"]), load_data.row_key(["c"])}
+
+
+def test_first_load_inserts_everything(graph, data):
+    stats = load_data.incremental_load(data)
+    assert load_data.has_changes(stats)
+    assert stats["herbs"]["changed"] == len(pd.read_csv(f"{data}/herbs.csv"))
+    assert set(graph.manifest) == {stage for stage, *_ in load_data.BULK_STAGES}
+
+
+def test_unchanged_reload_writes_nothing(graph, data):
+    load_data.incremental_load(data)
+    graph.writes.clear()
+    stats = load_data.incremental_load(data)
+    assert not load_data.has_changes(stats)
+    assert graph.writes == []
+
+
+def test_updated_herb_rewrites_only_that_row(graph, data):
+    load_data.incremental_load(data)
+    graph.writes.clear()
+
+    def change(df):
+        df.loc[0, "properties"] = "adaptogen"
+        return df
+    _edit(data, "herbs.csv", change)
+    stats = load_data.incremental_load(data)
+    assert stats["herbs"] == {"changed": 1, "deleted": 0}
+    # the herb node already existed, so its edges are not re-applied
+    assert stats["herb_conditions"] == {"changed": 0, "deleted": 0}
+    assert graph.writes == [(load_data.BULK_HERBS, [{"name": "Ashwagandha", "properties": ["adaptogen"]}])]
+
+
+def test_new_herb_and_removed_interaction(graph, data):
+    load_data.incremental_load(data)
+    interactions = pd.read_csv(f"{data}/interactions.csv")
+    _edit(data, "herbs.csv", lambda df: pd.concat([df, pd.DataFrame([{"name": "Neem", "properties": "skin"}])]))
+    _edit(data, "interactions.csv", lambda df: df.iloc[1:])
+    stats = load_data.incremental_load(data)
+    assert stats["herbs"] == {"changed": 1, "deleted": 0}
+    assert stats["interactions"] == {"changed": 0, "deleted": 1}
+    removed = {"herb1": interactions.iloc[0]["herb1"], "herb2": interactions.iloc[0]["herb2"]}
+    assert (load_data.DELETE_INTERACTIONS, [removed]) in graph.writes
+    assert load_data.has_changes(stats)
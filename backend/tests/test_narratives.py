@@ -0,0 +1,66 @@
+import asyncio
+import gc
+import weakref
+
+import pytest
+
+from atreya.services.cache import LRUCache
+from atreya.services.recommender import NarrativeJobs
+from atreya.utils.config import Settings
+
+
+def test_evicted_job_still_finishes_and_publishes():
+    async def run():
+        loop = asyncio.get_running_loop()
+        jobs = NarrativeJobs(maxsize=1, shared=LRUCache())
+        waits, ids = [], []
+
+        async def narrative(text, wait):
+            return await wait + text
+
+        # each narrative waits on a future only its own task references, like a request in flight
+        for text in ("first", "second"):
+            wait = loop.create_future()
+            waits.append(weakref.ref(wait))
+            ids.append(jobs.submit(narrative(text, wait)))
+            del wait
+        await asyncio.sleep(0)
+        gc.collect()
+        for ref in waits:
+            if ref() is not None:
+                ref().set_result("narrative: ")
+        for _ in range(5):
+            await asyncio.sleep(0)
+        return jobs, ids
+
+    jobs, (first, second) = asyncio.run(run())
+    assert jobs.get(first) == {"job": first, "status": "done", "text": "narrative: first"}
+    assert jobs.get(second) == {"job": second, "status": "done", "text": "narrative: second"}
+    assert not jobs._pending
+
+
+def test_pending_state_until_done():
+    async def run():
+        jobs = NarrativeJobs()
+        release = asyncio.Event()
+
+        async def narrative():
+            await release.wait()
+            return "text"
+
+        job = jobs.submit(narrative())
+        pending = jobs.get(job)
+        release.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return pending, jobs.get(job)
+
+    pending, finished = asyncio.run(run())
+    assert pending["status"] == "pending"
+    assert finished["text"] == "text"
+
+
+def test_unknown_narrative_mode_is_rejected():
+    with pytest.raises(ValueError, match="NARRATIVE_MODE"):
+        Settings(narrative_mode="later")
+    assert Settings(narrative_mode="deferred").narrative_mode == "deferred"
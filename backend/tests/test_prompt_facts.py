@@ -0,0 +1,43 @@
+import pytest
+
+from atreya.services import llm, prompt_facts
+from atreya.services.graph import _snapshot_facts
+from atreya.services.ranking import HerbRanker
+from atreya.utils import metrics
+from atreya.utils.config import settings
+
+
+@pytest.fixture(scope="module")
+def request_facts(snap):
+    symptoms = snap.all_symptoms()[:3]
+    facts, avoid_map = _snapshot_facts(snap, symptoms)
+    return symptoms, facts, avoid_map
+
+
+def _no_rebuild(*args, **kwargs):
+    raise AssertionError("ranker rebuilt from facts")
+
+
+def test_encode_facts_uses_the_given_ranker(snap, request_facts, monkeypatch):
+    symptoms, facts, avoid_map = request_facts
+    monkeypatch.setattr(HerbRanker, "from_facts", _no_rebuild)
+    enc = prompt_facts.encode_facts(symptoms, facts, avoid_map, 0, snap.ranker)
+    assert enc.herbs == len({f["herb"] for f in facts})
+    assert enc.omitted == 0
+
+
+def test_recommendation_inputs_pass_the_ranker(snap, request_facts, monkeypatch):
+    symptoms, facts, avoid_map = request_facts
+    monkeypatch.setattr(settings, "prompt_compact_facts", True)
+    monkeypatch.setattr(HerbRanker, "from_facts", _no_rebuild)
+    inputs = llm.recommendation_inputs(30, "female", symptoms, [], facts, avoid_map, snap.ranker)
+    assert isinstance(inputs["facts"], str)
+
+
+def test_tokens_saved_recorded_without_metrics_flag(request_facts, monkeypatch):
+    symptoms, facts, avoid_map = request_facts
+    monkeypatch.setattr(settings, "prompt_compact_facts", True)
+    monkeypatch.setattr(settings, "metrics", False)
+    before = sum(metrics.PROMPT_TOKENS_SAVED._values.values())
+    llm.recommendation_inputs(30, "female", symptoms, [], facts, avoid_map)
+    assert sum(metrics.PROMPT_TOKENS_SAVED._values.values()) > before
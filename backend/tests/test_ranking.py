@@ -0,0 +1,35 @@
+import itertools
+
+import pytest
+
+from atreya.services.graph import _snapshot_facts
+from atreya.services.ranking import HerbRanker
+
+
+def _symptom_sets(snap):
+    names = snap.all_symptoms()
+    return [names[i:i + 3] for i in range(0, len(names), 3)]
+
+
+def test_request_subgraph_ranks_like_the_full_graph(snap):
+    for symptoms in _symptom_sets(snap):
+        facts, avoid_map = _snapshot_facts(snap, symptoms)
+        local = HerbRanker.from_facts(facts, avoid_map)
+        assert [(r.name, pytest.approx(r.score)) for r in local.rank(symptoms, k=10)] == \
+               [(r.name, r.score) for r in snap.ranker.rank(symptoms, k=10)]
+
+
+def test_conflict_free_picks_never_interact(snap):
+    for symptoms in _symptom_sets(snap):
+        top, skipped = snap.ranker.rank_conflict_free(symptoms, k=5)
+        names = [r.name for r in top]
+        for a, b in itertools.combinations(names, 2):
+            assert b not in snap.interactions.get(a, [])
+        assert not set(skipped) & set(names)
+
+
+def test_round_trip_through_arrays(snap):
+    ranker = snap.ranker
+    copy = HerbRanker.from_arrays(ranker.symptoms, ranker.conditions, ranker.herbs, ranker.arrays(), ranker.I)
+    for symptoms in _symptom_sets(snap):
+        assert copy.rank_conflict_free(symptoms, 5) == ranker.rank_conflict_free(symptoms, 5)
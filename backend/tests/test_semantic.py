@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from atreya.models.schemas import DiagnosisRequest, RecommendRequest
+from atreya.services.catalog import CatalogState
+from atreya.services.chat import ChatService
+from atreya.services.embedding import EmbeddingIndex, HashedNgramEncoder, SemanticSymptoms
+from atreya.services.recommender import RecommenderService
+
+
+@pytest.fixture(scope="module")
+def state(snap):
+    index = ChatService.build_index(snap.all_symptoms(), snap.condition_scorer.condition_symptoms, None,
+                                    snap.symptom_aliases())
+    return CatalogState(None, snap.all_symptoms(), index, 0.0)
+
+
+@pytest.fixture(scope="module")
+def chat():
+    return ChatService(graph=None, recommender=None)
+
+
+@pytest.mark.parametrize("message", [
+    "feeling cold all week",
+    "sleeping too much",
+    "skin rash and itching",
+    "I have a stomach ache",
+])
+def test_near_misses_detect_nothing(chat, state, message):
+    assert chat.extract(message, state) == {"symptoms": [], "lifestyle": [], "conditions": []}
+
+
+def test_condition_match_is_not_expanded_into_symptoms(chat, state):
+    out = chat.extract("bloating and stress", state)
+    assert out["symptoms"] == ["bloating"]
+    assert out["conditions"] == ["Stress"]
+
+
+@pytest.mark.parametrize("message, symptoms", [
+    ("I'm tired all the time and can't sleep", ["fatigue", "poor sleep"]),
+    ("my knees hurt and I'm stiff in the morning", ["joint ache", "stiffness"]),
+    ("zits and greasy skin", ["pimples", "oily skin"]),
+    ("feeling queasy and bloated", ["nausea", "bloating"]),
+    ("running a temperature with shivers", ["high temperature", "chills"]),
+])
+def test_aliases_resolve_to_graph_symptoms(chat, state, message, symptoms):
+    assert chat.extract(message, state)["symptoms"] == symptoms
+
+
+def test_resolve_terms_searches_all_terms_at_once(state, monkeypatch):
+    semantic = state.index.semantic
+    calls = []
+    search = semantic.index.search
+    monkeypatch.setattr(semantic.index, "search", lambda texts, **kw: calls.append(list(texts)) or search(texts, **kw))
+    assert semantic.resolve_terms(["fatigue", "exhausted", "zits", "stress"]) == {"exhausted": "fatigue",
+                                                                                 "zits": "pimples"}
+    assert calls == [["exhausted", "zits", "stress"]]
+
+
+def test_unversioned_index_is_rebuilt(tmp_path, snap):
+    encoder = HashedNgramEncoder(64)
+    path = str(tmp_path / "symptoms")
+    SemanticSymptoms.build(snap.all_symptoms(), {}, None, path=path, encoder=encoder)
+    assert not (tmp_path / "symptoms.json").exists()
+    EmbeddingIndex.build([("cough", "cough")], encoder, None).save(path)
+    assert EmbeddingIndex.load(path, encoder, None) is None
+    assert EmbeddingIndex.load(path, encoder, "v1") is None
+
+
+class _Resolver:
+    def __init__(self, mapping):
+        self.mapping = mapping
+        self.calls = 0
+
+    async def __call__(self, terms):
+        self.calls += 1
+        return {t: self.mapping[t] for t in terms if t in self.mapping}
+
+
+@pytest.mark.parametrize("flag, default, rewritten", [
+    (None, False, False), (True, False, True), (False, True, False), (None, True, True),
+])
+def test_request_symptoms_are_resolved_only_when_asked(monkeypatch, flag, default, rewritten):
+    from atreya.utils.config import settings
+    monkeypatch.setattr(settings, "resolve_symptoms", default)
+    rec = RecommenderService()
+    rec.symptom_resolver = _Resolver({"exhausted": "fatigue"})
+    for req in (RecommendRequest(age=30, gender="other", symptoms=["exhausted", "cough"], resolve_symptoms=flag),
+                DiagnosisRequest(symptoms=["exhausted", "cough"], resolve_symptoms=flag)):
+        out, resolved = asyncio.run(rec._resolved(req))
+        if rewritten:
+            assert out.symptoms == ["fatigue", "cough"] and resolved == {"exhausted": "fatigue"}
+        else:
+            assert out.symptoms == ["exhausted", "cough"] and resolved == {}
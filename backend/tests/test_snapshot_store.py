@@ -0,0 +1,55 @@
+import time
+
+import numpy as np
+import pytest
+
+from atreya.services.graph_artifact import ArtifactGraph
+from atreya.services.snapshot_store import SnapshotStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path), ttl=300.0)
+
+
+def test_round_trip_answers_like_the_snapshot(store, snap):
+    shared = store.save(snap)
+    assert isinstance(shared, ArtifactGraph)
+    symptoms = snap.all_symptoms()[:3]
+    herbs = snap.all_herbs()[:5]
+    assert shared.version == snap.version
+    assert shared.all_symptoms() == snap.all_symptoms()
+    assert shared.herbs_for_symptoms(symptoms) == snap.herbs_for_symptoms(symptoms)
+    assert shared.contraindications(herbs) == snap.contraindications(herbs)
+    assert shared.symptom_aliases() == snap.symptom_aliases()
+    assert shared.ranker.rank_conflict_free(symptoms, 5) == snap.ranker.rank_conflict_free(symptoms, 5)
+
+
+def test_ranker_matrices_are_mapped_not_rebuilt(store, snap):
+    store.save(snap)
+    loaded = store.load(snap.version)
+    ranker = loaded.ranker
+    for name in ("A", "E", "SH"):
+        assert np.shares_memory(np.asarray(getattr(ranker, name).data), loaded.a[f"rank_{name}_val"])
+    assert np.shares_memory(ranker.I.bits, loaded.a["interaction_bits"])
+
+
+def test_age_counts_from_the_original_build(store, snap, monkeypatch):
+    store.save(snap)
+    later = snap.created + 120.0
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert store.load(snap.version).age() == pytest.approx(120.0)
+
+
+def test_expired_or_other_version_is_not_loaded(store, snap, monkeypatch):
+    store.save(snap)
+    assert store.load("other") is None
+    later = snap.created + store.ttl + 1.0
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert store.load(snap.version) is None
+
+
+def test_previous_artifacts_are_removed(store, snap, tmp_path):
+    store.save(snap)
+    store.save(snap)
+    assert len(list(tmp_path.glob("snapshot-*.npz"))) == 1
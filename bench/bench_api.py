@@ -0,0 +1,213 @@
+"""Load-test the API on a synthetic graph with a deterministic fake LLM; save throughput and latency percentiles.
+
+    # generate the graph, replace the contents of the Neo4j in .env with it, run every endpoint
+    python bench/bench_api.py --load --herbs 2000 --conditions 500 --symptoms 800 --concurrency 1 8 32
+
+    # rerun on the loaded graph and compare with an earlier result
+    python bench/bench_api.py --baseline bench/results/20260101T120000-abc1234.json
+
+The API runs in-process through an ASGI transport unless --url points at a running server; that server has
+to be started with LLM_FAKE=1 (and LLM_FAKE_LATENCY, LLM_CACHE=0) itself. Results go to bench/results/ named
+after the time and the git commit, so regressions show up when comparing runs across commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import synth_graph  # noqa: E402
+
+ENDPOINTS = ("recommendations", "diagnosis", "herbs/search", "chat")
+LIFESTYLE = ["smoker", "sedentary", "stress", "poor sleep"]
+
+
+def percentile(samples, p):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))] if s else float("nan")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def load_graph(data_dir, batch_size):
+    """Replace the graph with the synthetic CSVs through graph/load_data.py's bulk path."""
+    sys.path.insert(0, os.path.join(ROOT, "graph"))
+    import load_data
+    t0 = time.perf_counter()
+    load_data.clear()
+    load_data.create_constraints()
+    load_data.bulk_load(data_dir, batch_size)
+    load_data.write_manifest(data_dir, batch_size)
+    load_data.bump_version()
+    load_data.driver.close()
+    return time.perf_counter() - t0
+
+
+def make_requests(endpoint, tables, n, rnd):
+    """n (method, path, kwargs) tuples for one endpoint, drawn from the synthetic vocabulary."""
+    symptoms = sorted({s for row in tables["conditions.csv"] for s in row["symptoms"].split("|")})
+    herbs = [row["name"] for row in tables["herbs.csv"]]
+    out = []
+    for _ in range(n):
+        syms = rnd.sample(symptoms, rnd.randint(1, 3))
+        life = rnd.sample(LIFESTYLE, rnd.randint(0, 2))
+        if endpoint == "recommendations":
+            body = {"age": rnd.randint(18, 80), "gender": rnd.choice(["female", "male"]),
+                    "symptoms": syms, "lifestyle": life}
+            out.append(("POST", "/recommendations", {"json": body}))
+        elif endpoint == "diagnosis":
+            out.append(("POST", "/diagnosis", {"json": {"symptoms": syms, "lifestyle": life}}))
+        elif endpoint == "herbs/search":
+            name = rnd.choice(herbs).lower()
+            # prefixes, whole names and one-letter typos
+            q = rnd.choice([name[:3], name, name[:-2] + name[-1] + name[-2]])
+            out.append(("GET", "/herbs/search", {"params": {"q": q, "limit": 20}}))
+        else:
+            msg = f"I'm {rnd.randint(18, 80)} and have {' and '.join(syms)}; {' '.join(life) or 'otherwise fine'}."
+            out.append(("POST", "/chat", {"json": {"message": msg}}))
+    return out
+
+
+async def drive(client, requests, concurrency):
+    """Run requests with `concurrency` workers; returns (latencies ms of 2xx responses, errors, wall seconds)."""
+    queue = list(reversed(requests))
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            method, path, kwargs = queue.pop()
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(method, path, **kwargs)
+                ok = r.status_code < 400
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+            else:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - t0
+
+
+async def run(args, tables):
+    import httpx
+    lifespan = None
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=args.timeout)
+    else:
+        import main as api
+        # ASGITransport does not send lifespan events; run the app's startup/shutdown around the benchmark
+        lifespan = api.app.router.lifespan_context(api.app)
+        await lifespan.__aenter__()
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://bench",
+                                   timeout=args.timeout)
+    results = []
+    try:
+        for endpoint in args.endpoints:
+            for c in args.concurrency:
+                rnd = random.Random(f"{args.seed}:{endpoint}:{c}")
+                await drive(client, make_requests(endpoint, tables, args.warmup, rnd), c)
+                lat, errors, wall = await drive(client, make_requests(endpoint, tables, args.requests, rnd), c)
+                results.append({
+                    "endpoint": endpoint, "concurrency": c, "requests": args.requests, "errors": errors,
+                    "rps": len(lat) / wall if wall else 0.0,
+                    "p50_ms": percentile(lat, 50), "p95_ms": percentile(lat, 95), "p99_ms": percentile(lat, 99),
+                })
+                r = results[-1]
+                print(f"{endpoint:<16}{c:>6}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+                      f"{r['p99_ms']:>10.2f}{errors:>8}", flush=True)
+    finally:
+        await client.aclose()
+        if lifespan is not None:
+            await lifespan.__aexit__(None, None, None)
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        base = {(r["endpoint"], r["concurrency"]): r for r in json.load(f)["results"]}
+    print(f"\nvs {os.path.basename(baseline_path)}")
+    print(f"{'endpoint':<16}{'conc':>6}{'rps':>10}{'p95':>10}")
+    for r in results:
+        b = base.get((r["endpoint"], r["concurrency"]))
+        if b and b["rps"] and b["p95_ms"]:
+            print(f"{r['endpoint']:<16}{r['concurrency']:>6}{(r['rps'] / b['rps'] - 1) * 100:>+9.1f}%"
+                  f"{(r['p95_ms'] / b['p95_ms'] - 1) * 100:>+9.1f}%")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--herbs", type=int, default=2000)
+    p.add_argument("--conditions", type=int, default=500)
+    p.add_argument("--symptoms", type=int, default=800)
+    p.add_argument("--interaction-density", type=float, default=0.002)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--data-dir", default=os.path.join(ROOT, "bench", "data", "synth"))
+    p.add_argument("--load", action="store_true", help="clear the configured Neo4j and load the synthetic graph")
+    p.add_argument("--batch-size", type=int, default=5000)
+    p.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    p.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    p.add_argument("--requests", type=int, default=200, help="measured requests per endpoint and concurrency level")
+    p.add_argument("--warmup", type=int, default=20)
+    p.add_argument("--llm-latency-ms", type=float, default=300.0, help="fake LLM latency per call")
+    p.add_argument("--llm-cache", action="store_true", help="keep the LLM response cache on (off by default)")
+    p.add_argument("--snapshot", action="store_true", help="serve reads from the in-memory graph snapshot")
+    p.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    p.add_argument("--timeout", type=float, default=60.0)
+    p.add_argument("--out", default=os.path.join(ROOT, "bench", "results"))
+    p.add_argument("--baseline", help="earlier results file to compare against")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # settings are read at import time, so the environment is set before the app is imported
+    os.environ.update({
+        "LLM_FAKE": "1",
+        "LLM_FAKE_LATENCY": str(args.llm_latency_ms / 1000.0),
+        "LLM_CACHE": "1" if args.llm_cache else "0",
+        "GRAPH_SNAPSHOT": "1" if args.snapshot else "0",
+    })
+    tables = synth_graph.generate(args.herbs, args.conditions, args.symptoms, args.interaction_density, args.seed)
+    load_seconds = None
+    if args.load:
+        synth_graph.write(tables, args.data_dir)
+        load_seconds = load_graph(args.data_dir, args.batch_size)
+        print(f"loaded synthetic graph in {load_seconds:.1f}s")
+
+    print(f"{'endpoint':<16}{'conc':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    results = asyncio.run(run(args, tables))
+
+    commit = git_commit()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"{stamp}-{commit}.json")
+    config = {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "data_dir")}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"commit": commit, "timestamp": stamp, "config": config, "load_seconds": load_seconds,
+                   "results": results}, f, indent=2)
+    print(f"saved {path}")
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Micro-benchmark ChatService symptom extraction: per-symptom substring loop vs. the prebuilt PhraseMatcher.
+
+    python bench/bench_chat_matcher.py --sizes 10 100 1000 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from atreya.services.chat import ChatService, LIFESTYLE_KEYWORDS  # noqa: E402
+
+MESSAGE = ("I have been feeling fatigue and anxiety for weeks, with a sore throat and some bloating after meals. "
+           "Work is stressful, I'm a smoker and I sit all day with poor sleep most nights.")
+
+
+def synthetic_catalog(n, seed=0):
+    rnd = random.Random(seed)
+    base = ["fatigue", "anxiety", "sore throat", "bloating", "cough", "gas", "nausea", "joint ache"]
+    syll = ["ka", "ri", "mo", "te", "na", "shu", "vi", "lo", "pa", "de"]
+    out = list(base[:n])
+    while len(out) < n:
+        words = ["".join(rnd.choice(syll) for _ in range(rnd.randint(2, 4))) for _ in range(rnd.randint(1, 3))]
+        out.append(" ".join(words))
+    return sorted(set(out))
+
+
+def naive_extract(text, catalog):
+    """The original ChatService.extract loop."""
+    syms = [s for s in catalog if s.lower() in text]
+    lifestyle = [label for label, keys in LIFESTYLE_KEYWORDS.items() if any(k in text for k in keys)]
+    return {"symptoms": syms, "lifestyle": lifestyle}
+
+
+def per_call_us(fn, iterations):
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - t0) / iterations * 1e6
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    p.add_argument("--iterations", type=int, default=200)
+    args = p.parse_args(argv)
+
+    text = ChatService._normalize(MESSAGE)
+    print(f"{'catalog':>8}{'naive us':>12}{'matcher us':>12}{'build ms':>10}{'speedup':>9}")
+    for n in args.sizes:
+        catalog = synthetic_catalog(n)
+        t0 = time.perf_counter()
+        matcher = ChatService.build_matcher(catalog)
+        build_ms = (time.perf_counter() - t0) * 1000
+        naive = per_call_us(lambda: naive_extract(text, catalog), args.iterations)
+        fast = per_call_us(lambda: matcher.find(text), args.iterations)
+        print(f"{n:>8}{naive:>12.1f}{fast:>12.1f}{build_ms:>10.1f}{naive / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare the single-roundtrip recommendation query with the old two-query path against a live Neo4j.
+
+    python bench/bench_recommend_query.py --iterations 200 --symptoms bloating gas fatigue
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from atreya.services.graph import GraphService  # noqa: E402
+from atreya.services.recommender import RecommenderService  # noqa: E402
+
+
+def percentile(samples, p):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(round(p / 100.0 * (len(s) - 1))))]
+
+
+def timed(fn, symptoms, iterations, warmup):
+    for _ in range(warmup):
+        fn(symptoms)
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn(symptoms)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--iterations", type=int, default=200)
+    p.add_argument("--warmup", type=int, default=20)
+    p.add_argument("--symptoms", nargs="+", default=["bloating", "gas", "fatigue", "cough"])
+    args = p.parse_args(argv)
+
+    graph = GraphService(snapshot=False)
+    try:
+        paths = {
+            "two queries": RecommenderService(graph, single_query=False).graph_facts,
+            "single query": RecommenderService(graph, single_query=True).graph_facts,
+        }
+        two, one = (sorted(map(repr, fn(args.symptoms)[0])) for fn in paths.values())
+        if two != one:
+            print("warning: the two paths returned different facts", file=sys.stderr)
+        print(f"{'path':<14}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+        for name, fn in paths.items():
+            samples = timed(fn, args.symptoms, args.iterations, args.warmup)
+            print(f"{name:<14}{percentile(samples, 50):>10.2f}{percentile(samples, 95):>10.2f}"
+                  f"{statistics.mean(samples):>10.2f}")
+    finally:
+        graph.close()
+
+
+if __name__ == "__main__":
+    main()
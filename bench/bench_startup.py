@@ -0,0 +1,128 @@
+"""Cold-start profile of the API: `-X importtime` summary per package plus the time to finish the lifespan startup.
+
+    python bench/bench_startup.py --runs 5
+    python bench/bench_startup.py --env OPENAI_API_KEY=sk-... --baseline bench/results/20260101T120000-abc1234-startup.json
+
+Every run is a fresh interpreter, so nothing is served from an already-imported module. Startup includes the
+Neo4j connectivity check and pool warm-up against the Neo4j in the environment; an unreachable server is
+logged and skipped by the app, which then measures the import and service construction alone.
+Results go to bench/results/<time>-<commit>-startup.json.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from bench_api import ROOT, git_commit
+
+BACKEND = os.path.join(ROOT, "backend")
+
+# run in the child: import the app, then enter and leave its lifespan, and print the phase timings as JSON
+STARTUP_PROBE = """
+import asyncio, json, logging, time
+logging.disable(logging.WARNING)
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+async def cycle():
+    ctx = main.app.router.lifespan_context(main.app)
+    await ctx.__aenter__()
+    t2 = time.perf_counter()
+    await ctx.__aexit__(None, None, None)
+    return t2, time.perf_counter()
+t2, t3 = asyncio.run(cycle())
+print(json.dumps({"import_ms": (t1 - t0) * 1e3, "startup_ms": (t2 - t1) * 1e3, "shutdown_ms": (t3 - t2) * 1e3}))
+"""
+
+
+def parse_importtime(stderr):
+    """(total µs of `import main`, self µs per top-level package) from -X importtime output."""
+    total, per_package = 0, defaultdict(int)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        per_package[name.split(".")[0]] += int(self_us)
+        if name == "main":
+            total = int(cumulative)
+    return total, per_package
+
+
+def run_child(code, env, importtime=False):
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    proc = subprocess.run(cmd, cwd=BACKEND, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "child failed")
+    return proc
+
+
+def profile(runs, env, top):
+    totals, packages = [], defaultdict(list)
+    for _ in range(runs):
+        total, per_package = parse_importtime(run_child("import main", env, importtime=True).stderr)
+        totals.append(total / 1e3)
+        for name, us in per_package.items():
+            packages[name].append(us / 1e3)
+    phases = [json.loads(run_child(STARTUP_PROBE, env).stdout.strip().splitlines()[-1]) for _ in range(runs)]
+    slowest = sorted(((statistics.median(v + [0.0] * (runs - len(v))), k) for k, v in packages.items()), reverse=True)
+    return {
+        "importtime_ms": statistics.median(totals),
+        "import_ms": statistics.median(p["import_ms"] for p in phases),
+        "startup_ms": statistics.median(p["startup_ms"] for p in phases),
+        "shutdown_ms": statistics.median(p["shutdown_ms"] for p in phases),
+        "packages": [{"package": k, "self_ms": ms} for ms, k in slowest[:top]],
+    }
+
+
+def compare(result, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        base = json.load(f)["result"]
+    print(f"\nvs {os.path.basename(baseline_path)}")
+    for key in ("importtime_ms", "import_ms", "startup_ms", "shutdown_ms"):
+        if base.get(key):
+            print(f"{key:<16}{base[key]:>10.1f} -> {result[key]:>8.1f} ms ({(result[key] / base[key] - 1) * 100:+.1f}%)")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement; medians are reported")
+    p.add_argument("--top", type=int, default=15, help="packages listed by import self time")
+    p.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                   help="extra environment for the app, e.g. OPENAI_API_KEY=... to include the LLM stack")
+    p.add_argument("--out", default=os.path.join(ROOT, "bench", "results"))
+    p.add_argument("--baseline", help="earlier startup results file to compare against")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    env = dict(os.environ, **dict(kv.split("=", 1) for kv in args.env))
+    result = profile(args.runs, env, args.top)
+
+    print(f"import main (-X importtime) {result['importtime_ms']:>8.1f} ms")
+    print(f"import main (wall)          {result['import_ms']:>8.1f} ms")
+    print(f"lifespan startup            {result['startup_ms']:>8.1f} ms")
+    print(f"lifespan shutdown           {result['shutdown_ms']:>8.1f} ms")
+    print(f"\n{'package':<28}{'self ms':>10}")
+    for row in result["packages"]:
+        print(f"{row['package']:<28}{row['self_ms']:>10.1f}")
+
+    commit = git_commit()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"{stamp}-{commit}-startup.json")
+    # only the names of the extra variables are recorded, never their values
+    config = {"runs": args.runs, "env": sorted(kv.split("=", 1)[0] for kv in args.env), "python": sys.version.split()[0]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"commit": commit, "timestamp": stamp, "config": config, "result": result}, f, indent=2)
+    print(f"\nsaved {path}")
+    if args.baseline:
+        compare(result, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
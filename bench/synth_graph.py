@@ -0,0 +1,99 @@
+"""Generate a synthetic Atreya graph as the CSV files graph/load_data.py reads.
+
+    python bench/synth_graph.py --herbs 2000 --conditions 500 --symptoms 800 --interaction-density 0.002 --out bench/data/synth
+
+The same arguments and seed always produce the same files.
+"""
+import argparse
+import csv
+import os
+import random
+
+SYLLABLES = ["ka", "ri", "mo", "te", "na", "shu", "vi", "lo", "pa", "de", "ra", "mi", "go", "sa", "tu", "ve"]
+PROPERTIES = ["adaptogen", "digestive", "calming", "respiratory", "immune", "anti-inflammatory", "sleep",
+              "carminative", "tonic", "cooling", "warming", "antioxidant"]
+EVIDENCE = ["Traditional use", "Traditional use; small RCTs suggest benefit", "Clinical trial evidence",
+            "Meta-analysis of randomized trials", "Observational studies", "Anecdotal reports"]
+
+
+def _names(rnd, n, words, title):
+    out, seen = [], set()
+    while len(out) < n:
+        name = " ".join("".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 3)))
+                        for _ in range(rnd.randint(*words)))
+        name = name.title() if title else name
+        if name not in seen:
+            seen.add(name)
+            out.append(name)
+    return out
+
+
+def _skewed(rnd, items, k, weights):
+    # a few symptoms/conditions are very common, like in real data
+    picked = set()
+    while len(picked) < min(k, len(items)):
+        picked.add(rnd.choices(items, weights=weights)[0])
+    return sorted(picked)
+
+
+def generate(herbs=2000, conditions=500, symptoms=800, interaction_density=0.002, seed=0):
+    """Return {csv name: rows}; interaction_density is the fraction of herb pairs that interact."""
+    rnd = random.Random(seed)
+    herb_names = _names(rnd, herbs, (1, 2), True)
+    condition_names = _names(rnd, conditions, (1, 2), True)
+    # condition and herb names share a generator; keep them apart
+    condition_names = [f"{c} Syndrome" for c in condition_names]
+    symptom_names = _names(rnd, symptoms, (1, 2), False)
+    sym_weights = [1.0 / (i + 1) ** 0.8 for i in range(len(symptom_names))]
+    cond_weights = [1.0 / (i + 1) ** 0.8 for i in range(len(condition_names))]
+
+    herb_rows = [{"name": h, "properties": "|".join(rnd.sample(PROPERTIES, rnd.randint(1, 3)))} for h in herb_names]
+    condition_rows = [{"name": c, "symptoms": "|".join(_skewed(rnd, symptom_names, rnd.randint(2, 6), sym_weights))}
+                      for c in condition_names]
+    herb_condition_rows = [{"herb": h, "condition": c, "evidence": rnd.choice(EVIDENCE)}
+                           for h in herb_names
+                           for c in _skewed(rnd, condition_names, rnd.randint(1, 4), cond_weights)]
+    pairs = set()
+    target = int(interaction_density * len(herb_names) * (len(herb_names) - 1) / 2)
+    while len(pairs) < target:
+        a, b = rnd.sample(herb_names, 2)
+        if (b, a) not in pairs:
+            pairs.add((a, b))
+    interaction_rows = [{"herb1": a, "herb2": b} for a, b in sorted(pairs)]
+    return {
+        "herbs.csv": herb_rows,
+        "conditions.csv": condition_rows,
+        "herb_conditions.csv": herb_condition_rows,
+        "interactions.csv": interaction_rows,
+    }
+
+
+def write(tables, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    for name, rows in tables.items():
+        with open(os.path.join(out_dir, name), "w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=list(rows[0].keys()) if rows else ["herb1", "herb2"])
+            w.writeheader()
+            w.writerows(rows)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--herbs", type=int, default=2000)
+    p.add_argument("--conditions", type=int, default=500)
+    p.add_argument("--symptoms", type=int, default=800)
+    p.add_argument("--interaction-density", type=float, default=0.002, help="fraction of herb pairs that interact")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", default=os.path.join("bench", "data", "synth"))
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    tables = generate(args.herbs, args.conditions, args.symptoms, args.interaction_density, args.seed)
+    write(tables, args.out)
+    print(", ".join(f"{name}: {len(rows)} rows" for name, rows in tables.items()) + f" -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
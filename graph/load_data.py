@@ -1,6 +1,11 @@
 import pandas as pd
 from neo4j import GraphDatabase
+import argparse
+import hashlib
+import json
 import os
+import sys
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,6 +13,8 @@ load_dotenv()
 URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 USER = os.getenv("NEO4J_USER", "neo4j")
 PASSWORD = os.getenv("NEO4J_PASSWORD", "password")
+DATA_DIR = os.getenv("ATREYA_DATA_DIR", "graph/data")
+BATCH_SIZE = int(os.getenv("LOAD_BATCH_SIZE", "5000"))
 
 driver = GraphDatabase.driver(URI, auth=(USER, PASSWORD))
 
@@ -20,10 +27,24 @@ def create_constraints():
         s.run("CREATE CONSTRAINT IF NOT EXISTS FOR (h:Herb) REQUIRE h.name IS UNIQUE")
         s.run("CREATE CONSTRAINT IF NOT EXISTS FOR (c:Condition) REQUIRE c.name IS UNIQUE")
         s.run("CREATE CONSTRAINT IF NOT EXISTS FOR (s:Symptom) REQUIRE s.name IS UNIQUE")
+        # herb search: text index on the normalized name, full-text index for typo-tolerant matching
+        s.run("CREATE TEXT INDEX herb_name_lc IF NOT EXISTS FOR (h:Herb) ON (h.name_lc)")
+        s.run("CREATE FULLTEXT INDEX herb_name_ft IF NOT EXISTS FOR (h:Herb) ON EACH [h.name]")
+        s.run("MATCH (h:Herb) WHERE h.name_lc IS NULL SET h.name_lc = toLower(trim(h.name))")
+
+def bump_version():
+    """Write a new graph version marker so API workers holding a snapshot/catalog know to refresh."""
+    with driver.session() as s:
+        r = s.run("MERGE (m:GraphMeta {id: 'atreya'}) SET m.version = timestamp() RETURN m.version AS version").single()
+        return r["version"]
+
+def split_pipe(value):
+    """Split a pipe-separated CSV cell into stripped items, ignoring empty/NaN cells."""
+    return [x.strip() for x in str(value).split("|") if x and str(x) != "nan"]
 
 def upsert_herb(tx, name, properties):
     tx.run("""MERGE (h:Herb {name:$name})
-             SET h.properties = $properties""", name=name, properties=properties)
+             SET h.properties = $properties, h.name_lc = toLower(trim($name))""", name=name, properties=properties)
 
 def upsert_condition(tx, name):
     tx.run("MERGE (c:Condition {name:$name})", name=name)
@@ -44,22 +65,35 @@ def relate_interaction(tx, h1, h2):
     tx.run("""MATCH (a:Herb {name:$h1}),(b:Herb {name:$h2})
              MERGE (a)-[:INTERACTS_WITH]->(b)""", h1=h1, h2=h2)
 
-def load():
-    herbs = pd.read_csv("graph/data/herbs.csv")
-    conditions = pd.read_csv("graph/data/conditions.csv")
-    hc = pd.read_csv("graph/data/herb_conditions.csv")
-    inter = pd.read_csv("graph/data/interactions.csv")
+def set_symptom_aliases(tx, symptom, aliases):
+    # MATCH, not MERGE: aliases of a symptom no condition has are dropped like edges to unknown nodes
+    tx.run("MATCH (s:Symptom {name:$s}) SET s.aliases = $aliases", s=symptom, aliases=aliases)
+
+# optional CSVs: a missing file loads as empty
+OPTIONAL_FILES = {"symptom_aliases.csv": ["symptom", "aliases"]}
+
+def read_csv(data_dir, filename, **kwargs):
+    path = os.path.join(data_dir, filename)
+    if filename in OPTIONAL_FILES and not os.path.exists(path):
+        empty = pd.DataFrame(columns=OPTIONAL_FILES[filename])
+        return iter([empty]) if kwargs.get("chunksize") else empty
+    return pd.read_csv(path, **kwargs)
+
+def load(data_dir=DATA_DIR):
+    herbs = read_csv(data_dir, "herbs.csv")
+    conditions = read_csv(data_dir, "conditions.csv")
+    hc = read_csv(data_dir, "herb_conditions.csv")
+    inter = read_csv(data_dir, "interactions.csv")
+    aliases = read_csv(data_dir, "symptom_aliases.csv")
 
     with driver.session() as s:
         # nodes
         for _, row in herbs.iterrows():
-            props = [p.strip() for p in str(row.get("properties","")).split("|") if p and str(p) != "nan"]
-            s.execute_write(upsert_herb, row["name"], props)
+            s.execute_write(upsert_herb, row["name"], split_pipe(row.get("properties","")))
         for _, row in conditions.iterrows():
             s.execute_write(upsert_condition, row["name"])
             # symptoms list pipe-separated
-            syms = [x.strip() for x in str(row.get("symptoms","")).split("|") if x and str(x) != "nan"]
-            for sy in syms:
+            for sy in split_pipe(row.get("symptoms","")):
                 s.execute_write(upsert_symptom, sy)
                 s.execute_write(relate_condition_symptom, row["name"], sy)
 
@@ -70,11 +104,352 @@ def load():
         for _, row in inter.iterrows():
             s.execute_write(relate_interaction, row["herb1"], row["herb2"])
 
+        # everyday phrasings of symptoms, embedded next to the names for free-text matching
+        for _, row in aliases.iterrows():
+            s.execute_write(set_symptom_aliases, row["symptom"], split_pipe(row.get("aliases", "")))
+
+# --- Bulk mode: one UNWIND transaction per CSV chunk ---
+# Each query mirrors the per-row upsert_*/relate_* functions above so both modes build the same graph.
+
+BULK_HERBS = """
+UNWIND $rows AS row
+MERGE (h:Herb {name: row.name})
+SET h.properties = row.properties, h.name_lc = toLower(trim(row.name))
+"""
+
+BULK_CONDITIONS = """
+UNWIND $rows AS row
+MERGE (c:Condition {name: row.name})
+WITH c, row
+UNWIND row.symptoms AS sy
+MERGE (s:Symptom {name: sy})
+MERGE (c)-[:HAS_SYMPTOM]->(s)
+"""
+
+BULK_HERB_CONDITIONS = """
+UNWIND $rows AS row
+MATCH (h:Herb {name: row.herb}), (c:Condition {name: row.condition})
+MERGE (h)-[r:HELPS_WITH]->(c)
+SET r.evidence = row.evidence
+"""
+
+BULK_INTERACTIONS = """
+UNWIND $rows AS row
+MATCH (a:Herb {name: row.herb1}), (b:Herb {name: row.herb2})
+MERGE (a)-[:INTERACTS_WITH]->(b)
+"""
+
+BULK_SYMPTOM_ALIASES = """
+UNWIND $rows AS row
+MATCH (s:Symptom {name: row.symptom})
+SET s.aliases = row.aliases
+"""
+
+def _herb_rows(df):
+    return [{"name": r["name"], "properties": split_pipe(r.get("properties", ""))} for r in df.to_dict("records")]
+
+def _condition_rows(df):
+    return [{"name": r["name"], "symptoms": split_pipe(r.get("symptoms", ""))} for r in df.to_dict("records")]
+
+def _herb_condition_rows(df):
+    return [{"herb": r["herb"], "condition": r["condition"], "evidence": r.get("evidence", "")} for r in df.to_dict("records")]
+
+def _interaction_rows(df):
+    return [{"herb1": r["herb1"], "herb2": r["herb2"]} for r in df.to_dict("records")]
+
+def _symptom_alias_rows(df):
+    return [{"symptom": r["symptom"], "aliases": split_pipe(r.get("aliases", ""))} for r in df.to_dict("records")]
+
+# (stage, csv file, row builder, cypher) in dependency order: nodes before edges.
+BULK_STAGES = [
+    ("herbs", "herbs.csv", _herb_rows, BULK_HERBS),
+    ("conditions", "conditions.csv", _condition_rows, BULK_CONDITIONS),
+    ("herb_conditions", "herb_conditions.csv", _herb_condition_rows, BULK_HERB_CONDITIONS),
+    ("interactions", "interactions.csv", _interaction_rows, BULK_INTERACTIONS),
+    ("symptom_aliases", "symptom_aliases.csv", _symptom_alias_rows, BULK_SYMPTOM_ALIASES),
+]
+
+def _write_batch(tx, query, rows):
+    tx.run(query, rows=rows).consume()
+
+def bulk_load(data_dir=DATA_DIR, batch_size=BATCH_SIZE):
+    """Stream each CSV in chunks of `batch_size` rows and write every chunk in a single UNWIND transaction.
+
+    Returns per-stage stats: {stage: {"rows", "seconds", "rows_per_sec"}}.
+    """
+    stats = {}
+    with driver.session() as s:
+        for stage, filename, build_rows, query in BULK_STAGES:
+            t0 = time.perf_counter()
+            n = 0
+            for chunk in read_csv(data_dir, filename, chunksize=batch_size):
+                rows = build_rows(chunk)
+                s.execute_write(_write_batch, query, rows)
+                n += len(rows)
+            dt = time.perf_counter() - t0
+            rate = n / dt if dt > 0 else float("inf")
+            stats[stage] = {"rows": n, "seconds": dt, "rows_per_sec": rate}
+            print(f"  {stage}: {n} rows in {dt:.2f}s ({rate:,.0f} rows/s)")
+    return stats
+
+# --- Incremental mode: fingerprint every CSV row and apply only the diff ---
+# The fingerprints of the last load live in the graph itself as one (:LoadManifest {stage}) node per CSV,
+# so clear() also resets them and a reload after a wipe simply re-inserts everything.
+
+DELETE_HERBS = "UNWIND $rows AS name MATCH (h:Herb {name: name}) DETACH DELETE h"
+
+DELETE_CONDITIONS = "UNWIND $rows AS name MATCH (c:Condition {name: name}) DETACH DELETE c"
+
+DELETE_HERB_CONDITIONS = """
+UNWIND $rows AS row
+MATCH (:Herb {name: row.herb})-[r:HELPS_WITH]->(:Condition {name: row.condition})
+DELETE r
+"""
+
+DELETE_INTERACTIONS = """
+UNWIND $rows AS row
+MATCH (:Herb {name: row.herb1})-[r:INTERACTS_WITH]->(:Herb {name: row.herb2})
+DELETE r
+"""
+
+# Updated conditions may have lost symptoms, so drop stale HAS_SYMPTOM edges before re-merging.
+UPSERT_CONDITIONS = """
+UNWIND $rows AS row
+MERGE (c:Condition {name: row.name})
+WITH c, row
+OPTIONAL MATCH (c)-[r:HAS_SYMPTOM]->(old:Symptom)
+WHERE NOT old.name IN row.symptoms
+DELETE r
+WITH DISTINCT c, row
+UNWIND row.symptoms AS sy
+MERGE (s:Symptom {name: sy})
+MERGE (c)-[:HAS_SYMPTOM]->(s)
+"""
+
+DELETE_SYMPTOM_ALIASES = "UNWIND $rows AS name MATCH (s:Symptom {name: name}) REMOVE s.aliases"
+
+DELETE_ORPHAN_SYMPTOMS = "MATCH (s:Symptom) WHERE NOT (s)<-[:HAS_SYMPTOM]-() DELETE s"
+
+# stage -> (row key, upsert cypher, delete cypher, delete payload)
+INCREMENTAL_STAGES = {
+    "herbs": (lambda r: [r["name"]], BULK_HERBS, DELETE_HERBS, lambda k: k[0]),
+    "conditions": (lambda r: [r["name"]], UPSERT_CONDITIONS, DELETE_CONDITIONS, lambda k: k[0]),
+    "herb_conditions": (lambda r: [r["herb"], r["condition"]], BULK_HERB_CONDITIONS, DELETE_HERB_CONDITIONS,
+                        lambda k: {"herb": k[0], "condition": k[1]}),
+    "interactions": (lambda r: [r["herb1"], r["herb2"]], BULK_INTERACTIONS, DELETE_INTERACTIONS,
+                     lambda k: {"herb1": k[0], "herb2": k[1]}),
+    "symptom_aliases": (lambda r: [r["symptom"]], BULK_SYMPTOM_ALIASES, DELETE_SYMPTOM_ALIASES, lambda k: k[0]),
+}
+
+def fingerprint(row):
+    """Stable short hash of a loader row (the dict that is actually written to the graph)."""
+    blob = json.dumps(row, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+def row_key(parts):
+    return json.dumps(parts, ensure_ascii=False)
+
+def _read_rows(data_dir, filename, build_rows, batch_size):
+    rows = []
+    for chunk in read_csv(data_dir, filename, chunksize=batch_size):
+        rows.extend(build_rows(chunk))
+    return rows
+
+def read_manifest(session):
+    res = session.run("MATCH (m:LoadManifest) RETURN m.stage AS stage, m.keys AS keys, m.hashes AS hashes")
+    return {r["stage"]: dict(zip(r["keys"] or [], r["hashes"] or [])) for r in res}
+
+def _write_manifest(tx, stage, fps):
+    tx.run("MERGE (m:LoadManifest {stage: $stage}) SET m.keys = $keys, m.hashes = $hashes, m.updated_at = datetime()",
+           stage=stage, keys=list(fps), hashes=list(fps.values())).consume()
+
+def _write_batches(session, query, rows, batch_size):
+    for i in range(0, len(rows), batch_size):
+        session.execute_write(_write_batch, query, rows[i:i + batch_size])
+
+def diff_rows(rows, key_fn, previous):
+    """Compare current rows with the previous fingerprints.
+
+    Returns (fingerprints, changed_rows, deleted_keys) where changed rows are inserts and updates.
+    """
+    current, changed = {}, []
+    for r in rows:
+        k = row_key(key_fn(r))
+        fp = fingerprint(r)
+        current[k] = fp
+        if previous.get(k) != fp:
+            changed.append(r)
+    deleted = [json.loads(k) for k in previous if k not in current]
+    return current, changed, deleted
+
+def write_manifest(data_dir=DATA_DIR, batch_size=BATCH_SIZE):
+    """Record fingerprints of the current CSVs without touching the data (used after a full load)."""
+    with driver.session() as s:
+        for stage, filename, build_rows, _ in BULK_STAGES:
+            key_fn = INCREMENTAL_STAGES[stage][0]
+            fps, _, _ = diff_rows(_read_rows(data_dir, filename, build_rows, batch_size), key_fn, {})
+            s.execute_write(_write_manifest, stage, fps)
+
+def incremental_load(data_dir=DATA_DIR, batch_size=BATCH_SIZE):
+    """Apply only inserted, updated and deleted CSV rows since the last load, without clearing the graph.
+
+    Edge rows touching a node that was just inserted or deleted are re-applied as well, so an incremental
+    reload always converges to the same graph as a clear-and-rebuild. Returns {stage: {"changed", "deleted"}}.
+    """
+    stats = {}
+    with driver.session() as s:
+        previous = read_manifest(s)
+        plan = {}
+        for stage, filename, build_rows, _ in BULK_STAGES:
+            rows = _read_rows(data_dir, filename, build_rows, batch_size)
+            plan[stage] = (rows,) + diff_rows(rows, INCREMENTAL_STAGES[stage][0], previous.get(stage, {}))
+
+        # nodes that appeared or disappeared invalidate the edges pointing at them
+        touched_herbs = {r["name"] for r in plan["herbs"][2] if row_key([r["name"]]) not in previous.get("herbs", {})}
+        touched_herbs |= {k[0] for k in plan["herbs"][3]}
+        touched_conditions = {r["name"] for r in plan["conditions"][2]
+                              if row_key([r["name"]]) not in previous.get("conditions", {})}
+        touched_conditions |= {k[0] for k in plan["conditions"][3]}
+        # any condition change can create or drop Symptom nodes, so all aliases are re-applied
+        symptoms_touched = bool(plan["conditions"][2] or plan["conditions"][3])
+        for stage, is_touched in (
+            ("herb_conditions", lambda r: r["herb"] in touched_herbs or r["condition"] in touched_conditions),
+            ("interactions", lambda r: r["herb1"] in touched_herbs or r["herb2"] in touched_herbs),
+            ("symptom_aliases", lambda r: symptoms_touched),
+        ):
+            rows, fps, changed, deleted = plan[stage]
+            seen = {id(r) for r in changed}
+            changed = changed + [r for r in rows if id(r) not in seen and is_touched(r)]
+            plan[stage] = (rows, fps, changed, deleted)
+
+        # edge deletes, node upserts, edge upserts, node deletes
+        order = [("herb_conditions", "delete"), ("interactions", "delete"), ("symptom_aliases", "delete"),
+                 ("herbs", "upsert"), ("conditions", "upsert"),
+                 ("herb_conditions", "upsert"), ("interactions", "upsert"),
+                 ("conditions", "delete"), ("herbs", "delete"), ("symptom_aliases", "upsert")]
+        for stage, op in order:
+            _, upsert_q, delete_q, delete_payload = INCREMENTAL_STAGES[stage]
+            _, _, changed, deleted = plan[stage]
+            if op == "upsert":
+                _write_batches(s, upsert_q, changed, batch_size)
+            else:
+                _write_batches(s, delete_q, [delete_payload(k) for k in deleted], batch_size)
+        if plan["conditions"][2] or plan["conditions"][3]:
+            s.execute_write(_write_batch, DELETE_ORPHAN_SYMPTOMS, [])
+
+        for stage, (_, fps, changed, deleted) in plan.items():
+            s.execute_write(_write_manifest, stage, fps)
+            stats[stage] = {"changed": len(changed), "deleted": len(deleted)}
+            print(f"  {stage}: {len(changed)} inserted/updated, {len(deleted)} deleted")
+    return stats
+
+def has_changes(stats):
+    """True if an incremental_load() wrote or deleted any row."""
+    return any(st["changed"] or st["deleted"] for st in stats.values())
+
+# --- Offline artifact: the graph as one memory-mapped file, served without Neo4j (GRAPH_ARTIFACT) ---
+# Exporting reuses the API's snapshot model so the file answers queries exactly like the server; the backend
+# package is imported only here, so plain loads stay standalone.
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+def _backend():
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    from atreya.services.graph_artifact import write_artifact
+    from atreya.services.snapshot import GraphSnapshot
+    return GraphSnapshot, write_artifact
+
+def _read_graph(tx):
+    GraphSnapshot, _ = _backend()
+    r = tx.run("MATCH (m:GraphMeta {id: 'atreya'}) RETURN m.version AS version").single()
+    return (r["version"] if r else None), GraphSnapshot.fetch_rows(tx)
+
+def csv_rows(data_dir=DATA_DIR, batch_size=BATCH_SIZE):
+    """SNAPSHOT_QUERIES rows of the graph a full load of `data_dir` builds, computed without Neo4j.
+
+    Applies the loader's MERGE semantics: later rows overwrite node/edge properties, duplicate edges collapse
+    and edges or aliases naming a missing node are dropped (the MATCH finds nothing).
+    """
+    data = {stage: _read_rows(data_dir, filename, build_rows, batch_size)
+            for stage, filename, build_rows, _ in BULK_STAGES}
+    herbs = {r["name"]: r["properties"] for r in data["herbs"]}
+    conditions, has_symptom = {}, {}
+    for r in data["conditions"]:
+        conditions.setdefault(r["name"], None)
+        for sy in r["symptoms"]:
+            has_symptom.setdefault((r["name"], sy), None)
+    helps_with = {(r["herb"], r["condition"]): r["evidence"] for r in data["herb_conditions"]
+                  if r["herb"] in herbs and r["condition"] in conditions}
+    interacts = {(r["herb1"], r["herb2"]): None for r in data["interactions"]
+                 if r["herb1"] in herbs and r["herb2"] in herbs}
+    aliases = {r["symptom"]: r["aliases"] for r in data["symptom_aliases"]}
+    return {
+        "herbs": [{"name": n, "properties": p} for n, p in herbs.items()],
+        "symptoms": [{"name": s, "aliases": aliases.get(s)} for s in dict.fromkeys(s for _, s in has_symptom)],
+        "has_symptom": [{"condition": c, "symptom": s} for c, s in has_symptom],
+        "helps_with": [{"herb": h, "condition": c, "evidence": e} for (h, c), e in helps_with.items()],
+        "interacts_with": [{"herb": a, "other": b} for a, b in interacts],
+    }
+
+def export_artifact(path, data_dir=None, batch_size=BATCH_SIZE):
+    """Write the graph artifact from Neo4j, or from the CSVs in `data_dir` when given.
+
+    A Neo4j export reads the version marker and every snapshot query in one read transaction, so the file is a
+    consistent picture of one graph version; a CSV export is versioned by the hash of its rows.
+    """
+    GraphSnapshot, write_artifact = _backend()
+    t0 = time.perf_counter()
+    if data_dir is None:
+        with driver.session() as s:
+            version, rows = s.execute_read(_read_graph)
+    else:
+        rows = csv_rows(data_dir, batch_size)
+        version = "csv-" + fingerprint(rows)
+    sizes = write_artifact(path, GraphSnapshot.from_rows(rows, version=version))
+    print(f"  {path}: " + ", ".join(f"{k} {v}" for k, v in sizes.items())
+          + f" (version {version}, {time.perf_counter() - t0:.2f}s)")
+    return sizes
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Load the Atreya knowledge graph into Neo4j.")
+    p.add_argument("--data-dir", default=DATA_DIR, help="directory containing the CSV files")
+    p.add_argument("--full", action="store_true", help="clear the graph and rebuild it instead of applying the diff")
+    p.add_argument("--bulk", action="store_true", help="in --full mode, use batched UNWIND writes instead of one transaction per row")
+    p.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per UNWIND transaction")
+    p.add_argument("--export", metavar="PATH", help="after loading, write the graph artifact (.npz) to PATH")
+    p.add_argument("--export-only", action="store_true", help="with --export, skip the load and export the current graph")
+    p.add_argument("--from-csv", action="store_true", help="with --export, build the artifact from the CSVs without Neo4j")
+    return p.parse_args(argv)
+
 if __name__ == "__main__":
-    print("Clearing graph...")
-    clear()
+    args = parse_args()
+    if args.export and (args.export_only or args.from_csv):
+        print("Exporting graph artifact...")
+        export_artifact(args.export, args.data_dir if args.from_csv else None, args.batch_size)
+        sys.exit(0)
+    if args.full:
+        print("Clearing graph...")
+        clear()
     print("Creating constraints...")
     create_constraints()
-    print("Loading data...")
-    load()
+    changed = True
+    if not args.full:
+        print("Applying changes...")
+        changed = has_changes(incremental_load(args.data_dir, args.batch_size))
+    else:
+        print("Loading data...")
+        if args.bulk:
+            bulk_load(args.data_dir, args.batch_size)
+        else:
+            load(args.data_dir)
+        write_manifest(args.data_dir, args.batch_size)
+    if changed:
+        print(f"Graph version: {bump_version()}")
+    else:
+        # a new version would make every worker rebuild its snapshot and drop its caches for nothing
+        print("No changes; graph version unchanged.")
+    if args.export:
+        print("Exporting graph artifact...")
+        export_artifact(args.export, batch_size=args.batch_size)
     print("Done.")
@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import json
 import os
 from streamlit_tags import st_tags
 
@@ -9,6 +10,34 @@ st.caption("Educational demo using LangChain + Neo4j + FastAPI. **Not medical ad
 
 api_base = os.getenv("ATREYA_API_BASE", "http://127.0.0.1:8000")
 
+
+def iter_sse(resp):
+    """Yield (event, data) pairs from a streamed Server-Sent Events response."""
+    event, data = "message", []
+    for line in resp.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def stream_tokens(events):
+    """Yield LLM text chunks until the stream ends; raise on an `error` event."""
+    for event, data in events:
+        if event == "token":
+            yield data.get("text", "")
+        elif event == "error":
+            raise RuntimeError(data.get("detail", "stream error"))
+        elif event == "done":
+            return
+
+
 with st.sidebar:
     st.header("Connection")
     api_base = st.text_input("API base URL", api_base, help="FastAPI server base, e.g., http://127.0.0.1:8000")
@@ -53,38 +82,50 @@ if st.button("🧪 Get Recommendations"):
             "lifestyle": lifestyle,
             "conditions_history": conditions_history
         }
-        r = requests.post(f"{api_base}/recommendations", json=payload, timeout=20)
-        r.raise_for_status()
-        data = r.json()
-        st.success("Suggestions ready! (Not medical advice)")
-        for s in data.get("suggestions", []):
-            with st.container(border=True):
-                st.markdown(f"**Herb:** {s['name']}")
-                st.write(f"**Why:** {s['why']}")
-                if s.get("how_to_use"):
-                    st.write(f"**How to use:** {s['how_to_use']}")
-                if s.get("avoid_with"):
-                    st.write(f"**Avoid with:** {', '.join(s['avoid_with'])}")
-        with st.expander("General Tips"):
-            for t in data.get("tips", []):
-                st.write("• " + t)
-        st.info(data.get("disclaimer","Not medical advice"))
-        if data.get("debug"):
-            with st.expander("Debug (LLM prompt/result)"):
-                st.code(data["debug"].get("llm",""), language="markdown")
+        # streamed: graph-based suggestions render immediately, the LLM narrative follows token by token
+        with requests.post(f"{api_base}/recommendations/stream", json=payload, stream=True, timeout=(5, 60)) as r:
+            r.raise_for_status()
+            events = iter_sse(r)
+            data = {}
+            for event, body in events:
+                if event == "suggestions":
+                    data = body
+                    break
+                if event == "error":
+                    raise RuntimeError(body.get("detail", "stream error"))
+            st.success("Suggestions ready! (Not medical advice)")
+            for s in data.get("suggestions", []):
+                with st.container(border=True):
+                    st.markdown(f"**Herb:** {s['name']}")
+                    st.write(f"**Why:** {s['why']}")
+                    if s.get("how_to_use"):
+                        st.write(f"**How to use:** {s['how_to_use']}")
+                    if s.get("avoid_with"):
+                        st.write(f"**Avoid with:** {', '.join(s['avoid_with'])}")
+            with st.expander("General Tips"):
+                for t in data.get("tips", []):
+                    st.write("• " + t)
+            st.info(data.get("disclaimer","Not medical advice"))
+            with st.expander("Narrative (LLM)", expanded=True):
+                st.write_stream(stream_tokens(events))
     except Exception as e:
         st.error(str(e))
 
 st.divider()
 st.subheader("Quick herb search")
 q = st.text_input("Find a herb")
+page = st.number_input("Page", min_value=1, value=1, step=1)
+page_size = 20
 if st.button("Search herb"):
     try:
-        r = requests.get(f"{api_base}/herbs/search", params={"q": q}, timeout=10)
+        params = {"q": q, "limit": page_size, "offset": (int(page) - 1) * page_size}
+        r = requests.get(f"{api_base}/herbs/search", params=params, timeout=10)
         r.raise_for_status()
         data = r.json()
         for h in data.get("herbs", []):
             st.write(f"- **{h['name']}** — properties: {', '.join(h.get('properties', []))}")
+        if data.get("has_more"):
+            st.caption("More results on the next page.")
     except Exception as e:
         st.error(str(e))
 
@@ -106,16 +147,23 @@ if user_msg:
     with st.chat_message("user"):
         st.markdown(user_msg)
 
-    try:
-        r = requests.post(f"{api_base}/chat", json={"message": user_msg}, timeout=30)
-        r.raise_for_status()
-        data = r.json()
-        reply = data.get("reply", "Sorry, I couldn't compose a reply.")
-    except Exception as e:
-        reply = f"Oops, something went wrong: {e}"
+    with st.chat_message("assistant"):
+        try:
+            with requests.post(f"{api_base}/chat/stream", json={"message": user_msg}, stream=True, timeout=(5, 60)) as r:
+                r.raise_for_status()
+                events = iter_sse(r)
+                reply = "Sorry, I couldn't compose a reply."
+                for event, data in events:
+                    if event == "reply":
+                        reply = data.get("reply", reply)
+                        break
+                    if event == "error":
+                        raise RuntimeError(data.get("detail", "stream error"))
+                st.markdown(reply)
+        except Exception as e:
+            reply = f"Oops, something went wrong: {e}"
+            st.markdown(reply)
 
     st.session_state.chat.append({"role": "assistant", "content": reply})
-    with st.chat_message("assistant"):
-        st.markdown(reply)
 
 st.caption("© 2025 Atreya demo • Built for learning • Stay safe 🌱")